@@ -1,8 +1,8 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import pathlib
-import pickle
 import sys
 
 from pydantic import BaseModel, Field
@@ -20,7 +20,9 @@ logging.basicConfig(level=logging.INFO)
 
 
 class KnowledgeToolResult(BaseModel):
-    answer: str = Field(description="Resposta sintetizada usando o contexto recuperado.")
+    answer: str = Field(
+        description="Resposta sintetizada usando o contexto recuperado; vazia quando o agente deve redigi-la."
+    )
     context: str = Field(description="Trechos dos documentos utilizados para resposta.")
     sources: list[str] = Field(default_factory=list, description="Documentos consultados.")
     confidence: float = Field(
@@ -44,10 +46,28 @@ except ImportError:  # pragma: no cover - fallback when executed as script
 
 if __package__:
     from ..context import ContextNote  # type: ignore
+    from ..utils.metrics import timed_stage  # type: ignore
+    from ..utils.openai_client import get_async_openai_client  # type: ignore
+    from .knowledge_answer_cache import get_answer_cache  # type: ignore
+    from .knowledge_config import KnowledgeConfig  # type: ignore
+    from .knowledge_context import pack_context  # type: ignore
+    from .knowledge_embedding_providers import get_embedding_provider  # type: ignore
+    from .knowledge_index import get_knowledge_index  # type: ignore
     from .knowledge_prompts import prompts_knowledge_agent  # type: ignore
+    from .knowledge_query import QueryEmbedder, get_query_cache  # type: ignore
+    from .knowledge_rerank import get_reranker  # type: ignore
 else:  # pragma: no cover - running as a standalone script
     from context import ContextNote  # type: ignore
+    from utils.metrics import timed_stage  # type: ignore
+    from utils.openai_client import get_async_openai_client  # type: ignore
+    from knowledge_answer_cache import get_answer_cache  # type: ignore
+    from knowledge_config import KnowledgeConfig  # type: ignore
+    from knowledge_context import pack_context  # type: ignore
+    from knowledge_embedding_providers import get_embedding_provider  # type: ignore
+    from knowledge_index import get_knowledge_index  # type: ignore
     from knowledge_prompts import prompts_knowledge_agent  # type: ignore
+    from knowledge_query import QueryEmbedder, get_query_cache  # type: ignore
+    from knowledge_rerank import get_reranker  # type: ignore
 
 
 @function_tool
@@ -55,7 +75,7 @@ async def go_to_rag(question: str) -> KnowledgeToolResult:
     """Utilize o RAG para responder à pergunta do usuário."""
     logging.info("Processing question: %s", question)
 
-    relevant_chunks = __find_relevant_chunks(question, top_k=3)
+    relevant_chunks, query_embedding, store_version = await __find_relevant_chunks(question, top_k=3)
 
     if not relevant_chunks:
         return KnowledgeToolResult(
@@ -65,41 +85,71 @@ async def go_to_rag(question: str) -> KnowledgeToolResult:
             confidence=0.0,
         )
 
-    context_sections: list[str] = []
-    sources: list[str] = []
-    seen_sources: set[str] = set()
-    similarities: list[float] = []
-
-    for chunk in relevant_chunks:
-        chunk_info = chunk.get("chunk", {}) or {}
-        source = chunk_info.get("source", "Desconhecido")
-        content = chunk_info.get("content", "")
-        similarity = float(chunk.get("similarity", 0.0))
-
-        if source not in seen_sources:
-            sources.append(source)
-            seen_sources.add(source)
-
-        similarities.append(similarity)
-        context_sections.append(f"Documento: {source}\nConteúdo: {content}")
-
-    context = "\n\n".join(context_sections)
-    logging.info("Context: %s", context)
+    settings = KnowledgeConfig.load()
+    agent_synthesis = settings.synthesis.mode == "agent"
+
+    # Same chunks and an equivalent question: reuse the answer instead of synthesizing again.
+    answer_cache = None if agent_synthesis else get_answer_cache()
+    chunk_ids = [chunk["index"] for chunk in relevant_chunks]
+    if answer_cache is not None:
+        cached = answer_cache.get(store_version, query_embedding, chunk_ids)
+        if cached is not None:
+            logging.info("Answer cache hit for chunks %s", sorted(chunk_ids))
+            return cached.model_copy(deep=True)
+
+    # Overlapping/adjacent chunks are merged and the context is packed to the token budget.
+    budget = settings.context_budget
+    with timed_stage("rag.pack"):
+        packed = pack_context(
+            relevant_chunks,
+            max_tokens=budget.max_tokens,
+            merge_gap=budget.merge_gap,
+            model=getattr(config, "DEFAULT_MODEL", None),
+        )
+    context = packed.text
+    sources = packed.sources
+    logging.info(
+        "Context: %d chunks packed into %d sections, ~%d tokens (budget %d, %d sections dropped)",
+        packed.input_chunks,
+        len(packed.sections),
+        packed.tokens,
+        packed.budget,
+        packed.dropped_sections,
+    )
+    logging.debug("Context: %s", context)
 
+    similarities = [float(chunk.get("similarity", 0.0)) for chunk in relevant_chunks]
     confidence = (
         sum(max(score, 0.0) for score in similarities) / len(similarities) if similarities else 0.0
     )
 
-    answer = (
+    if agent_synthesis:
+        # The Knowledge Agent writes the answer from this context in its own (streamed) turn.
+        return KnowledgeToolResult(answer="", context=context, sources=sources, confidence=confidence)
+
+    with timed_stage("rag.synthesize"):
+        synthesized = await _synthesize(question, context)
+    answer = synthesized or (
         "Encontrei trechos relevantes, mas não consegui sintetizar uma resposta a partir deles. "
         "Use o contexto abaixo para responder manualmente."
     )
+    result = KnowledgeToolResult(
+        answer=answer,
+        context=context,
+        sources=sources,
+        confidence=confidence,
+    )
+    # Fallback answers are not cached, so the next ask retries the synthesis.
+    if synthesized and answer_cache is not None:
+        answer_cache.put(store_version, query_embedding, chunk_ids, result.model_copy(deep=True))
+    return result
 
-    try:
-        from openai import OpenAI
 
-        client = OpenAI(api_key=config.OPENAI_API_KEY)
-        completion = client.responses.create(
+async def _synthesize(question: str, context: str) -> str | None:
+    """Answer ``question`` from ``context`` with the configured model; ``None`` on failure."""
+    answer: str | None = None
+    try:
+        completion = await get_async_openai_client().responses.create(
             model=getattr(config, "DEFAULT_MODEL", "gpt-4.1"),
             input=[
                 {
@@ -120,6 +170,14 @@ async def go_to_rag(question: str) -> KnowledgeToolResult:
             ],
         )
 
+        usage = getattr(completion, "usage", None)
+        if usage is not None:
+            logging.info(
+                "Synthesis tokens: %s prompt, %s completion",
+                getattr(usage, "input_tokens", "?"),
+                getattr(usage, "output_tokens", "?"),
+            )
+
         if hasattr(completion, "output_text"):
             answer_candidate = completion.output_text.strip()
             if answer_candidate:
@@ -136,67 +194,49 @@ async def go_to_rag(question: str) -> KnowledgeToolResult:
     except Exception as exc:  # noqa: BLE001
         logging.error("Failed to synthesize answer: %s", exc, exc_info=True)
 
-    return KnowledgeToolResult(
-        answer=answer,
-        context=context,
-        sources=sources,
-        confidence=confidence,
-    )
-
+    return answer
 
-def __find_relevant_chunks(query: str, top_k: int = 3):
-    """Find most relevant chunks for a given query."""
-    try:
-        from openai import OpenAI
-        from sklearn.metrics.pairwise import cosine_similarity
-        import numpy as np
 
-        client = OpenAI(api_key=config.OPENAI_API_KEY)
-        response = client.embeddings.create(model="text-embedding-3-large", input=query)
-        query_embedding = response.data[0].embedding
+async def __find_relevant_chunks(query: str, top_k: int = 3):
+    """Find most relevant chunks for a given query.
 
-        chunk_embeddings = load_embeddings()
-        if not chunk_embeddings:
+    Returns ``(chunks, query_embedding, store_version)``; the last two key the answer cache.
+    """
+    try:
+        index = get_knowledge_index()
+        index.reload_if_changed()
+        _, store = index.snapshot()
+        if store is None or not len(store):
             logging.error("No embeddings loaded")
-            return []
-
-        similarities: list[tuple[float, dict]] = []
-        for chunk_data in chunk_embeddings:
-            chunk_embedding = chunk_data.get("embedding")
-            if not chunk_embedding:
-                continue
-
-            query_emb = np.array(query_embedding).reshape(1, -1)
-            chunk_emb = np.array(chunk_embedding).reshape(1, -1)
-            similarity = cosine_similarity(query_emb, chunk_emb)[0][0]
-            similarities.append((similarity, chunk_data))
-
-        similarities.sort(key=lambda x: x[0], reverse=True)
-
-        top_results: list[dict] = []
-        for score, chunk_data in similarities[:top_k]:
-            enriched_chunk = dict(chunk_data)
-            enriched_chunk["similarity"] = score
-            top_results.append(enriched_chunk)
-
-        return top_results
+            return [], None, None
+
+        # Same model and dimension as the store; repeated questions skip the API call.
+        embedder = QueryEmbedder(get_embedding_provider(), get_query_cache())
+        with timed_stage("rag.embed"):
+            query_embedding = await embedder.aembed_for_store(query, store)
+
+        # Hybrid search: the question text also goes to the BM25 index for exact codes.
+        reranker = get_reranker()
+        candidates = max(top_k, reranker.candidates) if reranker is not None else top_k
+        with timed_stage("rag.retrieve"):
+            results = index.search(query_embedding, top_k=candidates, query_text=query)
+        if reranker is not None:
+            with timed_stage("rag.rerank"):
+                results = await _rerank(reranker, query, results, top_k)
+        return results, query_embedding, store.version
 
     except Exception as exc:  # noqa: BLE001
         logging.error("Error finding relevant chunks: %s", exc, exc_info=True)
-        return []
+        return [], None, None
 
 
-def load_embeddings():
-    """Load embeddings from disk."""
-    embeddings_path = project_root / "Template" / "knowledge_documentos" / "embedding" / "embeddings.pkl"
+async def _rerank(reranker, query: str, results: list[dict], top_k: int) -> list[dict]:
+    """Keep the ``top_k`` best candidates by cross-encoder score, off the event loop."""
     try:
-        with open(embeddings_path, "rb") as file:
-            loaded_data = pickle.load(file)
-            logging.info("Embeddings loaded successfully from %s", embeddings_path)
-            return loaded_data
+        return await asyncio.to_thread(reranker.rerank, query, results, top_k)
     except Exception as exc:  # noqa: BLE001
-        logging.error("Failed to load embeddings from %s: %s", embeddings_path, exc, exc_info=True)
-        return []
+        logging.error("Reranking failed, keeping retrieval order: %s", exc, exc_info=True)
+        return results[:top_k]
 
 
 knowledge_agent = Agent[ContextNote](  # type: ignore[name-defined]
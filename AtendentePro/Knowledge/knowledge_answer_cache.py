@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Iterable, TypeVar
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from AtendentePro.Knowledge.knowledge_config import KnowledgeConfig
+from AtendentePro.Knowledge.knowledge_search import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.95
+DEFAULT_ANSWER_CACHE_ENTRIES = 256
+DEFAULT_ANSWER_CACHE_TTL = 3600.0
+# Phrasings kept per chunk set; the oldest is dropped past this.
+MAX_VARIANTS_PER_CHUNK_SET = 8
+
+T = TypeVar("T")
+
+
+class AnswerCacheStats(BaseModel):
+    hits: int = Field(default=0, description="Respostas reaproveitadas.")
+    misses: int = Field(default=0, description="Perguntas que exigiram nova síntese.")
+    entries: int = Field(default=0, description="Conjuntos de trechos com respostas em cache.")
+    invalidations: int = Field(default=0, description="Vezes em que o cache foi limpo por nova versão do acervo.")
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class SemanticAnswerCache(Generic[T]):
+    """Reuse a synthesized answer for a question that means the same as an earlier one.
+
+    A hit needs both the same set of retrieved chunks (so the answer was
+    built from the same context) and a query embedding whose cosine
+    similarity to a cached one reaches ``threshold``. Entries belong to one
+    store version; the first lookup against a new version clears the cache.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        max_entries: int = DEFAULT_ANSWER_CACHE_ENTRIES,
+        ttl: float | None = DEFAULT_ANSWER_CACHE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._version: str | None = None
+        # chunk-id set -> [(created, normalised query embedding, answer), ...]
+        self._entries: OrderedDict[frozenset[int], list[tuple[float, np.ndarray, T]]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def stats(self) -> AnswerCacheStats:
+        return AnswerCacheStats(
+            hits=self._hits, misses=self._misses, entries=len(self), invalidations=self._invalidations
+        )
+
+    def _check_version(self, version: str) -> None:
+        if version != self._version:
+            if self._entries:
+                self._invalidations += 1
+                logger.info("Answer cache cleared: knowledge store changed to %s", version)
+            self._entries.clear()
+            self._version = version
+
+    def get(self, version: str, query_embedding: Any, chunk_ids: Iterable[int]) -> T | None:
+        """Cached answer for the same chunks and a close enough question, else ``None``."""
+        key = frozenset(int(chunk_id) for chunk_id in chunk_ids)
+        query = normalize_rows(query_embedding)[0]
+        with self._lock:
+            self._check_version(version)
+            variants = self._entries.get(key, [])
+            if self.ttl is not None:
+                now = self._clock()
+                variants[:] = [variant for variant in variants if now - variant[0] <= self.ttl]
+            if not variants:
+                self._entries.pop(key, None)
+                self._misses += 1
+                return None
+            similarities = np.stack([vector for _, vector, _ in variants]) @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return variants[best][2]
+
+    def put(self, version: str, query_embedding: Any, chunk_ids: Iterable[int], value: T) -> None:
+        if self.max_entries <= 0:
+            return
+        key = frozenset(int(chunk_id) for chunk_id in chunk_ids)
+        query = normalize_rows(query_embedding)[0]
+        with self._lock:
+            self._check_version(version)
+            variants = self._entries.setdefault(key, [])
+            variants.append((self._clock(), query, value))
+            del variants[:-MAX_VARIANTS_PER_CHUNK_SET]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_answer_cache: SemanticAnswerCache[Any] | None = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> SemanticAnswerCache[Any] | None:
+    """Return the process-wide answer cache, or ``None`` when disabled in ``knowledge_config.yaml``."""
+    global _answer_cache
+    settings = KnowledgeConfig.load().answer_cache
+    if not settings.enabled:
+        return None
+    with _answer_cache_lock:
+        if _answer_cache is None:
+            _answer_cache = SemanticAnswerCache(settings.threshold, settings.max_entries, settings.ttl_seconds)
+        return _answer_cache
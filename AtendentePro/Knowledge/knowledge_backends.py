@@ -0,0 +1,369 @@
+from __future__ import annotations
+
+import logging
+import math
+import uuid
+from pathlib import Path
+from typing import Any, Protocol
+
+import numpy as np
+
+from AtendentePro.Knowledge.knowledge_quantization import ProductQuantizer, ScalarQuantizer
+from AtendentePro.Knowledge.knowledge_search import normalize_rows, score_top_k, top_k_indices, truncate_rows
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NPROBE = 8
+DEFAULT_KMEANS_ITERATIONS = 10
+DEFAULT_RESCORE = 8
+DEFAULT_MATRYOSHKA_DIMENSIONS = 256
+CHROMA_DIRNAME = "chroma"
+
+_ASSIGN_BLOCK_ROWS = 8192
+
+
+def _cache_path(directory: Path | None, version: str | None, prefix: str, suffix: str) -> Path | None:
+    if version is None or directory is None:
+        return None
+    return Path(directory) / f"{prefix}-{version}-{suffix}.npz"
+
+
+def _save_cache(path: Path, prefix: str, **arrays: np.ndarray) -> None:
+    """Atomically write ``arrays`` to ``path`` and drop caches of other store versions."""
+    for stale in path.parent.glob(f"{prefix}-*.npz"):
+        stale.unlink(missing_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "wb") as file:
+        np.savez(file, **arrays)
+    tmp_path.replace(path)
+
+
+def _rescore(
+    matrix: np.ndarray, candidates: np.ndarray, query_vector: np.ndarray, top_k: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Re-rank ``candidates`` with the full-precision rows of ``matrix``, reading only those rows."""
+    candidates = np.sort(candidates)
+    exact = np.asarray(matrix[candidates], dtype=np.float32) @ query_vector
+    best = top_k_indices(exact, top_k)
+    return candidates[best], exact[best]
+
+
+class IndexBackend(Protocol):
+    """Nearest-neighbour search over the row-normalised vectors of a store.
+
+    ``build`` is called once per store version; ``version`` and ``directory``
+    let persistent backends reuse what they built for that version before.
+    ``search`` returns ``(rows, scores)`` ordered by cosine similarity.
+    """
+
+    def build(self, matrix: np.ndarray, *, version: str | None = None, directory: Path | None = None) -> None: ...
+
+    def search(self, query: Any, top_k: int) -> tuple[np.ndarray, np.ndarray]: ...
+
+
+class BruteForceBackend:
+    """Exact search: one matrix-vector product over every row."""
+
+    def __init__(self) -> None:
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        return self._matrix.nbytes
+
+    def build(self, matrix: np.ndarray, *, version: str | None = None, directory: Path | None = None) -> None:
+        self._matrix = matrix
+
+    def search(self, query: Any, top_k: int) -> tuple[np.ndarray, np.ndarray]:
+        return score_top_k(self._matrix, query, top_k)
+
+
+class IVFBackend:
+    """Inverted-file index: spherical k-means clusters, probing the ``nprobe`` closest.
+
+    Each query scores ``nlist`` centroids and then only the rows of the
+    probed clusters, so the work per query is about ``nprobe / nlist`` of a
+    brute-force scan. The trained lists are cached next to the store as
+    ``ivf-<version>-*.npz`` so restarts do not retrain.
+    """
+
+    def __init__(
+        self,
+        nlist: int | None = None,
+        nprobe: int = DEFAULT_NPROBE,
+        iterations: int = DEFAULT_KMEANS_ITERATIONS,
+        seed: int = 0,
+    ) -> None:
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.seed = seed
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._centroids = np.empty((0, 0), dtype=np.float32)
+        self._list_rows = np.empty(0, dtype=np.int64)
+        self._list_offsets = np.zeros(1, dtype=np.int64)
+
+    @property
+    def nbytes(self) -> int:
+        return self._matrix.nbytes + self._centroids.nbytes + self._list_rows.nbytes + self._list_offsets.nbytes
+
+    def build(self, matrix: np.ndarray, *, version: str | None = None, directory: Path | None = None) -> None:
+        self._matrix = matrix
+        count = matrix.shape[0]
+        nlist = max(1, min(count, self.nlist or round(math.sqrt(count))))
+        cache_path = _cache_path(directory, version, "ivf", f"{nlist}-{self.seed}")
+        if cache_path is not None and cache_path.is_file():
+            with np.load(cache_path, allow_pickle=False) as cached:
+                self._centroids = cached["centroids"]
+                self._list_rows = cached["list_rows"]
+                self._list_offsets = cached["list_offsets"]
+            return
+
+        centroids, assignment = self._train(matrix, nlist)
+        self._centroids = centroids
+        self._list_rows = np.argsort(assignment, kind="stable")
+        self._list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=nlist))])
+        if cache_path is not None:
+            _save_cache(
+                cache_path, "ivf", centroids=centroids, list_rows=self._list_rows, list_offsets=self._list_offsets
+            )
+        logger.info("IVF index trained: %d rows in %d lists", count, nlist)
+
+    def _assign(self, matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        assignment = np.empty(matrix.shape[0], dtype=np.int64)
+        for start in range(0, matrix.shape[0], _ASSIGN_BLOCK_ROWS):
+            block = np.asarray(matrix[start : start + _ASSIGN_BLOCK_ROWS], dtype=np.float32)
+            assignment[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        return assignment
+
+    def _train(self, matrix: np.ndarray, nlist: int) -> tuple[np.ndarray, np.ndarray]:
+        rng = np.random.default_rng(self.seed)
+        if matrix.shape[0] == 0:
+            return np.empty((0, matrix.shape[1]), dtype=np.float32), np.empty(0, dtype=np.int64)
+        centroids = np.asarray(matrix[np.sort(rng.choice(matrix.shape[0], nlist, replace=False))], dtype=np.float32)
+        assignment = self._assign(matrix, centroids)
+        for _ in range(self.iterations):
+            sums = np.zeros_like(centroids)
+            for start in range(0, matrix.shape[0], _ASSIGN_BLOCK_ROWS):
+                block = np.asarray(matrix[start : start + _ASSIGN_BLOCK_ROWS], dtype=np.float32)
+                np.add.at(sums, assignment[start : start + len(block)], block)
+            empty = ~sums.any(axis=1)
+            if empty.any():
+                # Re-seed empty clusters with random rows so every list stays useful.
+                sums[empty] = matrix[rng.choice(matrix.shape[0], int(empty.sum()), replace=False)]
+            centroids = normalize_rows(sums)
+            new_assignment = self._assign(matrix, centroids)
+            if np.array_equal(new_assignment, assignment):
+                break
+            assignment = new_assignment
+        return centroids, assignment
+
+    def search(self, query: Any, top_k: int) -> tuple[np.ndarray, np.ndarray]:
+        if not len(self._centroids):
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        query_vector = normalize_rows(query)[0]
+        probed = top_k_indices(self._centroids @ query_vector, self.nprobe)
+        # Sorted rows keep reads from a memory-mapped matrix sequential.
+        candidates = np.sort(
+            np.concatenate(
+                [self._list_rows[self._list_offsets[cell] : self._list_offsets[cell + 1]] for cell in probed]
+            )
+        )
+        scores = self._matrix[candidates] @ query_vector
+        best = top_k_indices(scores, top_k)
+        return candidates[best], scores[best]
+
+
+class QuantizedBackend:
+    """Scan compact codes instead of float vectors, then re-score the best in full precision.
+
+    The codes are scored against the float query (asymmetric distance). The
+    ``top_k * rescore`` best candidates are then re-scored against the
+    memory-mapped float vectors, so only their pages are read from the
+    store; ``rescore=0`` returns the approximate scores as they are. Codes
+    are cached next to the store per version, like the IVF lists.
+    """
+
+    prefix = "quantized"
+
+    def __init__(self, quantizer: ScalarQuantizer | ProductQuantizer, rescore: int = DEFAULT_RESCORE) -> None:
+        self.quantizer = quantizer
+        self.rescore = rescore
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._codes = np.empty((0, 0), dtype=np.uint8)
+
+    @property
+    def nbytes(self) -> int:
+        """Resident size of the codes and codebooks (the float vectors stay on disk)."""
+        return self._codes.nbytes + self.quantizer.nbytes
+
+    def build(self, matrix: np.ndarray, *, version: str | None = None, directory: Path | None = None) -> None:
+        self._matrix = matrix
+        self.quantizer.resolve(matrix.shape[1])
+        cache_path = _cache_path(directory, version, self.prefix, self.quantizer.signature)
+        if cache_path is not None and cache_path.is_file():
+            with np.load(cache_path, allow_pickle=False) as cached:
+                self.quantizer.load_arrays(cached)
+                self._codes = cached["codes"]
+            return
+
+        if matrix.shape[0] == 0:
+            return
+        self.quantizer.train(matrix)
+        self._codes = self.quantizer.encode(matrix)
+        if cache_path is not None:
+            _save_cache(cache_path, self.prefix, codes=self._codes, **self.quantizer.arrays())
+        logger.info(
+            "%s codes built: %d rows, %.1f MiB", self.quantizer.signature, matrix.shape[0], self.nbytes / 2**20
+        )
+
+    def search(self, query: Any, top_k: int) -> tuple[np.ndarray, np.ndarray]:
+        if not self._codes.size:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        query_vector = normalize_rows(query)[0]
+        scores = self.quantizer.score(self._codes, query_vector)
+        if self.rescore <= 0:
+            rows = top_k_indices(scores, top_k)
+            return rows, scores[rows]
+
+        return _rescore(self._matrix, top_k_indices(scores, top_k * self.rescore), query_vector, top_k)
+
+
+class Int8Backend(QuantizedBackend):
+    """8-bit scalar quantization: 4x less memory than float32."""
+
+    prefix = "int8"
+
+    def __init__(self, rescore: int = DEFAULT_RESCORE) -> None:
+        super().__init__(ScalarQuantizer(), rescore)
+
+
+class PQBackend(QuantizedBackend):
+    """Product quantization: one byte per ``subspaces`` slice (32x smaller by default)."""
+
+    prefix = "pq"
+
+    def __init__(
+        self,
+        subspaces: int | None = None,
+        centroids: int = 256,
+        iterations: int = 10,
+        seed: int = 0,
+        rescore: int = DEFAULT_RESCORE,
+    ) -> None:
+        super().__init__(ProductQuantizer(subspaces, centroids, iterations, seed=seed), rescore)
+
+
+class MatryoshkaBackend:
+    """Two-stage search: short vector prefixes find candidates, full vectors rank them.
+
+    Only the first ``dimensions`` components of every row are held in memory
+    (re-normalised, see ``truncate_rows``). The ``top_k * rescore``
+    candidates are then re-ranked with the full memory-mapped vectors;
+    ``rescore=0`` ranks by the short vectors alone.
+    """
+
+    def __init__(self, dimensions: int = DEFAULT_MATRYOSHKA_DIMENSIONS, rescore: int = DEFAULT_RESCORE) -> None:
+        self.dimensions = dimensions
+        self.rescore = rescore
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._short = np.empty((0, 0), dtype=np.float32)
+
+    @property
+    def nbytes(self) -> int:
+        return self._short.nbytes
+
+    def build(self, matrix: np.ndarray, *, version: str | None = None, directory: Path | None = None) -> None:
+        self._matrix = matrix
+        self._short = np.empty((matrix.shape[0], min(self.dimensions, matrix.shape[1])), dtype=np.float32)
+        for start in range(0, matrix.shape[0], _ASSIGN_BLOCK_ROWS):
+            block = matrix[start : start + _ASSIGN_BLOCK_ROWS]
+            self._short[start : start + len(block)] = truncate_rows(block, self.dimensions)
+
+    def search(self, query: Any, top_k: int) -> tuple[np.ndarray, np.ndarray]:
+        if not len(self._short):
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        query_vector = normalize_rows(query)[0]
+        scores = self._short @ truncate_rows(query_vector, self.dimensions)[0]
+        if self.rescore <= 0:
+            rows = top_k_indices(scores, top_k)
+            return rows, scores[rows]
+        return _rescore(self._matrix, top_k_indices(scores, top_k * self.rescore), query_vector, top_k)
+
+
+class ChromaBackend:
+    """HNSW graph search through an embedded chromadb collection.
+
+    With a store directory the collection is persisted under ``chroma/`` and
+    named after the store version, so it is only rebuilt when the store
+    changes; without one it lives in memory.
+    """
+
+    def __init__(self, ef_search: int = 64, ef_construction: int = 128, max_neighbors: int = 16) -> None:
+        self.ef_search = ef_search
+        self.ef_construction = ef_construction
+        self.max_neighbors = max_neighbors
+        self._collection: Any = None
+
+    def build(self, matrix: np.ndarray, *, version: str | None = None, directory: Path | None = None) -> None:
+        import chromadb  # optional: only needed for this backend
+        from chromadb.config import Settings
+
+        settings = Settings(anonymized_telemetry=False)
+        if directory is not None:
+            client = chromadb.PersistentClient(path=str(Path(directory) / CHROMA_DIRNAME), settings=settings)
+        else:
+            client = chromadb.EphemeralClient(settings=settings)
+        name = f"knowledge-{version or uuid.uuid4().hex}"
+        configuration = {
+            "hnsw": {
+                "space": "cosine",
+                "ef_search": self.ef_search,
+                "ef_construction": self.ef_construction,
+                "max_neighbors": self.max_neighbors,
+            }
+        }
+        collection = client.get_or_create_collection(name, configuration=configuration, embedding_function=None)
+        if collection.count() != matrix.shape[0]:
+            client.delete_collection(name)
+            collection = client.create_collection(name, configuration=configuration, embedding_function=None)
+            step = client.get_max_batch_size()
+            for start in range(0, matrix.shape[0], step):
+                block = np.asarray(matrix[start : start + step], dtype=np.float32)
+                collection.add(ids=[str(row) for row in range(start, start + len(block))], embeddings=block)
+            logger.info("Chroma collection %s built with %d rows", name, matrix.shape[0])
+        if directory is not None:
+            for other in client.list_collections():
+                if other.name.startswith("knowledge-") and other.name != name:
+                    client.delete_collection(other.name)
+        self._collection = collection
+
+    def search(self, query: Any, top_k: int) -> tuple[np.ndarray, np.ndarray]:
+        count = self._collection.count() if self._collection is not None else 0
+        if not count or top_k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+        result = self._collection.query(
+            query_embeddings=normalize_rows(query), n_results=min(top_k, count), include=["distances"]
+        )
+        rows = np.asarray([int(row) for row in result["ids"][0]], dtype=np.intp)
+        scores = 1.0 - np.asarray(result["distances"][0], dtype=np.float32)
+        return rows, scores
+
+
+INDEX_BACKEND_REGISTRY: dict[str, type] = {
+    "brute_force": BruteForceBackend,
+    "ivf": IVFBackend,
+    "int8": Int8Backend,
+    "pq": PQBackend,
+    "matryoshka": MatryoshkaBackend,
+    "chroma": ChromaBackend,
+}
+
+
+def create_index_backend(name: str = "brute_force", **options: Any) -> IndexBackend:
+    """Instantiate the backend registered as ``name`` with ``options``."""
+    try:
+        backend_class = INDEX_BACKEND_REGISTRY[name]
+    except KeyError:
+        raise ValueError(f"Unknown index backend {name!r}; use one of {sorted(INDEX_BACKEND_REGISTRY)}") from None
+    return backend_class(**options)
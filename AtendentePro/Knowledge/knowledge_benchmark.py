@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+from pathlib import Path
+from typing import Any, Sequence
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from AtendentePro.Knowledge.knowledge_backends import INDEX_BACKEND_REGISTRY, create_index_backend
+from AtendentePro.Knowledge.knowledge_search import normalize_rows, score_top_k_batch
+from AtendentePro.Knowledge.knowledge_store import EmbeddingStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = (1_000, 10_000, 50_000)
+DEFAULT_DIMENSION = 256
+DEFAULT_QUERIES = 200
+DEFAULT_TOP_K = 5
+DEFAULT_NOISE = 2.5
+DEFAULT_TRUNCATIONS = (64, 128, 256, 512, 1024)
+# Synthetic vectors are not Matryoshka-trained, so their prefixes carry no signal.
+SYNTHETIC_BACKENDS = tuple(name for name in INDEX_BACKEND_REGISTRY if name != "matryoshka")
+
+
+class BenchmarkResult(BaseModel):
+    backend: str = Field(description="Backend avaliado.")
+    size: int = Field(description="Quantidade de vetores no índice.")
+    recall: float = Field(description="Recall@k médio em relação à busca exata.")
+    build_seconds: float = Field(description="Tempo de construção do índice.")
+    index_bytes: int | None = Field(default=None, description="Memória ocupada pelo índice (quando conhecida).")
+    p50_ms: float = Field(description="Latência mediana por consulta (ms).")
+    p95_ms: float = Field(description="Latência p95 por consulta (ms).")
+
+
+def synthetic_corpus(
+    size: int,
+    dimension: int,
+    queries: int,
+    *,
+    clusters: int | None = None,
+    noise: float = DEFAULT_NOISE,
+    seed: int = 0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Clustered unit vectors, roughly how document embeddings group by topic, plus held-out queries.
+
+    ``noise`` is the spread around each topic centre; with well separated
+    topics every backend reaches perfect recall, so the default keeps the
+    clusters overlapping enough for approximate search to miss neighbours.
+    """
+    rng = np.random.default_rng(seed)
+    clusters = clusters or max(1, int(np.sqrt(size)))
+    centers = rng.normal(size=(clusters, dimension))
+    labels = rng.integers(0, clusters, size=size + queries)
+    points = centers[labels] + rng.normal(scale=noise, size=(size + queries, dimension))
+    points = normalize_rows(points)
+    return points[:size], points[size:]
+
+
+def recall_at_k(found: Sequence[np.ndarray], expected: np.ndarray) -> float:
+    """Fraction of the exact top-k rows that each search returned, averaged over queries."""
+    hits = [len(set(np.asarray(rows).tolist()) & set(truth.tolist())) for rows, truth in zip(found, expected)]
+    return float(np.mean(hits) / expected.shape[1]) if len(expected) else 1.0
+
+
+def benchmark_backend(
+    name: str,
+    matrix: np.ndarray,
+    queries: np.ndarray,
+    expected: np.ndarray,
+    *,
+    top_k: int = DEFAULT_TOP_K,
+    options: dict[str, Any] | None = None,
+    label: str | None = None,
+    leave_one_out: bool = False,
+) -> BenchmarkResult:
+    """Build ``name`` over ``matrix`` and time each query; with ``leave_one_out`` query ``i`` is row ``i``."""
+    backend = create_index_backend(name, **(options or {}))
+    started = time.perf_counter()
+    backend.build(matrix)
+    build_seconds = time.perf_counter() - started
+
+    found: list[np.ndarray] = []
+    latencies: list[float] = []
+    for position, query in enumerate(queries):
+        started = time.perf_counter()
+        rows, _ = backend.search(query, top_k + 1 if leave_one_out else top_k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        found.append(rows[rows != position][:top_k] if leave_one_out else rows)
+
+    return BenchmarkResult(
+        backend=label or name,
+        size=matrix.shape[0],
+        recall=recall_at_k(found, expected),
+        build_seconds=build_seconds,
+        index_bytes=getattr(backend, "nbytes", None),
+        p50_ms=float(np.percentile(latencies, 50)),
+        p95_ms=float(np.percentile(latencies, 95)),
+    )
+
+
+def run_benchmark(
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    backends: Sequence[str] = SYNTHETIC_BACKENDS,
+    *,
+    dimension: int = DEFAULT_DIMENSION,
+    queries: int = DEFAULT_QUERIES,
+    top_k: int = DEFAULT_TOP_K,
+    options: dict[str, dict[str, Any]] | None = None,
+    noise: float = DEFAULT_NOISE,
+    seed: int = 0,
+) -> list[BenchmarkResult]:
+    """Measure recall@k and per-query latency of each backend as the corpus grows."""
+    results: list[BenchmarkResult] = []
+    for size in sizes:
+        matrix, query_matrix = synthetic_corpus(size, dimension, queries, noise=noise, seed=seed)
+        expected, _ = score_top_k_batch(matrix, query_matrix, top_k)
+        for name in backends:
+            result = benchmark_backend(
+                name, matrix, query_matrix, expected, top_k=top_k, options=(options or {}).get(name)
+            )
+            logger.info("%s", result)
+            results.append(result)
+    return results
+
+
+def run_truncation_benchmark(
+    directory: Path | str,
+    dimensions: Sequence[int] = DEFAULT_TRUNCATIONS,
+    *,
+    top_k: int = DEFAULT_TOP_K,
+    rescore: int = 8,
+) -> list[BenchmarkResult]:
+    """Recall@k and latency of Matryoshka prefixes on a real store, one- and two-stage.
+
+    Every chunk is used as a query with its own row left out of the results,
+    so the ground truth is the exact top-k of the other chunks under the full
+    vectors.
+    """
+    store = EmbeddingStore.open(directory)
+    matrix = np.asarray(store.vectors, dtype=np.float32)
+    rows, _ = score_top_k_batch(matrix, matrix, top_k + 1)
+    expected = np.stack([row[row != position][:top_k] for position, row in enumerate(rows)])
+
+    results = [benchmark_backend("brute_force", matrix, matrix, expected, top_k=top_k, leave_one_out=True)]
+    for size in dimensions:
+        for stage_rescore in (0, rescore):
+            results.append(
+                benchmark_backend(
+                    "matryoshka",
+                    matrix,
+                    matrix,
+                    expected,
+                    top_k=top_k,
+                    options={"dimensions": size, "rescore": stage_rescore},
+                    label=f"dim{size}" + ("+rescore" if stage_rescore else ""),
+                    leave_one_out=True,
+                )
+            )
+    return results
+
+
+def format_results(results: Sequence[BenchmarkResult], top_k: int = DEFAULT_TOP_K) -> str:
+    lines = [
+        f"{'backend':<16} {'size':>8} {f'recall@{top_k}':>9} {'build s':>8} {'index MiB':>9} "
+        f"{'p50 ms':>8} {'p95 ms':>8}",
+    ]
+    for result in results:
+        memory = f"{result.index_bytes / 2**20:>9.2f}" if result.index_bytes is not None else f"{'-':>9}"
+        lines.append(
+            f"{result.backend:<16} {result.size:>8} {result.recall:>9.3f} {result.build_seconds:>8.2f} {memory} "
+            f"{result.p50_ms:>8.3f} {result.p95_ms:>8.3f}"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark recall@k and latency of the knowledge index backends.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--backends", nargs="+", choices=sorted(INDEX_BACKEND_REGISTRY), default=list(SYNTHETIC_BACKENDS))
+    parser.add_argument("--dimension", type=int, default=DEFAULT_DIMENSION)
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES)
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K)
+    parser.add_argument("--noise", type=float, default=DEFAULT_NOISE, help="spread around each synthetic topic")
+    parser.add_argument("--nprobe", type=int, default=None, help="IVF lists probed per query")
+    parser.add_argument("--ef-search", type=int, default=None, help="HNSW candidate list size (chroma)")
+    parser.add_argument("--rescore", type=int, default=None, help="candidates per result re-scored (int8, pq)")
+    parser.add_argument("--store", type=Path, default=None, help="benchmark Matryoshka truncation on this store")
+    parser.add_argument("--truncate", type=int, nargs="+", default=list(DEFAULT_TRUNCATIONS))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.store is not None:
+        results = run_truncation_benchmark(
+            args.store, args.truncate, top_k=args.top_k, **({"rescore": args.rescore} if args.rescore is not None else {})
+        )
+        print(format_results(results, args.top_k))
+        return
+
+    options: dict[str, dict[str, Any]] = {}
+    if args.nprobe is not None:
+        options["ivf"] = {"nprobe": args.nprobe}
+    if args.ef_search is not None:
+        options["chroma"] = {"ef_search": args.ef_search}
+    if args.rescore is not None:
+        options["int8"] = {"rescore": args.rescore}
+        options["pq"] = {"rescore": args.rescore}
+    results = run_benchmark(
+        args.sizes,
+        args.backends,
+        dimension=args.dimension,
+        queries=args.queries,
+        top_k=args.top_k,
+        options=options,
+        noise=args.noise,
+    )
+    print(format_results(results, args.top_k))
+
+
+if __name__ == "__main__":
+    main()
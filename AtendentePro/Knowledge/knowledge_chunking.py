@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, Protocol
+
+from AtendentePro.Knowledge.knowledge_tokens import count_tokens, tokenizer_name
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_CHUNK_OVERLAP = 200
+MIN_CHUNK_CHARS = 100
+
+DEFAULT_MAX_TOKENS = 400
+DEFAULT_MIN_TOKENS = 200
+
+_HEADING_MAX_CHARS = 90
+_MARKDOWN_HEADING = re.compile(r"^#{1,6}\s+\S")
+_SENTENCE = re.compile(r"\S.*?(?:[.!?;](?=\s)|\n|$)", re.S)
+_WORD = re.compile(r"\S+\s*")
+
+
+class Chunker(Protocol):
+    """Turns the text pieces of one document into chunk dicts.
+
+    Chunks have the shape ``{"content", "source", "start_pos", "end_pos"}``;
+    ``signature`` identifies the strategy and its settings so a change can
+    trigger a rebuild of the store.
+    """
+
+    @property
+    def signature(self) -> str: ...
+
+    def iter_chunks(self, source: str, segments: Iterable[str]) -> Iterator[dict[str, Any]]: ...
+
+
+def iter_text_chunks(
+    source: str,
+    segments: Iterable[str],
+    *,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    overlap: int = DEFAULT_CHUNK_OVERLAP,
+    min_chars: int = MIN_CHUNK_CHARS,
+) -> Iterator[dict[str, Any]]:
+    """Slide a ``chunk_size`` window over a document arriving in ``segments``.
+
+    Produces exactly the chunks of slicing the joined text every
+    ``chunk_size - overlap`` characters, but only keeps the text from the
+    current window onwards in memory.
+    """
+    step = chunk_size - overlap
+    if step <= 0:
+        raise ValueError(f"overlap ({overlap}) must be smaller than chunk_size ({chunk_size})")
+
+    buffer = ""  # text from absolute offset `offset` onwards
+    offset = 0
+    position = 0  # start of the next window
+    for segment in segments:
+        buffer += segment
+        while position + chunk_size <= offset + len(buffer):
+            chunk = buffer[position - offset : position - offset + chunk_size]
+            if len(chunk.strip()) > min_chars:
+                yield {"content": chunk, "source": source, "start_pos": position, "end_pos": position + chunk_size}
+            position += step
+        if position > offset:
+            buffer = buffer[position - offset :]
+            offset = position
+
+    total = offset + len(buffer)
+    while position < total:
+        chunk = buffer[position - offset : position - offset + chunk_size]
+        if len(chunk.strip()) > min_chars:
+            yield {"content": chunk, "source": source, "start_pos": position, "end_pos": min(position + chunk_size, total)}
+        position += step
+
+
+class CharacterChunker:
+    """Fixed ``chunk_size`` character windows overlapping by ``overlap`` characters."""
+
+    def __init__(
+        self,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        overlap: int = DEFAULT_CHUNK_OVERLAP,
+        min_chars: int = MIN_CHUNK_CHARS,
+    ) -> None:
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.min_chars = min_chars
+
+    @property
+    def signature(self) -> str:
+        return f"characters(chunk_size={self.chunk_size},overlap={self.overlap},min_chars={self.min_chars})"
+
+    def iter_chunks(self, source: str, segments: Iterable[str]) -> Iterator[dict[str, Any]]:
+        return iter_text_chunks(
+            source, segments, chunk_size=self.chunk_size, overlap=self.overlap, min_chars=self.min_chars
+        )
+
+
+@dataclass
+class _Block:
+    start: int
+    end: int
+    text: str
+    heading: bool = False
+    tokens: int = 0
+
+
+def _looks_like_heading(line: str, previous: str, previous_heading: bool) -> bool:
+    """Short, capitalised line without closing punctuation that starts a new thought."""
+    if len(line) > _HEADING_MAX_CHARS:
+        return False
+    if _MARKDOWN_HEADING.match(line):
+        return True
+    if line[-1] in ".,;:" or ": " in line or not (line[0].isupper() or line[0].isdigit()):
+        return False
+    return not previous or previous_heading or previous[-1] in ".!?:;"
+
+
+def _iter_blocks(segments: Iterable[str]) -> Iterator[_Block]:
+    """Split pages into headings and paragraphs; a page break always ends a paragraph."""
+    offset = 0
+    for segment in segments:
+        previous, previous_heading = "", False
+        lines: list[str] = []
+        start = end = offset
+        position = offset
+        for line in segment.splitlines(keepends=True):
+            line_start, position = position, position + len(line)
+            text = line.strip()
+            if not text:
+                if lines:
+                    yield _Block(start, end, "\n".join(lines))
+                    lines = []
+                previous, previous_heading = "", False
+                continue
+
+            text_start = line_start + len(line) - len(line.lstrip())
+            text_end = line_start + len(line.rstrip())
+            heading = _looks_like_heading(text, previous, previous_heading)
+            if heading:
+                if lines:
+                    yield _Block(start, end, "\n".join(lines))
+                    lines = []
+                yield _Block(text_start, text_end, text, heading=True)
+            else:
+                if not lines:
+                    start = text_start
+                lines.append(text)
+                end = text_end
+            previous, previous_heading = text, heading
+        if lines:
+            yield _Block(start, end, "\n".join(lines))
+        offset += len(segment)
+
+
+class StructuredChunker:
+    """Pack whole headings and paragraphs into chunks of at most ``max_tokens``.
+
+    Chunks never cut through a word, and a paragraph is only split (at
+    sentence and then word boundaries) when it alone exceeds ``max_tokens``.
+    A heading starts a new chunk once the current one holds ``min_tokens``,
+    and is never left dangling at the end of a chunk. Chunks do not
+    overlap; ``start_pos``/``end_pos`` span the source text they came from.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        min_tokens: int = DEFAULT_MIN_TOKENS,
+        model: str | None = None,
+    ) -> None:
+        if not 0 <= min_tokens <= max_tokens:
+            raise ValueError(f"min_tokens ({min_tokens}) must be between 0 and max_tokens ({max_tokens})")
+        self.max_tokens = max_tokens
+        self.min_tokens = min_tokens
+        self.model = model
+
+    @property
+    def signature(self) -> str:
+        # Boundaries depend on the tokenizer too, so installing tiktoken later rebuilds the store.
+        return (
+            f"structured(max_tokens={self.max_tokens},min_tokens={self.min_tokens},model={self.model},"
+            f"tokenizer={tokenizer_name(self.model)})"
+        )
+
+    def _sized_blocks(self, segments: Iterable[str]) -> Iterator[_Block]:
+        for block in _iter_blocks(segments):
+            block.tokens = count_tokens(block.text, self.model)
+            if block.tokens <= self.max_tokens:
+                yield block
+            else:
+                yield from self._split(block, _SENTENCE)
+
+    def _split(self, block: _Block, pattern: re.Pattern[str]) -> Iterator[_Block]:
+        """Split an oversized block at ``pattern`` matches, regrouped up to ``max_tokens``."""
+        current: list[re.Match[str]] = []
+        tokens = 0
+        for match in pattern.finditer(block.text):
+            piece_tokens = count_tokens(match.group(), self.model)
+            if piece_tokens > self.max_tokens and pattern is _SENTENCE:
+                if current:
+                    yield self._piece(block, current, tokens)
+                    current, tokens = [], 0
+                sentence = self._piece(block, [match], piece_tokens)
+                yield from self._split(sentence, _WORD)
+                continue
+            if current and tokens + piece_tokens > self.max_tokens:
+                yield self._piece(block, current, tokens)
+                current, tokens = [], 0
+            current.append(match)
+            tokens += piece_tokens
+        if current:
+            yield self._piece(block, current, tokens)
+
+    @staticmethod
+    def _piece(block: _Block, matches: list[re.Match[str]], tokens: int) -> _Block:
+        start, end = matches[0].start(), matches[-1].end()
+        return _Block(
+            min(block.start + start, block.end),
+            min(block.start + end, block.end),
+            block.text[start:end].strip(),
+            tokens=tokens,
+        )
+
+    def iter_chunks(self, source: str, segments: Iterable[str]) -> Iterator[dict[str, Any]]:
+        current: list[_Block] = []
+        tokens = 0
+        for block in self._sized_blocks(segments):
+            full = tokens + block.tokens > self.max_tokens
+            if current and (full or (block.heading and tokens >= self.min_tokens)):
+                carried: list[_Block] = []
+                while current and current[-1].heading:
+                    carried.insert(0, current.pop())
+                if current:
+                    yield self._chunk(source, current)
+                    current = carried
+                    tokens = sum(item.tokens for item in carried)
+                else:
+                    current = carried  # only headings so far: keep them with what follows
+            current.append(block)
+            tokens += block.tokens
+        if current:
+            yield self._chunk(source, current)
+
+    @staticmethod
+    def _chunk(source: str, blocks: list[_Block]) -> dict[str, Any]:
+        return {
+            "content": "\n".join(block.text for block in blocks),
+            "source": source,
+            "start_pos": blocks[0].start,
+            "end_pos": blocks[-1].end,
+        }
+
+
+CHUNKER_REGISTRY: dict[str, type] = {
+    "characters": CharacterChunker,
+    "structured": StructuredChunker,
+}
+
+
+def create_chunker(strategy: str = "structured", **options: Any) -> Chunker:
+    """Instantiate the chunker registered as ``strategy`` with ``options``."""
+    try:
+        chunker_class = CHUNKER_REGISTRY[strategy]
+    except KeyError:
+        raise ValueError(f"Unknown chunking strategy {strategy!r}; use one of {sorted(CHUNKER_REGISTRY)}") from None
+    return chunker_class(**options)
+
+
+def iter_unique_chunks(chunks: Iterable[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+    """Drop chunks whose text (ignoring case and whitespace) was already yielded for the same source.
+
+    Duplicates are only detected within a document: the store is refreshed
+    per source, so a chunk dropped in favour of another document's copy
+    would be lost when that document changes or is removed.
+    """
+    seen: set[tuple[str, bytes]] = set()
+    duplicates = 0
+    for chunk in chunks:
+        digest = hashlib.blake2b(" ".join(chunk["content"].split()).casefold().encode("utf-8"), digest_size=16)
+        key = (chunk["source"], digest.digest())
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        yield chunk
+    if duplicates:
+        logger.info("Skipped %d duplicate chunks", duplicates)
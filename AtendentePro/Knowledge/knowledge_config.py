@@ -1,16 +1,116 @@
 from __future__ import annotations
 
+import logging
 from functools import lru_cache
 from pathlib import Path
+from typing import Any, Literal
 
 import yaml
 from pydantic import BaseModel, Field
 
+logger = logging.getLogger(__name__)
+
+
+class ChunkingConfig(BaseModel):
+    strategy: str = Field(default="structured", description="Estratégia de divisão dos documentos em trechos.")
+    options: dict[str, Any] = Field(default_factory=dict, description="Parâmetros repassados ao chunker escolhido.")
+
+
+class EmbeddingConfig(BaseModel):
+    provider: str = Field(
+        default="openai", description="Provedor de embeddings (ver EMBEDDING_PROVIDER_REGISTRY)."
+    )
+    model: str = Field(default="text-embedding-3-large", description="Modelo de embedding dos trechos e perguntas.")
+    dimensions: int | None = Field(
+        default=None, description="Dimensão reduzida (Matryoshka) pedida à API; vazio usa o tamanho completo."
+    )
+    options: dict[str, Any] = Field(default_factory=dict, description="Parâmetros repassados ao provedor escolhido.")
+
+
+class ContextBudgetConfig(BaseModel):
+    max_tokens: int = Field(default=1500, description="Tokens máximos do contexto enviado à síntese.")
+    merge_gap: int = Field(
+        default=32, description="Distância máxima, em caracteres, para unir trechos vizinhos do mesmo documento."
+    )
+
+
+class SynthesisConfig(BaseModel):
+    mode: Literal["agent", "tool"] = Field(
+        default="agent",
+        description=(
+            "agent: o próprio Knowledge Agent redige a resposta a partir do contexto (em streaming); "
+            "tool: o go_to_rag faz uma chamada extra ao modelo e devolve a resposta pronta."
+        ),
+    )
+
+
+class QueryCacheConfig(BaseModel):
+    max_entries: int = Field(default=1024, description="Quantidade máxima de perguntas com embedding em memória.")
+    ttl_seconds: float | None = Field(default=3600.0, description="Validade de cada entrada; vazio não expira.")
+
+
+class AnswerCacheConfig(BaseModel):
+    enabled: bool = Field(
+        default=False,
+        description="Reaproveita respostas de perguntas equivalentes (só no modo de síntese tool).",
+    )
+    threshold: float = Field(default=0.95, description="Similaridade mínima entre as perguntas para reaproveitar.")
+    max_entries: int = Field(default=256, description="Conjuntos de trechos com respostas mantidas em memória.")
+    ttl_seconds: float | None = Field(default=3600.0, description="Validade de cada resposta; vazio não expira.")
+
+
+class HybridConfig(BaseModel):
+    enabled: bool = Field(default=True, description="Combina a busca vetorial com a busca lexical BM25.")
+    rrf_k: int = Field(default=60, description="Constante k da fusão por posição recíproca (RRF).")
+    candidates: int = Field(default=20, description="Candidatos de cada busca considerados na fusão.")
+
+
+class IndexConfig(BaseModel):
+    backend: str = Field(default="brute_force", description="Backend de busca vetorial (ver INDEX_BACKEND_REGISTRY).")
+    options: dict[str, Any] = Field(default_factory=dict, description="Parâmetros repassados ao backend escolhido.")
+    hybrid: HybridConfig = Field(
+        default_factory=HybridConfig, description="Fusão da busca vetorial com o índice invertido BM25."
+    )
+
+
+class RerankConfig(BaseModel):
+    enabled: bool = Field(default=False, description="Reordena os trechos recuperados com um cross-encoder local.")
+    model: str = Field(
+        default="cross-encoder/mmarco-mMiniLMv2-L12-H384-v1",
+        description="Modelo cross-encoder do sentence-transformers.",
+    )
+    candidates: int = Field(default=10, description="Trechos recuperados antes da reordenação.")
+    batch_size: int = Field(default=8, description="Pares pergunta/trecho avaliados por lote.")
+    budget_ms: float | None = Field(default=200.0, description="Tempo máximo de reordenação; vazio não limita.")
+    max_length: int = Field(default=512, description="Tokens máximos por par pergunta/trecho.")
+
 
 class KnowledgeConfig(BaseModel):
     about: str = Field(description="Texto listando os documentos de referência.")
     format: str = Field(description="Instruções de formatação para a resposta.")
     template: str = Field(description="Resumo estruturado dos documentos disponíveis.")
+    embedding: EmbeddingConfig = Field(
+        default_factory=EmbeddingConfig, description="Modelo e dimensão dos embeddings."
+    )
+    chunking: ChunkingConfig = Field(
+        default_factory=ChunkingConfig, description="Como os documentos são divididos antes do embedding."
+    )
+    index: IndexConfig = Field(default_factory=IndexConfig, description="Como os trechos são buscados.")
+    rerank: RerankConfig = Field(
+        default_factory=RerankConfig, description="Reordenação dos trechos por um cross-encoder local."
+    )
+    context_budget: ContextBudgetConfig = Field(
+        default_factory=ContextBudgetConfig, description="Montagem do contexto da síntese dentro de um orçamento."
+    )
+    synthesis: SynthesisConfig = Field(
+        default_factory=SynthesisConfig, description="Quem redige a resposta a partir dos trechos recuperados."
+    )
+    query_cache: QueryCacheConfig = Field(
+        default_factory=QueryCacheConfig, description="Cache dos embeddings de perguntas repetidas."
+    )
+    answer_cache: AnswerCacheConfig = Field(
+        default_factory=AnswerCacheConfig, description="Cache semântico das respostas sintetizadas."
+    )
 
     @classmethod
     @lru_cache(maxsize=1)
@@ -18,4 +118,11 @@ class KnowledgeConfig(BaseModel):
         if path is None:
             path = Path(__file__).resolve().parents[1] / "Template" / "White_Martins" / "knowledge_config.yaml"
         data = yaml.safe_load(path.read_text(encoding="utf-8"))
-        return cls(**data)
+        settings = cls(**data)
+        if settings.answer_cache.enabled and settings.synthesis.mode == "agent":
+            logger.warning(
+                "answer_cache.enabled has no effect with synthesis.mode 'agent' in %s: the Knowledge Agent "
+                "writes every answer itself, so only synthesis.mode 'tool' answers are cached",
+                path,
+            )
+        return settings
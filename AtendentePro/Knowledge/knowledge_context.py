@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+from pydantic import BaseModel, Field
+
+from AtendentePro.Knowledge.knowledge_tokens import CHARS_PER_TOKEN, count_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTEXT_TOKENS = 1500
+# Chunks of one document separated by at most this many characters are merged.
+DEFAULT_MERGE_GAP = 32
+# Longest text overlap looked for when the chunk positions cannot be trusted.
+MAX_TEXT_OVERLAP = 2000
+SECTION_SEPARATOR = "\n\n"
+
+
+class ContextSection(BaseModel):
+    source: str = Field(description="Documento de origem.")
+    content: str = Field(description="Texto enviado ao modelo, já sem repetições.")
+    start_pos: int = Field(default=0, description="Início do trecho no documento.")
+    end_pos: int = Field(default=0, description="Fim do trecho no documento.")
+    rows: list[int] = Field(default_factory=list, description="Trechos do acervo combinados nesta seção.")
+    tokens: int = Field(default=0, description="Tokens da seção formatada.")
+    truncated: bool = Field(default=False, description="Se o texto foi cortado para caber no orçamento.")
+
+    def render(self) -> str:
+        return f"Documento: {self.source}\nConteúdo: {self.content}"
+
+
+class PackedContext(BaseModel):
+    text: str = Field(default="", description="Contexto final enviado à síntese.")
+    sections: list[ContextSection] = Field(default_factory=list, description="Seções incluídas, por relevância.")
+    tokens: int = Field(default=0, description="Tokens estimados do contexto.")
+    budget: int = Field(default=DEFAULT_CONTEXT_TOKENS, description="Orçamento de tokens do contexto.")
+    input_chunks: int = Field(default=0, description="Trechos recuperados antes da montagem.")
+    dropped_sections: int = Field(default=0, description="Seções que não couberam no orçamento.")
+
+    @property
+    def sources(self) -> list[str]:
+        return list(dict.fromkeys(section.source for section in self.sections))
+
+
+@dataclass
+class _Passage:
+    source: str
+    content: str
+    start: int
+    end: int
+    rank: int
+    rows: list[int]
+
+
+def _text_overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of ``left`` that is a prefix of ``right``."""
+    for size in range(min(len(left), len(right), MAX_TEXT_OVERLAP), 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _join(left: _Passage, right: _Passage) -> str:
+    overlap = left.end - right.start
+    if 0 < overlap <= len(right.content) and left.content.endswith(right.content[:overlap]):
+        return left.content + right.content[overlap:]
+    overlap = _text_overlap(left.content, right.content) if overlap > 0 else 0
+    if overlap:
+        return left.content + right.content[overlap:]
+    return f"{left.content.rstrip()}\n{right.content.lstrip()}"
+
+
+def merge_passages(results: Iterable[dict[str, Any]], merge_gap: int = DEFAULT_MERGE_GAP) -> list[_Passage]:
+    """Merge overlapping and adjacent chunks of the same document, most relevant first.
+
+    ``results`` are ``KnowledgeIndex.search`` dicts in relevance order. Text
+    repeated by the chunk overlap is kept once, chunks contained in another
+    one are dropped, and each merged passage ranks as its best chunk.
+    """
+    by_source: dict[str, list[_Passage]] = {}
+    for rank, result in enumerate(results):
+        chunk = result.get("chunk", {}) or {}
+        content = chunk.get("content", "")
+        if not content.strip():
+            continue
+        start = int(chunk.get("start_pos", 0) or 0)
+        end = int(chunk.get("end_pos", start + len(content)) or start + len(content))
+        source = chunk.get("source", "Desconhecido")
+        row = result.get("index")
+        rows = [int(row)] if row is not None else []
+        by_source.setdefault(source, []).append(_Passage(source, content, start, end, rank, rows))
+
+    merged: list[_Passage] = []
+    for passages in by_source.values():
+        passages.sort(key=lambda passage: (passage.start, -passage.end))
+        current = passages[0]
+        for passage in passages[1:]:
+            duplicate = passage.content == current.content
+            if duplicate or passage.end <= current.end or passage.start <= current.end + merge_gap:
+                if not duplicate and passage.end > current.end:
+                    current.content = _join(current, passage)
+                    current.end = passage.end
+                current.rank = min(current.rank, passage.rank)
+                current.rows.extend(passage.rows)
+                continue
+            merged.append(current)
+            current = passage
+        merged.append(current)
+    merged.sort(key=lambda passage: passage.rank)
+    return merged
+
+
+def _truncate(text: str, max_tokens: int, model: str | None) -> str:
+    """Longest word-aligned prefix of ``text`` within ``max_tokens``."""
+    if max_tokens <= 0:
+        return ""
+    cut = min(len(text), max_tokens * CHARS_PER_TOKEN)
+    while cut > 0:
+        candidate = text[:cut]
+        if cut < len(text) and " " in candidate:
+            candidate = candidate[: candidate.rfind(" ")]
+        candidate = candidate.rstrip() + " […]"
+        if count_tokens(candidate, model) <= max_tokens:
+            return candidate
+        cut = int(cut * 0.9)
+    return ""
+
+
+def pack_context(
+    results: Iterable[dict[str, Any]],
+    *,
+    max_tokens: int = DEFAULT_CONTEXT_TOKENS,
+    merge_gap: int = DEFAULT_MERGE_GAP,
+    model: str | None = None,
+) -> PackedContext:
+    """Build the synthesis context from retrieved chunks within ``max_tokens``.
+
+    Overlapping and adjacent chunks are merged first. Sections are then
+    added by relevance while they fit; one that does not fit is skipped in
+    favour of smaller, less relevant ones. Only the most relevant section
+    is cut (at a word boundary) when it alone exceeds the budget, so the
+    context is never empty when something was retrieved.
+    """
+    results = list(results)
+    packed = PackedContext(budget=max_tokens, input_chunks=len(results))
+    separator_tokens = count_tokens(SECTION_SEPARATOR, model)
+    used = 0
+    for passage in merge_passages(results, merge_gap):
+        section = ContextSection(
+            source=passage.source,
+            content=passage.content,
+            start_pos=passage.start,
+            end_pos=passage.end,
+            rows=passage.rows,
+        )
+        cost = count_tokens(section.render(), model) + (separator_tokens if packed.sections else 0)
+        if used + cost > max_tokens:
+            if packed.sections:
+                packed.dropped_sections += 1
+                continue
+            header_tokens = count_tokens(ContextSection(source=passage.source, content="").render(), model)
+            section.content = _truncate(passage.content, max_tokens - header_tokens, model)
+            section.truncated = True
+            if not section.content:
+                packed.dropped_sections += 1
+                continue
+            cost = count_tokens(section.render(), model)
+        section.tokens = cost
+        packed.sections.append(section)
+        used += cost
+
+    packed.text = SECTION_SEPARATOR.join(section.render() for section in packed.sections)
+    packed.tokens = count_tokens(packed.text, model)
+    return packed
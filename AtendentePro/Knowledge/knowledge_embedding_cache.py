@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILENAME = "embedding_cache.sqlite"
+
+
+def hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCacheStats(BaseModel):
+    hits: int = Field(default=0, description="Consultas atendidas pelo cache.")
+    misses: int = Field(default=0, description="Consultas que exigiram novo embedding.")
+    entries: int = Field(default=0, description="Entradas persistidas no cache.")
+    evicted: int = Field(default=0, description="Entradas removidas por não serem mais referenciadas.")
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class EmbeddingCache:
+    """Persistent embedding cache keyed by ``(model, sha256(text))``.
+
+    Backed by SQLite so it survives rebuilds and is safe to share between
+    the threads of one ingestion run.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+            """
+        )
+        self._connection.commit()
+        self._hits = 0
+        self._misses = 0
+        self._evicted = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return int(count)
+
+    @property
+    def stats(self) -> EmbeddingCacheStats:
+        return EmbeddingCacheStats(hits=self._hits, misses=self._misses, entries=len(self), evicted=self._evicted)
+
+    def get_many(self, model: str, texts: Sequence[str]) -> list[list[float] | None]:
+        """Return cached vectors for ``texts`` (``None`` where missing) and update hit stats."""
+        hashes = [hash_text(text) for text in texts]
+        found: dict[str, list[float]] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                batch = unique[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    (model, *batch),
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                self._connection.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(time.time(), model, text_hash) for text_hash in found],
+                )
+                self._connection.commit()
+
+        results = [found.get(text_hash) for text_hash in hashes]
+        hits = sum(vector is not None for vector in results)
+        self._hits += hits
+        self._misses += len(results) - hits
+        return results
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[Sequence[float] | None]) -> None:
+        now = time.time()
+        rows = [
+            (model, hash_text(text), len(vector), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+            if vector is not None
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, dimension, vector, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._connection.commit()
+
+    def prune(self, model: str, referenced_texts: Iterable[str]) -> int:
+        """Evict ``model`` entries whose text is no longer referenced by any document."""
+        keep = {(hash_text(text),) for text in referenced_texts}
+        with self._lock:
+            self._connection.execute("CREATE TEMP TABLE IF NOT EXISTS keep_hashes (text_hash TEXT PRIMARY KEY)")
+            self._connection.execute("DELETE FROM keep_hashes")
+            self._connection.executemany("INSERT OR IGNORE INTO keep_hashes VALUES (?)", keep)
+            cursor = self._connection.execute(
+                "DELETE FROM embeddings WHERE model = ? AND text_hash NOT IN (SELECT text_hash FROM keep_hashes)",
+                (model,),
+            )
+            self._connection.execute("DELETE FROM keep_hashes")
+            self._connection.commit()
+            removed = cursor.rowcount
+        self._evicted += removed
+        if removed:
+            logger.info("Evicted %d unreferenced embeddings from %s", removed, self.path)
+        return removed
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Protocol, Sequence, runtime_checkable
+
+import numpy as np
+
+from AtendentePro.Knowledge.knowledge_config import KnowledgeConfig
+from AtendentePro.Knowledge.knowledge_search import truncate_rows
+from AtendentePro.Knowledge.knowledge_store import DEFAULT_EMBEDDING_MODEL
+
+logger = logging.getLogger(__name__)
+
+# Multilingual (Portuguese included), 384 dimensions, a few ms per query on a CPU.
+DEFAULT_LOCAL_EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+DEFAULT_LOCAL_BATCH_SIZE = 32
+
+
+@runtime_checkable
+class EmbeddingProvider(Protocol):
+    """Turns texts into embedding rows for ingestion and for questions.
+
+    ``model`` is the embedding model id recorded in the store header, so the
+    questions are always embedded by the model that embedded the chunks.
+    """
+
+    name: str
+    default_model: str
+
+    def embed(self, texts: Sequence[str], *, model: str, dimensions: int | None = None) -> np.ndarray:
+        """Embed ``texts`` and return a ``(len(texts), dim)`` ``float32`` matrix."""
+        ...
+
+    async def aembed(self, texts: Sequence[str], *, model: str, dimensions: int | None = None) -> np.ndarray:
+        """Async :meth:`embed`; must not block the event loop."""
+        ...
+
+
+class OpenAIEmbeddingProvider:
+    """Embeddings API of an ``OpenAI`` / ``AsyncOpenAI`` (or compatible) client.
+
+    Without a ``client``, :meth:`aembed` uses the pooled shared client and
+    :meth:`embed` a sync client created on first use.
+    """
+
+    name = "openai"
+
+    def __init__(self, model: str = DEFAULT_EMBEDDING_MODEL, client: Any | None = None) -> None:
+        self.default_model = model
+        self.client = client
+        self._sync_client: Any | None = None
+
+    def _request(self, texts: Sequence[str], model: str, dimensions: int | None) -> dict[str, Any]:
+        options = {"dimensions": dimensions} if dimensions is not None else {}
+        return {"model": model, "input": list(texts), **options}
+
+    @staticmethod
+    def _rows(response: Any) -> np.ndarray:
+        items = sorted(response.data, key=lambda item: item.index)
+        return np.asarray([item.embedding for item in items], dtype=np.float32)
+
+    def embed(self, texts: Sequence[str], *, model: str, dimensions: int | None = None) -> np.ndarray:
+        client = self.client
+        if client is None:
+            if self._sync_client is None:
+                import openai
+
+                from AtendentePro import config
+
+                self._sync_client = openai.OpenAI(api_key=config.OPENAI_API_KEY)
+            client = self._sync_client
+        return self._rows(client.embeddings.create(**self._request(texts, model, dimensions)))
+
+    async def aembed(self, texts: Sequence[str], *, model: str, dimensions: int | None = None) -> np.ndarray:
+        client = self.client
+        if client is None:
+            from AtendentePro.utils.openai_client import get_async_openai_client
+
+            client = get_async_openai_client()
+        return self._rows(await client.embeddings.create(**self._request(texts, model, dimensions)))
+
+
+class SentenceTransformerProvider:
+    """Local ``sentence-transformers`` model on the CPU: no network, single-digit ms per question.
+
+    The model is loaded once and shared. Encoding runs in a small thread pool
+    (``max_workers``), so async callers never block the event loop and the
+    number of concurrent encodes is bounded. ``dimensions`` keeps the first
+    components of each row and renormalises them, so only Matryoshka-trained
+    models should be shortened this way.
+    """
+
+    name = "sentence_transformers"
+
+    def __init__(
+        self,
+        model: str = DEFAULT_LOCAL_EMBEDDING_MODEL,
+        *,
+        device: str = "cpu",
+        batch_size: int = DEFAULT_LOCAL_BATCH_SIZE,
+        max_workers: int = 1,
+        encoder: Any | None = None,
+    ) -> None:
+        self.default_model = model
+        self.device = device
+        self.batch_size = max(1, batch_size)
+        self._encoder = encoder
+        self._load_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="embedding")
+
+    @property
+    def encoder(self) -> Any:
+        with self._load_lock:
+            if self._encoder is None:
+                from sentence_transformers import SentenceTransformer
+
+                self._encoder = SentenceTransformer(self.default_model, device=self.device)
+                logger.info("Loaded local embedding model %s on %s", self.default_model, self.device)
+            return self._encoder
+
+    def embed(self, texts: Sequence[str], *, model: str, dimensions: int | None = None) -> np.ndarray:
+        if model != self.default_model:
+            raise ValueError(
+                f"Vectors of {model} cannot be produced by the local provider, which loads {self.default_model}"
+            )
+        rows = self.encoder.encode(
+            list(texts),
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        rows = np.atleast_2d(np.asarray(rows, dtype=np.float32))
+        return truncate_rows(rows, dimensions) if dimensions is not None else rows
+
+    async def aembed(self, texts: Sequence[str], *, model: str, dimensions: int | None = None) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        encode = partial(self.embed, texts, model=model, dimensions=dimensions)
+        return await loop.run_in_executor(self._executor, encode)
+
+
+EMBEDDING_PROVIDER_REGISTRY: dict[str, type] = {
+    OpenAIEmbeddingProvider.name: OpenAIEmbeddingProvider,
+    SentenceTransformerProvider.name: SentenceTransformerProvider,
+}
+
+
+def create_embedding_provider(name: str = "openai", **options: Any) -> EmbeddingProvider:
+    """Instantiate the provider registered as ``name`` with ``options``."""
+    try:
+        provider_class = EMBEDDING_PROVIDER_REGISTRY[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown embedding provider {name!r}; use one of {sorted(EMBEDDING_PROVIDER_REGISTRY)}"
+        ) from None
+    return provider_class(**options)
+
+
+def as_embedding_provider(client: Any) -> EmbeddingProvider:
+    """``client`` itself when it is a provider, otherwise an OpenAI-compatible client wrapped in one."""
+    if isinstance(client, EmbeddingProvider):
+        return client
+    return OpenAIEmbeddingProvider(client=client)
+
+
+_provider: EmbeddingProvider | None = None
+_provider_lock = threading.Lock()
+
+
+def get_embedding_provider() -> EmbeddingProvider:
+    """Return the process-wide provider selected by ``embedding.provider`` in ``knowledge_config.yaml``."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            settings = KnowledgeConfig.load().embedding
+            _provider = create_embedding_provider(settings.provider, model=settings.model, **settings.options)
+        return _provider
@@ -0,0 +1,356 @@
+from __future__ import annotations
+
+import itertools
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from multiprocessing.connection import Connection, wait
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+from typing import Any, Callable, Iterator, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGES_PER_TASK = 50
+DEFAULT_FILE_TIMEOUT = 120.0
+
+# Worker functions live at module level so worker processes can pickle them.
+
+
+def pdf_page_count(path: str) -> int:
+    import fitz  # PyMuPDF
+
+    with fitz.open(path) as document:
+        return document.page_count
+
+
+def extract_pdf_page_texts(path: str, start: int = 0, stop: int | None = None) -> list[str]:
+    """Text of each page in ``[start, stop)`` of a PDF, falling back to PyPDF2."""
+    try:
+        import fitz  # PyMuPDF
+
+        with fitz.open(path) as document:
+            stop = document.page_count if stop is None else min(stop, document.page_count)
+            return [document[page].get_text() for page in range(start, stop)]
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("PyMuPDF failed for %s, trying PyPDF2: %s", path, exc)
+
+    import PyPDF2
+
+    with open(path, "rb") as file:
+        reader = PyPDF2.PdfReader(file)
+        return [page.extract_text() or "" for page in reader.pages[start:stop]]
+
+
+def extract_pdf_pages(path: str, start: int = 0, stop: int | None = None) -> str:
+    """Extract pages ``[start, stop)`` of a PDF as one string."""
+    return "".join(extract_pdf_page_texts(path, start, stop))
+
+
+def extract_pptx(path: str) -> str:
+    from pptx import Presentation
+
+    presentation = Presentation(path)
+    return "".join(
+        shape.text + "\n"
+        for slide in presentation.slides
+        for shape in slide.shapes
+        if hasattr(shape, "text")
+    )
+
+
+def extract_docx(path: str) -> str:
+    import docx
+
+    document = docx.Document(path)
+    return "".join(paragraph.text + "\n" for paragraph in document.paragraphs)
+
+
+EXTRACTORS = {
+    ".pdf": extract_pdf_pages,
+    ".pptx": extract_pptx,
+    ".docx": extract_docx,
+}
+
+
+def extract_document(path: str | Path) -> str | None:
+    """Extract a whole document; ``None`` for unsupported types, ``""`` on failure."""
+    path = Path(path)
+    extractor = EXTRACTORS.get(path.suffix.lower())
+    if extractor is None:
+        logger.warning("Unsupported file type: %s", path.suffix.lower())
+        return None
+    try:
+        return extractor(str(path))
+    except Exception as exc:  # noqa: BLE001
+        logger.error("Failed to extract text from %s: %s", path, exc)
+        return ""
+
+
+def _extract_task(path: str, start: int, stop: int | None) -> list[str]:
+    """One text per page for PDFs, a single text for other documents."""
+    if Path(path).suffix.lower() == ".pdf":
+        return extract_pdf_page_texts(path, start, stop)
+    return [EXTRACTORS[Path(path).suffix.lower()](path)]
+
+
+def _run_task(conn: Connection, func: Callable[..., Any], args: tuple[Any, ...]) -> None:
+    """Child-process entry point: send ``(True, result)`` or ``(False, error)`` back through ``conn``."""
+    try:
+        outcome: tuple[bool, Any] = (True, func(*args))
+    except Exception as exc:  # noqa: BLE001
+        outcome = (False, exc)
+    try:
+        conn.send(outcome)
+    except Exception as exc:  # noqa: BLE001 - e.g. an exception type that cannot be pickled
+        conn.send((False, RuntimeError(f"{type(exc).__name__}: {exc}")))
+    finally:
+        conn.close()
+
+
+class _TaskRunner:
+    """Run each task in its own process, at most ``processes`` at a time.
+
+    Every task gets ``timeout`` seconds from the moment it starts and is
+    killed when it overruns, so a corrupt file costs its own timeout and
+    never holds a slot that later files wait for; a worker that crashes is
+    reported as that task's error. Tasks start as the caller waits for
+    results, in submission order.
+    """
+
+    def __init__(self, processes: int, timeout: float) -> None:
+        self.processes = max(1, processes)
+        self.timeout = timeout
+        self._context = multiprocessing.get_context()
+        self._queue: deque[tuple[int, Callable[..., Any], tuple[Any, ...]]] = deque()
+        self._running: dict[int, tuple[BaseProcess, Connection, float]] = {}
+        self._done: dict[int, tuple[bool, Any]] = {}
+        self._ids = itertools.count()
+
+    def submit(self, func: Callable[..., Any], args: tuple[Any, ...]) -> int:
+        task_id = next(self._ids)
+        self._queue.append((task_id, func, args))
+        self._start()
+        return task_id
+
+    def result(self, task_id: int) -> Any:
+        """Wait for a task; raise its error, or :class:`multiprocessing.TimeoutError` if it was killed."""
+        while task_id not in self._done:
+            if task_id not in self._running and all(queued[0] != task_id for queued in self._queue):
+                raise KeyError(task_id)
+            self._step()
+        succeeded, value = self._done.pop(task_id)
+        if succeeded:
+            return value
+        raise value
+
+    def discard(self, task_id: int) -> None:
+        """Forget a task, killing it if it is running."""
+        self._queue = deque(queued for queued in self._queue if queued[0] != task_id)
+        self._done.pop(task_id, None)
+        running = self._running.pop(task_id, None)
+        if running is not None:
+            self._stop(*running[:2])
+        self._start()
+
+    def close(self) -> None:
+        for process, conn, _ in self._running.values():
+            self._stop(process, conn)
+        self._running.clear()
+        self._queue.clear()
+        self._done.clear()
+
+    def _start(self) -> None:
+        while self._queue and len(self._running) < self.processes:
+            task_id, func, args = self._queue.popleft()
+            receiver, sender = self._context.Pipe(duplex=False)
+            process = self._context.Process(target=_run_task, args=(sender, func, args), daemon=True)
+            process.start()
+            sender.close()
+            self._running[task_id] = (process, receiver, time.monotonic())
+
+    def _step(self) -> None:
+        """Wait until a running task finishes or the oldest one runs out of time."""
+        oldest = min(started for _, _, started in self._running.values())
+        ready = wait(
+            [conn for _, conn, _ in self._running.values()], timeout=max(0.0, oldest + self.timeout - time.monotonic())
+        )
+        now = time.monotonic()
+        for task_id, (process, conn, started) in list(self._running.items()):
+            if conn in ready:
+                try:
+                    self._done[task_id] = conn.recv()
+                except EOFError:
+                    process.join()
+                    self._done[task_id] = (False, RuntimeError(f"worker exited with code {process.exitcode}"))
+            elif now - started >= self.timeout:
+                self._done[task_id] = (False, multiprocessing.TimeoutError(f"killed after {self.timeout:.0f}s"))
+            else:
+                continue
+            del self._running[task_id]
+            self._stop(process, conn)
+        self._start()
+
+    @staticmethod
+    def _stop(process: BaseProcess, conn: Connection) -> None:
+        if process.is_alive():
+            process.kill()
+        process.join()
+        conn.close()
+
+
+def _submit_page_count(runner: _TaskRunner, path: Path) -> int | None:
+    """Count the pages of a PDF in a worker process, so no PDF is opened in this one."""
+    return runner.submit(pdf_page_count, (str(path),)) if path.suffix.lower() == ".pdf" else None
+
+
+def _page_count(runner: _TaskRunner, task_id: int | None, path: Path) -> int:
+    """Page count from the runner, or ``0`` (one whole-file task) when it fails or times out."""
+    if task_id is None:
+        return 0
+    try:
+        return runner.result(task_id)
+    except multiprocessing.TimeoutError:
+        logger.error("Timed out counting pages of %s after %.0fs; extracting it as one task", path.name, runner.timeout)
+    except Exception:  # noqa: BLE001 - let the extraction task surface the error and fallback
+        pass
+    return 0
+
+
+def _plan_tasks(path: Path, pages_per_task: int, pages: int) -> list[tuple[str, int, int | None]]:
+    """Split PDFs of more than ``pages_per_task`` pages into page ranges; everything else is one task."""
+    if path.suffix.lower() == ".pdf" and pages > pages_per_task:
+        return [(str(path), start, start + pages_per_task) for start in range(0, pages, pages_per_task)]
+    return [(str(path), 0, None)]
+
+
+def _supported_paths(paths: Sequence[Path | str]) -> list[Path]:
+    supported = []
+    for path in map(Path, paths):
+        if path.suffix.lower() in EXTRACTORS:
+            supported.append(path)
+        else:
+            logger.warning("Unsupported file type: %s", path.suffix.lower())
+    return supported
+
+
+def extract_documents_parallel(
+    paths: Sequence[Path | str],
+    *,
+    max_workers: int | None = None,
+    pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+    timeout: float = DEFAULT_FILE_TIMEOUT,
+) -> dict[str, str]:
+    """Extract many documents across worker processes.
+
+    Large PDFs are split into ``pages_per_task`` page ranges that run in
+    parallel and are joined back in order. Each task (a page count, a page
+    range or a whole file) gets ``timeout`` seconds once it starts; files
+    that fail or time out are logged and left out, and stuck workers are
+    killed so a corrupt document cannot stall the run.
+
+    Returns ``{file name: text}`` for every supported file.
+    """
+    supported = _supported_paths(paths)
+    if not supported:
+        return {}
+
+    workers = max_workers or min(len(supported) * 2, os.cpu_count() or 1)
+    texts: dict[str, str] = {}
+
+    runner = _TaskRunner(workers, timeout)
+    try:
+        counts = {path: _submit_page_count(runner, path) for path in supported}
+        pending = {
+            path: [
+                runner.submit(_extract_task, task)
+                for task in _plan_tasks(path, pages_per_task, _page_count(runner, counts[path], path))
+            ]
+            for path in supported
+        }
+        for path, task_ids in pending.items():
+            try:
+                parts = [runner.result(task_id) for task_id in task_ids]
+            except multiprocessing.TimeoutError:
+                logger.error("Timed out extracting %s after %.0fs; skipping it", path.name, timeout)
+                continue
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Failed to extract text from %s: %s", path, exc)
+                texts[path.name] = ""
+                continue
+            finally:
+                for task_id in task_ids:
+                    runner.discard(task_id)
+            texts[path.name] = "".join(text for part in parts for text in part)
+    finally:
+        runner.close()
+    return texts
+
+
+def iter_extracted_segments(
+    paths: Sequence[Path | str],
+    *,
+    max_workers: int | None = None,
+    pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+    timeout: float = DEFAULT_FILE_TIMEOUT,
+    prefetch: int | None = None,
+) -> Iterator[tuple[str, str | None]]:
+    """Yield ``(file name, text)`` pieces in document order as the workers produce them.
+
+    PDFs are yielded one page per piece; other documents as a single piece.
+
+    Unlike :func:`extract_documents_parallel` nothing is accumulated: at
+    most ``prefetch`` page ranges (default twice the workers) are in flight
+    or waiting to be consumed, so memory is bounded by the task size rather
+    than the corpus. Each task gets ``timeout`` seconds once it starts. A
+    file that fails or times out yields ``(name, None)`` once and its
+    remaining pieces are dropped.
+    """
+    supported = _supported_paths(paths)
+    if not supported:
+        return
+
+    workers = max(1, max_workers or min(len(supported) * 2, os.cpu_count() or 1))
+    in_flight: deque[tuple[str, int]] = deque()
+    failed: set[str] = set()
+
+    runner = _TaskRunner(workers, timeout)
+    # Pages are counted as each file is planned, so the count runs next to the page ranges in flight.
+    tasks = (
+        (path.name, task)
+        for path in supported
+        for task in _plan_tasks(path, pages_per_task, _page_count(runner, _submit_page_count(runner, path), path))
+    )
+
+    def submit_next() -> None:
+        for name, task in tasks:
+            if name not in failed:
+                in_flight.append((name, runner.submit(_extract_task, task)))
+                return
+
+    try:
+        for _ in range(prefetch or workers * 2):
+            submit_next()
+        while in_flight:
+            name, task_id = in_flight.popleft()
+            if name in failed:
+                runner.discard(task_id)
+                submit_next()
+                continue
+            try:
+                pieces: list[str | None] = runner.result(task_id)
+            except multiprocessing.TimeoutError:
+                logger.error("Timed out extracting %s after %.0fs; skipping it", name, timeout)
+                failed.add(name)
+                pieces = [None]
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Failed to extract text from %s: %s", name, exc)
+                failed.add(name)
+                pieces = [None]
+            submit_next()
+            for text in pieces:
+                yield name, text
+    finally:
+        runner.close()
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import logging
+import threading
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from AtendentePro.Knowledge.knowledge_backends import BruteForceBackend, IndexBackend, create_index_backend
+from AtendentePro.Knowledge.knowledge_config import HybridConfig, KnowledgeConfig
+from AtendentePro.Knowledge.knowledge_lexical import BM25Index, load_lexical_index, reciprocal_rank_fusion
+from AtendentePro.Knowledge.knowledge_search import normalize_rows, score_top_k_batch
+from AtendentePro.Knowledge.knowledge_store import DEFAULT_STORE_DIR, HEADER_FILENAME, EmbeddingStore
+
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeIndex:
+    """Loaded-once view over the knowledge embedding store shared by every request.
+
+    The vectors are memory-mapped from the store, so worker processes share
+    the same pages. Reloading opens the new store version off to the side and
+    swaps it in under a lock, so concurrent readers always see a consistent
+    ``(matrix, store)`` pair.
+
+    Single queries go through the ``backend`` (see ``knowledge_backends``),
+    rebuilt for every store version; an ANN backend that fails to build
+    falls back to brute force. With ``hybrid`` enabled, searches that carry
+    the question text also query a BM25 index of the same chunks and fuse
+    both rankings with reciprocal rank fusion.
+    """
+
+    def __init__(
+        self,
+        path: Path | str = DEFAULT_STORE_DIR,
+        backend: str = "brute_force",
+        backend_options: dict[str, Any] | None = None,
+        hybrid: HybridConfig | None = None,
+    ) -> None:
+        self.path = Path(path)
+        self.backend_name = backend
+        self.backend_options = dict(backend_options or {})
+        self.hybrid = hybrid or HybridConfig(enabled=False)
+        create_index_backend(backend, **self.backend_options)  # fail fast on a bad configuration
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._store: EmbeddingStore | None = None
+        self._backend: IndexBackend = BruteForceBackend()
+        self._lexical: BM25Index | None = None
+        self._fingerprint: tuple[int, int] | None = None
+
+    @property
+    def size(self) -> int:
+        return self._matrix.shape[0]
+
+    @property
+    def loaded(self) -> bool:
+        return self._fingerprint is not None
+
+    @property
+    def store(self) -> EmbeddingStore | None:
+        return self._store
+
+    def _stat(self) -> tuple[int, int] | None:
+        try:
+            stat = (self.path / HEADER_FILENAME).stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self) -> bool:
+        """Open the store from disk and swap it in. Returns ``True`` on success."""
+        with self._reload_lock:
+            return self._reload_locked()
+
+    def reload_if_changed(self) -> bool:
+        """Reload only when the store header differs from the loaded copy."""
+        if self._stat() == self._fingerprint:
+            return False
+        with self._reload_lock:
+            # Another caller may have reloaded while we were waiting for the lock.
+            fingerprint = self._stat()
+            if fingerprint == self._fingerprint or (fingerprint is None and self.loaded):
+                return False
+            return self._reload_locked()
+
+    def _reload_locked(self) -> bool:
+        fingerprint = self._stat()
+        if fingerprint is None:
+            if (self.path / "embeddings.pkl").exists():
+                logger.error(
+                    "Only a legacy embeddings.pkl was found in %s; convert it with "
+                    "`python -m AtendentePro.Knowledge.knowledge_store %s`",
+                    self.path,
+                    self.path / "embeddings.pkl",
+                )
+            else:
+                logger.error("Embedding store not found: %s", self.path)
+            return False
+        try:
+            store = EmbeddingStore.open(self.path)
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Failed to open embedding store %s: %s", self.path, exc, exc_info=True)
+            return False
+
+        # Kept memory-mapped even for half-precision stores: scoring converts rows to float32 in blocks or per
+        # candidate, so every process shares the same page cache instead of holding a private float32 copy.
+        matrix = store.vectors
+
+        backend = self._build_backend(matrix, store)
+        lexical = self._load_lexical(store)
+
+        with self._lock:
+            self._matrix = matrix
+            self._store = store
+            self._backend = backend
+            self._lexical = lexical
+            self._fingerprint = fingerprint
+        logger.info("Knowledge index loaded store %s (%d chunks) from %s", store.version, len(store), self.path)
+        return True
+
+    def _build_backend(self, matrix: np.ndarray, store: EmbeddingStore) -> IndexBackend:
+        backend = create_index_backend(self.backend_name, **self.backend_options)
+        try:
+            backend.build(matrix, version=store.version, directory=self.path)
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Failed to build %s index, using brute force: %s", self.backend_name, exc, exc_info=True)
+            backend = BruteForceBackend()
+            backend.build(matrix)
+        return backend
+
+    def _load_lexical(self, store: EmbeddingStore) -> BM25Index | None:
+        if not self.hybrid.enabled:
+            return None
+        try:
+            return load_lexical_index(store, self.path)
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Failed to load BM25 index, using vector search only: %s", exc, exc_info=True)
+            return None
+
+    def snapshot(self) -> tuple[np.ndarray, EmbeddingStore | None]:
+        """Return the current ``(matrix, store)`` pair as one consistent view."""
+        with self._lock:
+            return self._matrix, self._store
+
+    def _check_dimension(self, matrix: np.ndarray, dimension: int) -> bool:
+        if dimension != matrix.shape[1]:
+            logger.error("Query embedding has dimension %d, index expects %d", dimension, matrix.shape[1])
+            return False
+        return True
+
+    @staticmethod
+    def _result(store: EmbeddingStore, row: int, score: float) -> dict[str, Any]:
+        return {"chunk": store.chunk(row), "index": int(row), "similarity": float(score)}
+
+    def search(self, query_embedding: Any, top_k: int = 3, query_text: str | None = None) -> list[dict[str, Any]]:
+        """Return the ``top_k`` chunks most similar to ``query_embedding``.
+
+        When ``query_text`` is given and hybrid search is enabled, the vector
+        and BM25 candidates are fused by rank; ``similarity`` stays the
+        cosine similarity of each returned chunk.
+        """
+        with self._lock:
+            matrix, store, backend, lexical = self._matrix, self._store, self._backend, self._lexical
+        query = np.asarray(query_embedding, dtype=np.float32).ravel()
+        if store is None or not len(store) or top_k <= 0 or not self._check_dimension(matrix, query.shape[0]):
+            return []
+
+        if lexical is None or not query_text:
+            rows, scores = backend.search(query, top_k)
+            return [self._result(store, row, score) for row, score in zip(rows, scores)]
+
+        candidates = max(top_k, self.hybrid.candidates)
+        vector_rows, _ = backend.search(query, candidates)
+        lexical_rows, _ = lexical.search(query_text, candidates)
+        fused = reciprocal_rank_fusion([vector_rows, lexical_rows], k=self.hybrid.rrf_k)[:top_k]
+        rows = np.asarray([row for row, _ in fused], dtype=np.intp)
+        # Same unit-length query as the backends, so fused and vector-only scores share one scale.
+        scores = np.asarray(matrix[rows], dtype=np.float32) @ normalize_rows(query)[0]
+        return [self._result(store, row, score) for row, score in zip(rows, scores)]
+
+    def search_batch(self, query_embeddings: Any, top_k: int = 3) -> list[list[dict[str, Any]]]:
+        """Exact top-k for many queries with a single matrix product (bypasses the backend)."""
+        matrix, store = self.snapshot()
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        if store is None or not len(store) or top_k <= 0 or not self._check_dimension(matrix, queries.shape[1]):
+            return [[] for _ in range(queries.shape[0])]
+
+        rows, scores = score_top_k_batch(matrix, queries, top_k)
+        return [
+            [self._result(store, row, score) for row, score in zip(row_ids, row_scores)]
+            for row_ids, row_scores in zip(rows, scores)
+        ]
+
+
+_index: KnowledgeIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_knowledge_index(path: Path | str | None = None) -> KnowledgeIndex:
+    """Return the process-wide index, loading it on first use with the configured backend."""
+    global _index
+    with _index_lock:
+        if _index is None or (path is not None and Path(path) != _index.path):
+            index_config = KnowledgeConfig.load().index
+            _index = KnowledgeIndex(
+                path or DEFAULT_STORE_DIR, index_config.backend, index_config.options, index_config.hybrid
+            )
+            _index.reload()
+        return _index
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+from typing import Any, Callable, Iterable, Iterator, Sequence, TypeVar
+
+import openai
+
+from AtendentePro.Knowledge.knowledge_embedding_cache import EmbeddingCache
+from AtendentePro.Knowledge.knowledge_embedding_providers import EmbeddingProvider, as_embedding_provider
+from AtendentePro.Knowledge.knowledge_store import DEFAULT_EMBEDDING_MODEL
+from AtendentePro.Knowledge.knowledge_tokens import count_tokens
+from AtendentePro.utils.openai_client import create_async_openai_client
+
+logger = logging.getLogger(__name__)
+
+# OpenAI accepts up to 2048 inputs and ~300k tokens per embeddings request;
+# stay well below the token ceiling so one batch never trips it.
+DEFAULT_MAX_INPUTS_PER_BATCH = 256
+DEFAULT_MAX_TOKENS_PER_BATCH = 100_000
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_RETRIES = 5
+
+ProgressCallback = Callable[[int, int], None]
+T = TypeVar("T")
+
+
+def create_embedding_client(api_key: str | None = None, base_url: str | None = None) -> openai.AsyncOpenAI:
+    """Pooled async client for ingestion; retries are handled by :func:`embed_texts` itself."""
+    return create_async_openai_client(api_key=api_key, base_url=base_url, max_retries=0)
+
+
+def iter_batches(
+    items: Iterable[T],
+    *,
+    text: Callable[[T], str],
+    model: str | None = None,
+    max_tokens_per_batch: int = DEFAULT_MAX_TOKENS_PER_BATCH,
+    max_inputs_per_batch: int = DEFAULT_MAX_INPUTS_PER_BATCH,
+) -> Iterator[list[T]]:
+    """Lazily group ``items`` into batches bounded by token count and input count."""
+    current: list[T] = []
+    current_tokens = 0
+    for item in items:
+        tokens = count_tokens(text(item), model)
+        if current and (current_tokens + tokens > max_tokens_per_batch or len(current) >= max_inputs_per_batch):
+            yield current
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        yield current
+
+
+def pack_batches(
+    texts: Sequence[str],
+    *,
+    model: str | None = None,
+    max_tokens_per_batch: int = DEFAULT_MAX_TOKENS_PER_BATCH,
+    max_inputs_per_batch: int = DEFAULT_MAX_INPUTS_PER_BATCH,
+) -> list[list[int]]:
+    """Group text positions into batches bounded by token count and input count."""
+    return list(
+        iter_batches(
+            range(len(texts)),
+            text=texts.__getitem__,
+            model=model,
+            max_tokens_per_batch=max_tokens_per_batch,
+            max_inputs_per_batch=max_inputs_per_batch,
+        )
+    )
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, openai.APIConnectionError):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return False
+
+
+def _retry_delay(exc: Exception, attempt: int, backoff_base: float, backoff_max: float) -> float:
+    response = getattr(exc, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(backoff_max, float(retry_after))
+        except ValueError:
+            pass
+    # Exponential backoff with jitter so concurrent batches do not retry in lockstep.
+    return min(backoff_max, backoff_base * (2**attempt)) * random.uniform(0.5, 1.0)
+
+
+def embedding_key(model: str, dimensions: int | None = None) -> str:
+    """Cache key of ``model`` at ``dimensions``: shortened vectors are not interchangeable with full ones."""
+    return model if dimensions is None else f"{model}@{dimensions}"
+
+
+async def _embed_batch(
+    provider: EmbeddingProvider,
+    model: str,
+    texts: list[str],
+    *,
+    dimensions: int | None = None,
+    max_retries: int,
+    backoff_base: float,
+    backoff_max: float,
+) -> list[list[float]]:
+    attempt = 0
+    while True:
+        try:
+            return (await provider.aembed(texts, model=model, dimensions=dimensions)).tolist()
+        except Exception as exc:  # noqa: BLE001
+            if attempt >= max_retries or not _is_retryable(exc):
+                raise
+            delay = _retry_delay(exc, attempt, backoff_base, backoff_max)
+            logger.warning(
+                "Embedding batch of %d inputs failed (%s); retry %d/%d in %.1fs",
+                len(texts),
+                exc,
+                attempt + 1,
+                max_retries,
+                delay,
+            )
+            attempt += 1
+            await asyncio.sleep(delay)
+
+
+def _log_progress(done: int, total: int) -> None:
+    logger.info("Embedded %d/%d chunks", done, total)
+
+
+async def embed_texts(
+    texts: Sequence[str],
+    *,
+    client: Any,
+    model: str = DEFAULT_EMBEDDING_MODEL,
+    dimensions: int | None = None,
+    max_tokens_per_batch: int = DEFAULT_MAX_TOKENS_PER_BATCH,
+    max_inputs_per_batch: int = DEFAULT_MAX_INPUTS_PER_BATCH,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    backoff_base: float = 1.0,
+    backoff_max: float = 30.0,
+    progress: ProgressCallback | None = _log_progress,
+    cache: EmbeddingCache | None = None,
+) -> list[list[float] | None]:
+    """Embed ``texts`` in token-bounded batches sent concurrently.
+
+    ``client`` is an ``AsyncOpenAI`` (or compatible) client, whose ``base_url``
+    can point at a local fake server to test without the real API, or an
+    ``EmbeddingProvider`` such as the local sentence-transformers one.
+    With a ``cache``, texts already embedded by ``model`` are served from it
+    and only new or changed texts hit the API; identical texts are sent once.
+    ``dimensions`` asks the API for shortened (Matryoshka) vectors.
+    Returns one vector per input, in order; entries whose batch still failed
+    after ``max_retries`` are ``None`` and the error is logged.
+    """
+    provider = as_embedding_provider(client)
+    key = embedding_key(model, dimensions)
+    results: list[list[float] | None] = (
+        cache.get_many(key, texts) if cache is not None else [None] * len(texts)
+    )
+    positions_by_text: dict[str, list[int]] = {}
+    for position, vector in enumerate(results):
+        if vector is None:
+            positions_by_text.setdefault(texts[position], []).append(position)
+    pending = list(positions_by_text)
+
+    batches = pack_batches(
+        pending,
+        model=model,
+        max_tokens_per_batch=max_tokens_per_batch,
+        max_inputs_per_batch=max_inputs_per_batch,
+    )
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    done = len(texts) - sum(len(positions) for positions in positions_by_text.values())
+    if progress is not None and done:
+        progress(done, len(texts))
+
+    async def run(batch: list[int]) -> None:
+        nonlocal done
+        batch_texts = [pending[index] for index in batch]
+        async with semaphore:
+            try:
+                vectors = await _embed_batch(
+                    provider,
+                    model,
+                    batch_texts,
+                    dimensions=dimensions,
+                    max_retries=max_retries,
+                    backoff_base=backoff_base,
+                    backoff_max=backoff_max,
+                )
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Failed to embed batch of %d chunks: %s", len(batch), exc)
+                vectors = []
+        if cache is not None and vectors:
+            cache.put_many(key, batch_texts, vectors)
+        for text, vector in zip(batch_texts, vectors):
+            for position in positions_by_text[text]:
+                results[position] = vector
+        done += sum(len(positions_by_text[text]) for text in batch_texts)
+        if progress is not None:
+            progress(done, len(texts))
+
+    await asyncio.gather(*(run(batch) for batch in batches))
+    return results
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import logging
+import math
+import re
+import unicodedata
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from AtendentePro.Knowledge.knowledge_search import top_k_indices
+from AtendentePro.Knowledge.knowledge_store import EmbeddingStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+DEFAULT_RRF_K = 60
+LEXICAL_PREFIX = "bm25"
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+# Function words that would otherwise match almost every chunk.
+STOPWORDS = frozenset(
+    "a ao aos as com como da das de do dos e em na nas no nos o os ou para pela pelas pelo pelos por "
+    "qual quais que se sem sua suas seu seus um uma umas uns".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Case- and accent-folded word tokens, keeping codes such as ``I0`` or ``CFOP`` intact."""
+    folded = unicodedata.normalize("NFKD", text.casefold())
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+    return [token for token in _TOKEN_PATTERN.findall(folded) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over an inverted index of the chunks of one store version.
+
+    Postings are kept as flat arrays (CSR layout): the documents of term
+    ``t`` are ``doc_ids[offsets[t]:offsets[t + 1]]``. A query only touches
+    the postings of its own terms, so exact fiscal codes are found without
+    scoring every chunk.
+    """
+
+    def __init__(
+        self,
+        terms: Sequence[str],
+        offsets: np.ndarray,
+        doc_ids: np.ndarray,
+        frequencies: np.ndarray,
+        doc_lengths: np.ndarray,
+        *,
+        k1: float = DEFAULT_K1,
+        b: float = DEFAULT_B,
+        version: str | None = None,
+    ) -> None:
+        self.terms = list(terms)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        self.frequencies = np.asarray(frequencies, dtype=np.float32)
+        self.doc_lengths = np.asarray(doc_lengths, dtype=np.float32)
+        self.k1 = k1
+        self.b = b
+        self.version = version
+        self._term_ids = {term: position for position, term in enumerate(self.terms)}
+        average = float(self.doc_lengths.mean()) if len(self.doc_lengths) else 0.0
+        self._length_norm = k1 * (1.0 - b + b * self.doc_lengths / max(average, 1e-9))
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    @classmethod
+    def build(cls, texts: Iterable[str], *, version: str | None = None, **options: float) -> "BM25Index":
+        postings: dict[str, dict[int, int]] = {}
+        lengths: list[int] = []
+        for doc_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for token in tokens:
+                counts = postings.setdefault(token, {})
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[term]) for term in terms])
+        doc_ids = np.fromiter(
+            (doc_id for term in terms for doc_id in postings[term]), dtype=np.int32, count=int(offsets[-1])
+        )
+        frequencies = np.fromiter(
+            (count for term in terms for count in postings[term].values()), dtype=np.float32, count=int(offsets[-1])
+        )
+        return cls(terms, offsets, doc_ids, frequencies, np.asarray(lengths), version=version, **options)
+
+    @classmethod
+    def from_store(cls, store: EmbeddingStore, **options: float) -> "BM25Index":
+        return cls.build((store.content(row) for row in range(len(store))), version=store.version, **options)
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every chunk for ``query`` (zero for chunks sharing no term)."""
+        scores = np.zeros(len(self), dtype=np.float32)
+        count = len(self)
+        for term in set(tokenize(query)):
+            term_id = self._term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.doc_ids[start:end]
+            tf = self.frequencies[start:end]
+            df = end - start
+            idf = math.log(1.0 + (count - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * tf * (self.k1 + 1.0) / (tf + self._length_norm[docs])
+        return scores
+
+    def search(self, query: str, top_k: int) -> tuple[np.ndarray, np.ndarray]:
+        """``(rows, scores)`` of the ``top_k`` best chunks that match at least one query term."""
+        scores = self.scores(query)
+        rows = top_k_indices(scores, top_k)
+        rows = rows[scores[rows] > 0]
+        return rows, scores[rows]
+
+    def save(self, path: Path) -> None:
+        """Atomically write the index to ``path`` (``.npz``) and drop files of other store versions."""
+        for stale in path.parent.glob(f"{LEXICAL_PREFIX}-*.npz"):
+            stale.unlink(missing_ok=True)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with open(tmp_path, "wb") as file:
+            np.savez(
+                file,
+                terms=np.asarray(self.terms, dtype=str),
+                offsets=self.offsets,
+                doc_ids=self.doc_ids,
+                frequencies=self.frequencies,
+                doc_lengths=self.doc_lengths,
+                params=np.asarray([self.k1, self.b], dtype=np.float64),
+            )
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path, *, version: str | None = None) -> "BM25Index":
+        with np.load(path, allow_pickle=False) as data:
+            k1, b = (float(value) for value in data["params"])
+            return cls(
+                data["terms"].tolist(),
+                data["offsets"],
+                data["doc_ids"],
+                data["frequencies"],
+                data["doc_lengths"],
+                k1=k1,
+                b=b,
+                version=version,
+            )
+
+
+def lexical_index_path(directory: Path | str, version: str) -> Path:
+    return Path(directory) / f"{LEXICAL_PREFIX}-{version}.npz"
+
+
+def build_lexical_index(store: EmbeddingStore, directory: Path | str) -> BM25Index:
+    """Build the BM25 index of ``store`` and save it next to the store; run at ingestion time."""
+    index = BM25Index.from_store(store)
+    try:
+        index.save(lexical_index_path(directory, store.version))
+    except OSError as exc:
+        logger.warning("Could not save BM25 index for store %s: %s", store.version, exc)
+    return index
+
+
+def load_lexical_index(store: EmbeddingStore, directory: Path | str) -> BM25Index:
+    """Load the BM25 index saved for ``store``, building (and saving) it when missing or unreadable."""
+    path = lexical_index_path(directory, store.version)
+    if path.exists():
+        try:
+            index = BM25Index.load(path, version=store.version)
+            if len(index) == len(store):
+                return index
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning("Ignoring unreadable BM25 index %s: %s", path, exc)
+    return build_lexical_index(store, directory)
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[int]], k: int = DEFAULT_RRF_K, weights: Sequence[float] | None = None
+) -> list[tuple[int, float]]:
+    """Fuse ranked lists of row ids: ``score(row) = sum(weight / (k + rank))`` with ranks from 1.
+
+    Only ranks are used, so cosine similarities and BM25 scores never have
+    to be put on the same scale. Ties keep the order of first appearance.
+    """
+    fused: dict[int, float] = {}
+    for position, ranking in enumerate(rankings):
+        weight = 1.0 if weights is None else weights[position]
+        for rank, row in enumerate(ranking, start=1):
+            row = int(row)
+            fused[row] = fused.get(row, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
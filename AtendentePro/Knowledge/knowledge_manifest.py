@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Iterable
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "manifest.json"
+SUPPORTED_EXTENSIONS = (".pdf", ".pptx", ".docx")
+
+
+def hash_file(path: Path, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ManifestEntry(BaseModel):
+    path: str = Field(description="Nome do arquivo dentro da pasta de documentos.")
+    size: int = Field(description="Tamanho em bytes na última ingestão.")
+    mtime_ns: int = Field(description="Data de modificação (ns) na última ingestão.")
+    content_hash: str = Field(description="SHA-256 do conteúdo do arquivo.")
+    chunk_ids: list[str] = Field(default_factory=list, description="Identificadores dos trechos gerados.")
+
+
+class ManifestDiff(BaseModel):
+    added: list[str] = Field(default_factory=list)
+    changed: list[str] = Field(default_factory=list)
+    removed: list[str] = Field(default_factory=list)
+    unchanged: list[str] = Field(default_factory=list)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+    @property
+    def to_ingest(self) -> list[str]:
+        return self.added + self.changed
+
+
+class IngestionManifest(BaseModel):
+    """Record of which document produced which chunks, used for incremental rebuilds."""
+
+    embedding_model: str | None = Field(default=None, description="Modelo usado na última ingestão.")
+    embedding_dimensions: int | None = Field(default=None, description="Dimensão pedida na última ingestão.")
+    chunker: str | None = Field(default=None, description="Assinatura do chunker usado na última ingestão.")
+    store_version: str | None = Field(default=None, description="Versão do armazenamento gerado.")
+    files: dict[str, ManifestEntry] = Field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path | str) -> "IngestionManifest":
+        path = Path(path)
+        if not path.is_file():
+            return cls()
+        try:
+            return cls.model_validate_json(path.read_text(encoding="utf-8"))
+        except ValueError as exc:
+            logger.warning("Ignoring unreadable ingestion manifest %s: %s", path, exc)
+            return cls()
+
+    def save(self, path: Path | str) -> None:
+        path = Path(path)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        tmp_path.write_text(self.model_dump_json(indent=2), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def diff(
+        self,
+        doc_folder: Path | str,
+        extensions: Iterable[str] = SUPPORTED_EXTENSIONS,
+    ) -> ManifestDiff:
+        """Compare the folder with the manifest.
+
+        Size and mtime are checked first; the content hash is only computed
+        when they differ, so an untouched folder costs one ``stat`` per file.
+        A file whose bytes are unchanged (e.g. only touched) stays unchanged
+        and gets its fingerprint refreshed in place.
+        """
+        allowed = {extension.lower() for extension in extensions}
+        result = ManifestDiff()
+        seen: set[str] = set()
+
+        for file_path in sorted(Path(doc_folder).iterdir()):
+            if not file_path.is_file() or file_path.suffix.lower() not in allowed:
+                continue
+            name = file_path.name
+            seen.add(name)
+            stat = file_path.stat()
+            entry = self.files.get(name)
+
+            if entry is None:
+                result.added.append(name)
+            elif entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+                result.unchanged.append(name)
+            elif hash_file(file_path) == entry.content_hash:
+                entry.size, entry.mtime_ns = stat.st_size, stat.st_mtime_ns
+                result.unchanged.append(name)
+            else:
+                result.changed.append(name)
+
+        result.removed = sorted(set(self.files) - seen)
+        return result
+
+    def record(self, file_path: Path, chunk_count: int) -> ManifestEntry:
+        """Fingerprint ``file_path`` and store the ids of its ``chunk_count`` chunks."""
+        stat = file_path.stat()
+        content_hash = hash_file(file_path)
+        entry = ManifestEntry(
+            path=file_path.name,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            content_hash=content_hash,
+            chunk_ids=[f"{content_hash[:16]}-{ordinal}" for ordinal in range(chunk_count)],
+        )
+        self.files[file_path.name] = entry
+        return entry
+
+    def forget(self, names: Iterable[str]) -> None:
+        for name in names:
+            self.files.pop(name, None)
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+from collections import Counter, deque
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Sequence
+
+from pydantic import BaseModel, Field
+
+from AtendentePro.Knowledge.knowledge_chunking import Chunker, StructuredChunker, iter_unique_chunks
+from AtendentePro.Knowledge.knowledge_embedding_cache import EmbeddingCache
+from AtendentePro.Knowledge.knowledge_extraction import (
+    DEFAULT_FILE_TIMEOUT,
+    DEFAULT_PAGES_PER_TASK,
+    iter_extracted_segments,
+)
+from AtendentePro.Knowledge.knowledge_ingestion import (
+    DEFAULT_CONCURRENCY,
+    DEFAULT_MAX_INPUTS_PER_BATCH,
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_MAX_TOKENS_PER_BATCH,
+    embed_texts,
+    iter_batches,
+)
+from AtendentePro.Knowledge.knowledge_store import DEFAULT_EMBEDDING_MODEL, StoreWriter
+
+logger = logging.getLogger(__name__)
+
+class PipelineResult(BaseModel):
+    chunk_counts: dict[str, int] = Field(default_factory=dict, description="Trechos gravados por documento.")
+    failed_sources: list[str] = Field(
+        default_factory=list, description="Documentos com falha de extração ou de embedding."
+    )
+
+    @property
+    def embedded(self) -> int:
+        return sum(self.chunk_counts.values())
+
+
+def iter_document_chunks(
+    segments: Iterable[tuple[str, str | None]],
+    chunker: Chunker,
+    *,
+    failed: set[str] | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Chunk the ``(file name, text)`` stream of :func:`iter_extracted_segments`.
+
+    Chunks whose text was already produced earlier for the same file are
+    dropped. Names of files whose extraction failed are added to
+    ``failed``; chunks already produced for them are still yielded.
+    """
+    yield from iter_unique_chunks(_iter_chunks_by_file(segments, chunker, failed))
+
+
+def _iter_chunks_by_file(
+    segments: Iterable[tuple[str, str | None]],
+    chunker: Chunker,
+    failed: set[str] | None,
+) -> Iterator[dict[str, Any]]:
+    for name, pieces in itertools.groupby(segments, key=lambda segment: segment[0]):
+
+        def texts(name: str = name, pieces: Iterable[tuple[str, str | None]] = pieces) -> Iterator[str]:
+            for _, text in pieces:
+                if text is None:
+                    if failed is not None:
+                        failed.add(name)
+                    return
+                yield text
+
+        yield from chunker.iter_chunks(name, texts())
+
+
+async def stream_documents_into_store(
+    paths: Sequence[Path | str],
+    writer: StoreWriter,
+    *,
+    client: Any,
+    model: str = DEFAULT_EMBEDDING_MODEL,
+    dimensions: int | None = None,
+    chunker: Chunker | None = None,
+    max_tokens_per_batch: int = DEFAULT_MAX_TOKENS_PER_BATCH,
+    max_inputs_per_batch: int = DEFAULT_MAX_INPUTS_PER_BATCH,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    cache: EmbeddingCache | None = None,
+    max_workers: int | None = None,
+    pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+    timeout: float = DEFAULT_FILE_TIMEOUT,
+) -> PipelineResult:
+    """Extract, chunk, embed and append ``paths`` to ``writer`` as one stream.
+
+    Pages are extracted in a process pool and chunked lazily by ``chunker``
+    (structure-aware by default); each full batch is sent to the embeddings
+    API while the next one is being extracted, and batches are appended to
+    the store in document order. At most ``concurrency`` batches are held
+    at once, so peak memory is bounded by the batch size rather than the
+    corpus size.
+    """
+    failed: set[str] = set()
+    chunk_counts: Counter[str] = Counter()
+    segments = iter_extracted_segments(paths, max_workers=max_workers, pages_per_task=pages_per_task, timeout=timeout)
+    batches = iter_batches(
+        iter_document_chunks(segments, chunker or StructuredChunker(), failed=failed),
+        text=lambda chunk: chunk["content"],
+        model=model,
+        max_tokens_per_batch=max_tokens_per_batch,
+        max_inputs_per_batch=max_inputs_per_batch,
+    )
+    pending: deque[tuple[list[dict[str, Any]], asyncio.Task]] = deque()
+
+    async def append_oldest() -> None:
+        chunks, task = pending.popleft()
+        vectors = await task
+        embedded = [(chunk, vector) for chunk, vector in zip(chunks, vectors) if vector is not None]
+        failed.update(chunk["source"] for chunk, vector in zip(chunks, vectors) if vector is None)
+        writer.append([vector for _, vector in embedded], [chunk for chunk, _ in embedded])
+        chunk_counts.update(chunk["source"] for chunk, _ in embedded)
+        logger.info("Embedded %d chunks so far", sum(chunk_counts.values()))
+
+    try:
+        # The first batch is pulled on this thread so the extraction pool is
+        # forked from it; later batches are extracted while requests are in flight.
+        batch = next(batches, None)
+        while batch is not None:
+            task = asyncio.create_task(
+                embed_texts(
+                    [chunk["content"] for chunk in batch],
+                    client=client,
+                    model=model,
+                    dimensions=dimensions,
+                    max_tokens_per_batch=max_tokens_per_batch,
+                    max_inputs_per_batch=max_inputs_per_batch,
+                    concurrency=1,
+                    max_retries=max_retries,
+                    progress=None,
+                    cache=cache,
+                )
+            )
+            pending.append((batch, task))
+            if len(pending) >= max(1, concurrency):
+                await append_oldest()
+            batch = await asyncio.to_thread(next, batches, None)
+        while pending:
+            await append_oldest()
+    finally:
+        for _, task in pending:
+            task.cancel()
+        segments.close()
+
+    return PipelineResult(chunk_counts=dict(chunk_counts), failed_sources=sorted(failed))
@@ -2,6 +2,7 @@
 from AtendentePro.Knowledge.knowledge_templates import (
     knowledge_about,
     knowledge_format,
+    knowledge_synthesis_mode,
     knowledge_template,
 )
 
@@ -52,6 +53,16 @@ RAG = """
 - (Raciocínio interno) Apenas execute a função go_to_rag uma vez.
 """
 
+# synthesis.mode == "agent": go_to_rag only retrieves; the agent writes (and streams) the answer itself.
+RAG_AGENT_SYNTHESIS = """
+[RAG]
+- (Raciocínio interno) Utilize a função go_to_rag, com o parâmetro question, para recuperar os trechos relevantes.
+- (Raciocínio interno) Adicione referência ao documento de origem. question = "[Documento]" + "[Pergunta do usuário]".
+- (Raciocínio interno) A função devolve os trechos em `context` e os documentos em `sources`; ela não redige a resposta.
+- (Raciocínio interno) Redija você mesmo a resposta usando apenas o `context`. Se não houver informação suficiente, informe isso.
+- (Raciocínio interno) Apenas execute a função go_to_rag uma vez.
+"""
+
 REVIEW = """
 [REVIEW]
 - (Raciocínio interno) Revise a resposta da função go_to_rag.
@@ -62,9 +73,15 @@ REVIEW = """
 - (Raciocínio interno) Verifique se a resposta é adequada ao contexto da pergunta do usuário.
 """
 
+REVIEW_AGENT_SYNTHESIS = """
+[REVIEW]
+- (Raciocínio interno) Verifique se a sua resposta usa somente o `context` devolvido pela função go_to_rag.
+- (Raciocínio interno) Verifique se a resposta é clara, objetiva, precisa e adequada à pergunta do usuário.
+"""
+
 FORMAT = f"""
 [FORMAT]
-- (Raciocínio interno) Formate a resposta da função go_to_rag seguindo o padrão:
+- (Raciocínio interno) Formate a resposta final seguindo o padrão:
 {knowledge_format}
 """
 
@@ -78,6 +95,10 @@ OUTPUT = """
 - (Raciocínio interno) Exponha a resposta formatada ao usuário com as referências aos documentos utilizados.
 """
 
+if knowledge_synthesis_mode == "agent":
+    RAG = RAG_AGENT_SYNTHESIS
+    REVIEW = REVIEW_AGENT_SYNTHESIS
+
 prompts_knowledge_agent = (
     INTRO + "\n" + MODULES + "\n" + READ + "\n" + SUMMARY + "\n" + 
     EXTRACT + "\n" + CLARIFY + "\n" + METADATA_DOCUMENTOS + "\n" + 
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+DEFAULT_PQ_CENTROIDS = 256
+DEFAULT_PQ_SUBVECTOR_DIM = 8
+DEFAULT_PQ_ITERATIONS = 10
+DEFAULT_PQ_TRAIN_SIZE = 16_384
+
+_BLOCK_ROWS = 8192
+
+
+def _blocks(matrix: np.ndarray) -> Any:
+    """Yield ``(start, float32 block)`` pairs so a memory-mapped matrix is never loaded whole."""
+    for start in range(0, matrix.shape[0], _BLOCK_ROWS):
+        yield start, np.asarray(matrix[start : start + _BLOCK_ROWS], dtype=np.float32)
+
+
+class ScalarQuantizer:
+    """8-bit codes with a per-dimension affine range (4x smaller than float32).
+
+    ``x ≈ offset + scale * code``, so a float query scores the codes directly:
+    ``q · x ≈ q · offset + (q * scale) · code`` (asymmetric distance, the
+    query is never quantized).
+    """
+
+    def __init__(self) -> None:
+        self.offset = np.empty(0, dtype=np.float32)
+        self.scale = np.empty(0, dtype=np.float32)
+
+    @property
+    def signature(self) -> str:
+        return "sq8"
+
+    @property
+    def nbytes(self) -> int:
+        return self.offset.nbytes + self.scale.nbytes
+
+    def resolve(self, dimension: int) -> None:
+        """Nothing to configure: every dimension gets its own range."""
+
+    def train(self, matrix: np.ndarray) -> None:
+        low = np.full(matrix.shape[1], np.inf, dtype=np.float32)
+        high = np.full(matrix.shape[1], -np.inf, dtype=np.float32)
+        for _, block in _blocks(matrix):
+            low = np.minimum(low, block.min(axis=0))
+            high = np.maximum(high, block.max(axis=0))
+        self.offset = low
+        self.scale = np.where(high > low, (high - low) / 255.0, 1.0).astype(np.float32)
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        codes = np.empty(matrix.shape, dtype=np.uint8)
+        for start, block in _blocks(matrix):
+            scaled = np.rint((block - self.offset) / self.scale)
+            codes[start : start + len(block)] = np.clip(scaled, 0, 255)
+        return codes
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        weights = query * self.scale
+        scores = np.empty(codes.shape[0], dtype=np.float32)
+        for start in range(0, codes.shape[0], _BLOCK_ROWS):
+            block = codes[start : start + _BLOCK_ROWS]
+            scores[start : start + len(block)] = block.astype(np.float32) @ weights
+        return scores + float(query @ self.offset)
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        return {"offset": self.offset, "scale": self.scale}
+
+    def load_arrays(self, arrays: Any) -> None:
+        self.offset = arrays["offset"]
+        self.scale = arrays["scale"]
+
+
+def _kmeans(data: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """Plain Euclidean k-means; returns the ``(k, dim)`` centroids."""
+    centroids = data[rng.choice(data.shape[0], k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _nearest(data, centroids)
+        counts = np.bincount(assignment, minlength=k)
+        sums = np.stack(
+            [np.bincount(assignment, weights=data[:, dim], minlength=k) for dim in range(data.shape[1])], axis=1
+        )
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty cells with random points so every code stays in use.
+            sums[empty] = data[rng.choice(data.shape[0], int(empty.sum()), replace=False)]
+            counts[empty] = 1
+        centroids = (sums / counts[:, None]).astype(np.float32)
+    return centroids
+
+
+def _nearest(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    # argmin ||x - c||² == argmin (||c||² - 2 x·c); ||x||² is constant per row.
+    distances = data @ (-2.0 * centroids.T)
+    distances += (centroids**2).sum(axis=1)
+    return np.argmin(distances, axis=1)
+
+
+class ProductQuantizer:
+    """Product quantization: one byte per ``subspaces`` slice of the vector.
+
+    The vector is cut into ``subspaces`` slices and each slice is replaced by
+    the id of its nearest of ``centroids`` k-means centres. A query builds a
+    ``(subspaces, centroids)`` table of slice dot products once, after which
+    every row is scored by summing table lookups. With the default 8
+    dimensions per slice a float32 vector shrinks 32x.
+    """
+
+    def __init__(
+        self,
+        subspaces: int | None = None,
+        centroids: int = DEFAULT_PQ_CENTROIDS,
+        iterations: int = DEFAULT_PQ_ITERATIONS,
+        train_size: int = DEFAULT_PQ_TRAIN_SIZE,
+        seed: int = 0,
+    ) -> None:
+        if not 1 <= centroids <= 256:
+            raise ValueError(f"centroids must be between 1 and 256 to fit one byte, got {centroids}")
+        self.subspaces = subspaces
+        self.centroids = centroids
+        self.iterations = iterations
+        self.train_size = train_size
+        self.seed = seed
+        self.codebooks = np.empty((0, 0, 0), dtype=np.float32)
+
+    @property
+    def signature(self) -> str:
+        return f"pq{self.subspaces}x{self.centroids}-{self.seed}"
+
+    @property
+    def nbytes(self) -> int:
+        return self.codebooks.nbytes
+
+    def resolve(self, dimension: int) -> None:
+        """Pick the number of subspaces for ``dimension`` when it was not configured."""
+        if self.subspaces is None:
+            subspaces = max(1, dimension // DEFAULT_PQ_SUBVECTOR_DIM)
+            while dimension % subspaces:
+                subspaces -= 1
+            self.subspaces = subspaces
+        elif dimension % self.subspaces:
+            raise ValueError(f"Dimension {dimension} is not divisible into {self.subspaces} subspaces")
+
+    def _split(self, block: np.ndarray) -> np.ndarray:
+        return block.reshape(block.shape[0], self.subspaces, -1)
+
+    def train(self, matrix: np.ndarray) -> None:
+        self.resolve(matrix.shape[1])
+        rng = np.random.default_rng(self.seed)
+        count = matrix.shape[0]
+        sample_rows = np.sort(rng.choice(count, min(count, self.train_size), replace=False))
+        sample = self._split(np.asarray(matrix[sample_rows], dtype=np.float32))
+        k = min(self.centroids, len(sample_rows))
+        self.codebooks = np.stack(
+            [_kmeans(sample[:, part], k, self.iterations, rng) for part in range(self.subspaces)]
+        ).astype(np.float32)
+
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        # Stored subspace-major so scoring reads each column contiguously.
+        codes = np.empty((self.subspaces, matrix.shape[0]), dtype=np.uint8)
+        for start, block in _blocks(matrix):
+            parts = self._split(block)
+            for part in range(self.subspaces):
+                codes[part, start : start + len(block)] = _nearest(parts[:, part], self.codebooks[part])
+        return codes
+
+    def score(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        table = np.einsum("pkd,pd->pk", self.codebooks, query.reshape(self.subspaces, -1))
+        scores = np.zeros(codes.shape[1], dtype=np.float32)
+        for part in range(self.subspaces):
+            scores += table[part, codes[part]]
+        return scores
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        return {"codebooks": self.codebooks}
+
+    def load_arrays(self, arrays: Any) -> None:
+        self.codebooks = arrays["codebooks"]
+
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from AtendentePro.Knowledge.knowledge_config import KnowledgeConfig
+from AtendentePro.Knowledge.knowledge_embedding_providers import as_embedding_provider
+from AtendentePro.Knowledge.knowledge_store import EmbeddingStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERY_CACHE_ENTRIES = 1024
+DEFAULT_QUERY_CACHE_TTL = 3600.0
+
+# Full output size of the models that accept the ``dimensions`` parameter.
+NATIVE_DIMENSIONS = {
+    "text-embedding-3-large": 3072,
+    "text-embedding-3-small": 1536,
+}
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a question: Unicode-normalised, case-folded, whitespace collapsed."""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+class QueryCacheStats(BaseModel):
+    hits: int = Field(default=0, description="Perguntas atendidas pelo cache.")
+    misses: int = Field(default=0, description="Perguntas que exigiram chamada de embedding.")
+    entries: int = Field(default=0, description="Vetores mantidos em memória.")
+    evicted: int = Field(default=0, description="Entradas descartadas por limite de tamanho.")
+    expired: int = Field(default=0, description="Entradas descartadas por TTL.")
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class QueryEmbeddingCache:
+    """In-memory LRU of ``(model, dimensions, normalised question) -> vector`` with a TTL.
+
+    Bounded by ``max_entries``; entries older than ``ttl`` seconds are
+    treated as misses and dropped. Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_QUERY_CACHE_ENTRIES,
+        ttl: float | None = DEFAULT_QUERY_CACHE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, int | None, str], tuple[float, np.ndarray]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evicted = 0
+        self._expired = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def stats(self) -> QueryCacheStats:
+        return QueryCacheStats(
+            hits=self._hits, misses=self._misses, entries=len(self), evicted=self._evicted, expired=self._expired
+        )
+
+    def get(self, model: str, dimensions: int | None, query: str) -> np.ndarray | None:
+        key = (model, dimensions, normalize_query(query))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and self._clock() - entry[0] > self.ttl:
+                del self._entries[key]
+                self._expired += 1
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, model: str, dimensions: int | None, query: str, vector: np.ndarray) -> None:
+        if self.max_entries <= 0:
+            return
+        key = (model, dimensions, normalize_query(query))
+        vector = np.asarray(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        with self._lock:
+            self._entries[key] = (self._clock(), vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evicted += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class QueryEmbedder:
+    """Embed questions with exactly the model and dimension of the store they will search.
+
+    The store header is the source of truth: a query embedded with another
+    model lives in a different vector space and would silently return
+    unrelated chunks. Repeated questions are served from ``cache``.
+
+    ``client`` is an ``EmbeddingProvider`` (see ``knowledge_embedding_providers``)
+    or an OpenAI-compatible client: a sync ``OpenAI`` for :meth:`embed` /
+    :meth:`embed_for_store`, an ``AsyncOpenAI`` for :meth:`aembed` /
+    :meth:`aembed_for_store`.
+    """
+
+    def __init__(self, client: Any, cache: QueryEmbeddingCache | None = None) -> None:
+        self.client = client
+        self.provider = as_embedding_provider(client)
+        self.cache = cache
+
+    def embed(self, query: str, *, model: str, dimensions: int | None = None) -> np.ndarray:
+        """Return the embedding of ``query`` (shortened to ``dimensions`` when given)."""
+        cached = self._cached(query, model, dimensions)
+        if cached is not None:
+            return cached
+        rows = self.provider.embed([query], model=model, dimensions=dimensions)
+        return self._store_vector(query, model, dimensions, rows[0])
+
+    async def aembed(self, query: str, *, model: str, dimensions: int | None = None) -> np.ndarray:
+        """Async :meth:`embed`, for use inside tools running on the event loop."""
+        cached = self._cached(query, model, dimensions)
+        if cached is not None:
+            return cached
+        rows = await self.provider.aembed([query], model=model, dimensions=dimensions)
+        return self._store_vector(query, model, dimensions, rows[0])
+
+    def embed_for_store(self, query: str, store: EmbeddingStore) -> np.ndarray:
+        """Embed ``query`` with the model recorded in ``store``'s header, at the store's dimension."""
+        vector = self.embed(query, model=store.embedding_model, dimensions=_query_dimensions(store))
+        return _check_store_dimension(vector, store)
+
+    async def aembed_for_store(self, query: str, store: EmbeddingStore) -> np.ndarray:
+        """Async :meth:`embed_for_store`."""
+        vector = await self.aembed(query, model=store.embedding_model, dimensions=_query_dimensions(store))
+        return _check_store_dimension(vector, store)
+
+    def _cached(self, query: str, model: str, dimensions: int | None) -> np.ndarray | None:
+        return self.cache.get(model, dimensions, query) if self.cache is not None else None
+
+    def _store_vector(self, query: str, model: str, dimensions: int | None, vector: Any) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        if dimensions is not None and vector.shape[0] != dimensions:
+            raise ValueError(f"{model} returned {vector.shape[0]} dimensions, expected {dimensions}")
+        if self.cache is not None:
+            self.cache.put(model, dimensions, query, vector)
+        return vector
+
+
+def _query_dimensions(store: EmbeddingStore) -> int | None:
+    """``dimensions`` to request so the query matches a (possibly shortened) store."""
+    native = NATIVE_DIMENSIONS.get(store.embedding_model)
+    return store.dimension if native is not None and store.dimension < native else None
+
+
+def _check_store_dimension(vector: np.ndarray, store: EmbeddingStore) -> np.ndarray:
+    if vector.shape[0] != store.dimension:
+        raise ValueError(
+            f"Query embedding from {store.embedding_model} has dimension {vector.shape[0]}, "
+            f"store {store.version} expects {store.dimension}"
+        )
+    return vector
+
+
+_query_cache: QueryEmbeddingCache | None = None
+_query_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> QueryEmbeddingCache:
+    """Return the process-wide query cache, sized from ``knowledge_config.yaml``."""
+    global _query_cache
+    with _query_cache_lock:
+        if _query_cache is None:
+            settings = KnowledgeConfig.load().query_cache
+            _query_cache = QueryEmbeddingCache(settings.max_entries, settings.ttl_seconds)
+        return _query_cache
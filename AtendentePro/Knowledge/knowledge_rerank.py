@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Sequence
+
+from AtendentePro.Knowledge.knowledge_config import KnowledgeConfig
+
+logger = logging.getLogger(__name__)
+
+# Multilingual MS MARCO cross-encoder (~118M params); handles Portuguese and runs on CPU.
+DEFAULT_RERANK_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+DEFAULT_RERANK_CANDIDATES = 10
+DEFAULT_RERANK_BATCH_SIZE = 8
+DEFAULT_RERANK_BUDGET_MS = 200.0
+DEFAULT_RERANK_MAX_LENGTH = 512
+
+
+class CrossEncoderReranker:
+    """Reorder retrieved chunks by a local cross-encoder's relevance score for the question.
+
+    Candidates are scored in batches, in retrieval order. Once ``budget_ms``
+    is spent the remaining candidates are not scored; they keep their
+    retrieval order behind the scored ones, so a slow CPU degrades to plain
+    retrieval instead of delaying the answer. ``candidates`` is how many
+    chunks callers should retrieve before reranking.
+
+    The model is loaded on first use, and a failed load is not retried.
+    ``model`` may be any object with a sentence-transformers style
+    ``predict(pairs, batch_size=...)``.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_RERANK_MODEL,
+        *,
+        candidates: int = DEFAULT_RERANK_CANDIDATES,
+        batch_size: int = DEFAULT_RERANK_BATCH_SIZE,
+        budget_ms: float | None = DEFAULT_RERANK_BUDGET_MS,
+        max_length: int = DEFAULT_RERANK_MAX_LENGTH,
+        device: str = "cpu",
+        model: Any | None = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.model_name = model_name
+        self.candidates = candidates
+        self.batch_size = max(1, batch_size)
+        self.budget_ms = budget_ms
+        self.max_length = max_length
+        self.device = device
+        self._model = model
+        self._clock = clock
+        self._load_lock = threading.Lock()
+        self._load_error: Exception | None = None
+
+    @property
+    def model(self) -> Any:
+        with self._load_lock:
+            if self._model is None:
+                if self._load_error is not None:
+                    raise RuntimeError(f"Reranker {self.model_name} is unavailable") from self._load_error
+                started = self._clock()
+                try:
+                    from sentence_transformers import CrossEncoder
+
+                    self._model = CrossEncoder(self.model_name, max_length=self.max_length, device=self.device)
+                except Exception as exc:
+                    self._load_error = exc
+                    raise
+                logger.info("Loaded reranker %s in %.1fs", self.model_name, self._clock() - started)
+            return self._model
+
+    def rerank(self, question: str, results: Sequence[dict[str, Any]], top_k: int) -> list[dict[str, Any]]:
+        """Return the ``top_k`` best of ``results`` (``KnowledgeIndex.search`` dicts) with ``rerank_score``."""
+        if len(results) <= 1:
+            return list(results)[:top_k]
+        model = self.model
+        started = self._clock()
+        scored: list[tuple[float, int]] = []
+        for start in range(0, len(results), self.batch_size):
+            if self.budget_ms is not None and start and (self._clock() - started) * 1000 >= self.budget_ms:
+                logger.warning(
+                    "Rerank budget of %.0f ms spent after %d of %d candidates", self.budget_ms, start, len(results)
+                )
+                break
+            batch = results[start:start + self.batch_size]
+            pairs = [(question, (result.get("chunk") or {}).get("content", "")) for result in batch]
+            scores = model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            scored.extend((float(score), start + offset) for offset, score in enumerate(scores))
+
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        ranked = [{**results[position], "rerank_score": score} for score, position in scored]
+        ranked.extend(results[len(scored):])
+        logger.debug("Reranked %d candidates in %.1f ms", len(scored), (self._clock() - started) * 1000)
+        return ranked[:top_k]
+
+
+_reranker: CrossEncoderReranker | None = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> CrossEncoderReranker | None:
+    """Return the process-wide reranker, or ``None`` when disabled in ``knowledge_config.yaml``."""
+    global _reranker
+    settings = KnowledgeConfig.load().rerank
+    if not settings.enabled:
+        return None
+    with _reranker_lock:
+        if _reranker is None:
+            _reranker = CrossEncoderReranker(
+                settings.model,
+                candidates=settings.candidates,
+                batch_size=settings.batch_size,
+                budget_ms=settings.budget_ms,
+                max_length=settings.max_length,
+            )
+        return _reranker
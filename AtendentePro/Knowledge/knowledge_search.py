@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+SCORE_BLOCK_ROWS = 16384
+
+
+def normalize_rows(matrix: Any) -> np.ndarray:
+    """Return ``matrix`` as ``float32`` with every row scaled to unit length."""
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def truncate_rows(matrix: Any, dimensions: int) -> np.ndarray:
+    """Keep the first ``dimensions`` components of each row and re-normalise.
+
+    Matryoshka-trained models (``text-embedding-3-*``) front-load the
+    information, so the prefix is itself a usable, shorter embedding.
+    """
+    return normalize_rows(np.atleast_2d(np.asarray(matrix))[:, :dimensions])
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the ``top_k`` highest scores along the last axis, best first.
+
+    Uses ``argpartition`` so only the ``top_k`` winners are fully sorted; the
+    cost stays linear in the number of chunks instead of ``n log n``.
+    """
+    count = scores.shape[-1]
+    k = min(top_k, count)
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.intp)
+
+    if k < count:
+        candidates = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    else:
+        candidates = np.broadcast_to(np.arange(count), scores.shape).copy()
+
+    candidate_scores = np.take_along_axis(scores, candidates, axis=-1)
+    order = np.argsort(-candidate_scores, axis=-1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=-1)
+
+
+def dot_rows(matrix: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    """``matrix @ vectors.T`` in ``float32``.
+
+    A half-precision matrix (usually memory-mapped from the store) is
+    converted ``SCORE_BLOCK_ROWS`` rows at a time, so scoring never holds a
+    private float32 copy of it and the mapped pages stay shared between
+    processes.
+    """
+    if matrix.dtype == np.float32:
+        return matrix @ vectors.T
+    scores = np.empty((matrix.shape[0],) + vectors.shape[:-1], dtype=np.float32)
+    for start in range(0, matrix.shape[0], SCORE_BLOCK_ROWS):
+        block = np.asarray(matrix[start : start + SCORE_BLOCK_ROWS], dtype=np.float32)
+        scores[start : start + len(block)] = block @ vectors.T
+    return scores
+
+
+def score_top_k(matrix: np.ndarray, query: Any, top_k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Score one query against a row-normalised ``matrix`` with a single mat-vec product.
+
+    Returns ``(rows, scores)`` for the ``top_k`` best rows, ordered by cosine similarity.
+    """
+    query_vector = normalize_rows(query)[0]
+    scores = dot_rows(matrix, query_vector)
+    rows = top_k_indices(scores, top_k)
+    return rows, scores[rows]
+
+
+def score_top_k_batch(
+    matrix: np.ndarray, queries: Any, top_k: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Score several queries at once with one mat-mat product.
+
+    Returns ``(rows, scores)`` arrays shaped ``(n_queries, top_k)``.
+    """
+    query_matrix = normalize_rows(queries)
+    scores = dot_rows(matrix, query_matrix).T
+    rows = top_k_indices(scores, top_k)
+    return rows, np.take_along_axis(scores, rows, axis=-1)
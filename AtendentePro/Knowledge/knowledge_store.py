@@ -0,0 +1,434 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import logging
+import mmap
+import os
+import pickle
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from AtendentePro.Knowledge.knowledge_search import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT_VERSION = 1
+HEADER_FILENAME = "store.json"
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-large"
+SUPPORTED_DTYPES = ("float32", "float16")
+
+DEFAULT_STORE_DIR = (
+    Path(__file__).resolve().parents[1] / "Template" / "White_Martins" / "knowledge_documentos" / "embedding"
+)
+
+# One fixed-size row per chunk; the text itself lives in a separate UTF-8 blob.
+CHUNK_DTYPE = np.dtype(
+    [
+        ("source_id", "<i4"),
+        ("start_pos", "<i8"),
+        ("end_pos", "<i8"),
+        ("content_start", "<i8"),
+        ("content_end", "<i8"),
+    ]
+)
+
+
+class StoreHeader(BaseModel):
+    format_version: int = Field(default=STORE_FORMAT_VERSION, description="Versão do formato em disco.")
+    version: str = Field(description="Identificador do conteúdo (hash dos vetores e textos).")
+    embedding_model: str = Field(description="Modelo usado para gerar os embeddings.")
+    dimension: int = Field(description="Dimensão de cada vetor.")
+    dtype: str = Field(default="float32", description="Tipo numérico da matriz em disco.")
+    count: int = Field(description="Quantidade de trechos armazenados.")
+    sources: list[str] = Field(default_factory=list, description="Documentos de origem, indexados por source_id.")
+    created_at: str = Field(description="Data de criação (ISO 8601, UTC).")
+
+    def data_file(self, kind: str) -> str:
+        suffix = ".bin" if kind == "contents" else ".npy"
+        return f"{kind}-{self.version}{suffix}"
+
+
+def _replace_atomically(path: Path, payload: bytes | None = None, array: np.ndarray | None = None) -> None:
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "wb") as file:
+        if array is not None:
+            np.save(file, array, allow_pickle=False)
+        else:
+            file.write(payload or b"")
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def _map_contents(path: Path) -> bytes | mmap.mmap:
+    if path.stat().st_size == 0:
+        return b""
+    with open(path, "rb") as file:
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class EmbeddingStore:
+    """Versioned on-disk embedding store opened with ``mmap``.
+
+    Layout inside the store directory::
+
+        store.json                 header (model, dimension, dtype, count, version)
+        vectors-<version>.npy      unit-normalised (count, dimension) matrix
+        chunks-<version>.npy       CHUNK_DTYPE table (source, positions, content offsets)
+        contents-<version>.bin     UTF-8 chunk texts, addressed by the offsets above
+
+    Data files are named after the content version and the header is replaced
+    last, so a rewrite never disturbs processes still mapping the old files.
+    """
+
+    def __init__(
+        self,
+        header: StoreHeader,
+        vectors: np.ndarray,
+        chunk_table: np.ndarray,
+        contents: bytes | mmap.mmap,
+        directory: Path | None = None,
+    ) -> None:
+        self.header = header
+        self.vectors = vectors
+        self.chunk_table = chunk_table
+        self.contents = contents
+        self.directory = directory
+
+    def __len__(self) -> int:
+        return self.header.count
+
+    @property
+    def version(self) -> str:
+        return self.header.version
+
+    @property
+    def embedding_model(self) -> str:
+        return self.header.embedding_model
+
+    @property
+    def dimension(self) -> int:
+        return self.header.dimension
+
+    @staticmethod
+    def exists(directory: Path | str) -> bool:
+        return (Path(directory) / HEADER_FILENAME).is_file()
+
+    @classmethod
+    def open(cls, directory: Path | str) -> "EmbeddingStore":
+        """Open an existing store without reading the vectors into memory."""
+        directory = Path(directory)
+        header = StoreHeader.model_validate_json((directory / HEADER_FILENAME).read_text(encoding="utf-8"))
+        if header.format_version != STORE_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported store format {header.format_version} in {directory} "
+                f"(expected {STORE_FORMAT_VERSION})"
+            )
+
+        vectors = np.load(directory / header.data_file("vectors"), mmap_mode="r", allow_pickle=False)
+        chunk_table = np.load(directory / header.data_file("chunks"), mmap_mode="r", allow_pickle=False)
+        contents = _map_contents(directory / header.data_file("contents"))
+
+        if vectors.shape != (header.count, header.dimension) or len(chunk_table) != header.count:
+            raise ValueError(f"Store at {directory} does not match its header")
+        return cls(header, vectors, chunk_table, contents, directory)
+
+    @classmethod
+    def build(
+        cls,
+        vectors: Any,
+        chunks: Iterable[dict[str, Any]],
+        *,
+        embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+        dtype: str = "float32",
+    ) -> "EmbeddingStore":
+        """Assemble an in-memory store from raw vectors and chunk dicts."""
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported dtype {dtype!r}; use one of {SUPPORTED_DTYPES}")
+
+        chunks = list(chunks)
+        if chunks:
+            matrix = normalize_rows(vectors).astype(dtype, copy=False)
+        else:
+            matrix = np.empty((0, 0), dtype=dtype)
+        if matrix.shape[0] != len(chunks):
+            raise ValueError(f"Got {matrix.shape[0]} vectors for {len(chunks)} chunks")
+
+        sources: list[str] = []
+        source_ids: dict[str, int] = {}
+        table = np.zeros(len(chunks), dtype=CHUNK_DTYPE)
+        blob = bytearray()
+        for row, chunk in enumerate(chunks):
+            source = str(chunk.get("source", ""))
+            if source not in source_ids:
+                source_ids[source] = len(sources)
+                sources.append(source)
+            encoded = str(chunk.get("content", "")).encode("utf-8")
+            table[row] = (
+                source_ids[source],
+                int(chunk.get("start_pos", 0)),
+                int(chunk.get("end_pos", 0)),
+                len(blob),
+                len(blob) + len(encoded),
+            )
+            blob.extend(encoded)
+
+        digest = hashlib.sha256()
+        digest.update(embedding_model.encode("utf-8"))
+        digest.update(np.ascontiguousarray(matrix).tobytes())
+        digest.update(table.tobytes())
+        digest.update(bytes(blob))
+
+        header = StoreHeader(
+            version=digest.hexdigest()[:16],
+            embedding_model=embedding_model,
+            dimension=int(matrix.shape[1]),
+            dtype=dtype,
+            count=len(chunks),
+            sources=sources,
+            created_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        )
+        return cls(header, matrix, table, bytes(blob))
+
+    def save(self, directory: Path | str) -> "EmbeddingStore":
+        """Write the store to ``directory`` and return it re-opened via ``mmap``."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        _replace_atomically(directory / self.header.data_file("vectors"), array=np.ascontiguousarray(self.vectors))
+        _replace_atomically(directory / self.header.data_file("chunks"), array=np.asarray(self.chunk_table))
+        _replace_atomically(directory / self.header.data_file("contents"), payload=bytes(self.contents))
+        _replace_atomically(
+            directory / HEADER_FILENAME,
+            payload=self.header.model_dump_json(indent=2).encode("utf-8"),
+        )
+        _remove_stale_versions(directory, self.header.version)
+        logger.info("Embedding store %s saved to %s (%d chunks)", self.version, directory, len(self))
+        return type(self).open(directory)
+
+    @classmethod
+    def write(
+        cls,
+        directory: Path | str,
+        vectors: Any,
+        chunks: Iterable[dict[str, Any]],
+        *,
+        embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+        dtype: str = "float32",
+    ) -> "EmbeddingStore":
+        with StoreWriter(directory, embedding_model=embedding_model, dtype=dtype) as writer:
+            writer.append(vectors, chunks)
+            return writer.finish()
+
+    def content(self, row: int) -> str:
+        entry = self.chunk_table[row]
+        return bytes(self.contents[int(entry["content_start"]) : int(entry["content_end"])]).decode("utf-8")
+
+    def chunk(self, row: int) -> dict[str, Any]:
+        """Return the chunk at ``row`` in the same shape ``DocumentProcessor`` produces."""
+        entry = self.chunk_table[row]
+        return {
+            "content": self.content(row),
+            "source": self.header.sources[int(entry["source_id"])],
+            "start_pos": int(entry["start_pos"]),
+            "end_pos": int(entry["end_pos"]),
+        }
+
+    def rows_for_sources(self, sources: Iterable[str]) -> np.ndarray:
+        """Row numbers of every chunk that came from one of ``sources``, in store order."""
+        wanted = [self.header.sources.index(name) for name in set(sources) if name in self.header.sources]
+        return np.flatnonzero(np.isin(self.chunk_table["source_id"], wanted))
+
+    def iter_chunks(self) -> Iterator[dict[str, Any]]:
+        for row in range(len(self)):
+            yield self.chunk(row)
+
+
+class StoreWriter:
+    """Append chunks to a new store version batch by batch.
+
+    Vectors, chunk rows and texts are spooled to hidden files in the store
+    directory as they arrive, so memory stays bounded by one batch however
+    large the corpus is. :meth:`finish` turns the spools into the regular
+    versioned data files (same bytes and version as :meth:`EmbeddingStore.build`)
+    and publishes the header; leaving the ``with`` block without finishing
+    discards them and keeps the current store untouched.
+    """
+
+    def __init__(
+        self,
+        directory: Path | str,
+        *,
+        embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+        dtype: str = "float32",
+    ) -> None:
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported dtype {dtype!r}; use one of {SUPPORTED_DTYPES}")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.embedding_model = embedding_model
+        self.dtype = dtype
+        self.count = 0
+        self.dimension: int | None = None
+        self.sources: list[str] = []
+        self._source_ids: dict[str, int] = {}
+        self._content_size = 0
+        self._spools = {
+            kind: open(self.directory / f".{kind}-{os.getpid()}-{id(self):x}.spool", "w+b")
+            for kind in ("vectors", "chunks", "contents")
+        }
+
+    def __enter__(self) -> "StoreWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.abort()
+
+    def append(self, vectors: Any, chunks: Iterable[dict[str, Any]]) -> None:
+        """Append one batch of vectors and their chunk dicts, in store order."""
+        chunks = list(chunks)
+        if not chunks:
+            return
+        matrix = normalize_rows(vectors).astype(self.dtype, copy=False)
+        if matrix.shape[0] != len(chunks):
+            raise ValueError(f"Got {matrix.shape[0]} vectors for {len(chunks)} chunks")
+        if self.dimension is None:
+            self.dimension = int(matrix.shape[1])
+        elif matrix.shape[1] != self.dimension:
+            raise ValueError(f"Got vectors of dimension {matrix.shape[1]}, store has {self.dimension}")
+
+        table = np.zeros(len(chunks), dtype=CHUNK_DTYPE)
+        blob = bytearray()
+        for row, chunk in enumerate(chunks):
+            source = str(chunk.get("source", ""))
+            if source not in self._source_ids:
+                self._source_ids[source] = len(self.sources)
+                self.sources.append(source)
+            encoded = str(chunk.get("content", "")).encode("utf-8")
+            start = self._content_size + len(blob)
+            table[row] = (
+                self._source_ids[source],
+                int(chunk.get("start_pos", 0)),
+                int(chunk.get("end_pos", 0)),
+                start,
+                start + len(encoded),
+            )
+            blob.extend(encoded)
+
+        self._spools["vectors"].write(np.ascontiguousarray(matrix).tobytes())
+        self._spools["chunks"].write(table.tobytes())
+        self._spools["contents"].write(blob)
+        self._content_size += len(blob)
+        self.count += len(chunks)
+
+    def finish(self) -> EmbeddingStore:
+        """Publish everything appended so far as a new version and return it opened via ``mmap``."""
+        digest = hashlib.sha256()
+        digest.update(self.embedding_model.encode("utf-8"))
+        for spool in self._spools.values():
+            spool.flush()
+            spool.seek(0)
+            for block in iter(lambda: spool.read(1 << 20), b""):
+                digest.update(block)
+
+        header = StoreHeader(
+            version=digest.hexdigest()[:16],
+            embedding_model=self.embedding_model,
+            dimension=self.dimension or 0,
+            dtype=self.dtype,
+            count=self.count,
+            sources=self.sources,
+            created_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        )
+        self._publish_array("vectors", header, np.dtype(self.dtype), (self.count, header.dimension))
+        self._publish_array("chunks", header, CHUNK_DTYPE, (self.count,))
+        contents = self._spools.pop("contents")
+        os.fsync(contents.fileno())
+        contents.close()
+        os.replace(contents.name, self.directory / header.data_file("contents"))
+        _replace_atomically(self.directory / HEADER_FILENAME, payload=header.model_dump_json(indent=2).encode("utf-8"))
+        _remove_stale_versions(self.directory, header.version)
+        logger.info("Embedding store %s saved to %s (%d chunks)", header.version, self.directory, header.count)
+        return EmbeddingStore.open(self.directory)
+
+    def abort(self) -> None:
+        """Discard whatever was spooled and not published yet."""
+        for spool in self._spools.values():
+            spool.close()
+            Path(spool.name).unlink(missing_ok=True)
+        self._spools.clear()
+
+    def _publish_array(self, kind: str, header: StoreHeader, dtype: np.dtype, shape: tuple[int, ...]) -> None:
+        spool = self._spools.pop(kind)
+        path = self.directory / header.data_file(kind)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        try:
+            with open(tmp_path, "wb") as file:
+                np.lib.format.write_array_header_1_0(
+                    file,
+                    {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": shape},
+                )
+                spool.seek(0)
+                shutil.copyfileobj(spool, file, 1 << 20)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, path)
+        finally:
+            spool.close()
+            Path(spool.name).unlink(missing_ok=True)
+
+
+def _remove_stale_versions(directory: Path, keep_version: str) -> None:
+    """Delete data files from older versions; open mmaps keep their inode alive."""
+    for kind in ("vectors", "chunks", "contents"):
+        for path in directory.glob(f"{kind}-*"):
+            if keep_version not in path.name:
+                try:
+                    path.unlink()
+                except OSError as exc:
+                    logger.warning("Could not remove stale store file %s: %s", path, exc)
+
+
+def migrate_pickle(
+    pickle_path: Path | str,
+    directory: Path | str | None = None,
+    *,
+    embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+    dtype: str = "float32",
+) -> EmbeddingStore:
+    """Convert a legacy ``embeddings.pkl`` (trusted input only) into the store format."""
+    pickle_path = Path(pickle_path)
+    with open(pickle_path, "rb") as file:
+        records = pickle.load(file)
+
+    records = [record for record in records if record.get("embedding")]
+    return EmbeddingStore.write(
+        directory or pickle_path.parent,
+        [record["embedding"] for record in records],
+        [record.get("chunk", {}) or {} for record in records],
+        embedding_model=embedding_model,
+        dtype=dtype,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Convert a legacy embeddings.pkl into the mmap store format.")
+    parser.add_argument("pickle_path", type=Path)
+    parser.add_argument("--output", type=Path, default=None, help="Store directory (default: pickle's folder)")
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL)
+    parser.add_argument("--dtype", choices=SUPPORTED_DTYPES, default="float32")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = migrate_pickle(args.pickle_path, args.output, embedding_model=args.model, dtype=args.dtype)
+    print(f"Store {store.version}: {len(store)} chunks, dimension {store.dimension}, dtype {store.header.dtype}")
+
+
+if __name__ == "__main__":
+    main()
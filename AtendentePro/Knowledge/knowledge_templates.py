@@ -7,3 +7,4 @@ _config = KnowledgeConfig.load()
 knowledge_about = _config.about
 knowledge_format = _config.format
 knowledge_template = _config.template
+knowledge_synthesis_mode = _config.synthesis.mode
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import logging
+from functools import lru_cache
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for Portuguese/English prose with the
+# OpenAI tokenizers; used when ``tiktoken`` is not installed.
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def _tiktoken() -> Any:
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning(
+            "tiktoken is not installed; token counts are estimated as characters / %d. "
+            "Install it (see requirements.txt) for exact chunk and context budgets",
+            CHARS_PER_TOKEN,
+        )
+        return None
+    return tiktoken
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str | None) -> Any:
+    tiktoken = _tiktoken()
+    if tiktoken is None:
+        return None
+    if model:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            pass
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def tokenizer_name(model: str | None = None) -> str:
+    """Tokenizer behind :func:`count_tokens` for ``model``: ``tiktoken:<encoding>`` or the ``chars/4`` estimate."""
+    encoding = _get_encoding(model)
+    return f"tiktoken:{encoding.name}" if encoding is not None else f"chars/{CHARS_PER_TOKEN}"
+
+
+def count_tokens(text: str, model: str | None = None) -> int:
+    """Count tokens with ``tiktoken`` when available, otherwise estimate from length."""
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, -(-len(text) // CHARS_PER_TOKEN))
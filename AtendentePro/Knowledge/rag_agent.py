@@ -12,27 +12,68 @@ from typing import List, Dict, Any, Optional
 import logging
 
 
-# Document processing imports
-import PyPDF2
-import docx
-from pptx import Presentation
-import fitz  # PyMuPDF for better PDF handling
-
 # Vector database and embeddings
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-import pickle
+
+try:
+    from AtendentePro.Knowledge.knowledge_chunking import CharacterChunker, Chunker, create_chunker, iter_unique_chunks
+    from AtendentePro.Knowledge.knowledge_config import KnowledgeConfig
+    from AtendentePro.Knowledge.knowledge_embedding_cache import CACHE_FILENAME, EmbeddingCache
+    from AtendentePro.Knowledge.knowledge_embedding_providers import get_embedding_provider
+    from AtendentePro.Knowledge.knowledge_extraction import (
+        DEFAULT_FILE_TIMEOUT,
+        extract_docx,
+        extract_document,
+        extract_documents_parallel,
+        extract_pdf_pages,
+        extract_pptx,
+    )
+    from AtendentePro.Knowledge.knowledge_ingestion import create_embedding_client, embedding_key
+    from AtendentePro.Knowledge.knowledge_lexical import build_lexical_index
+    from AtendentePro.Knowledge.knowledge_manifest import MANIFEST_FILENAME, SUPPORTED_EXTENSIONS, IngestionManifest
+    from AtendentePro.Knowledge.knowledge_pipeline import stream_documents_into_store
+    from AtendentePro.Knowledge.knowledge_query import QueryEmbedder, get_query_cache
+    from AtendentePro.Knowledge.knowledge_search import normalize_rows, score_top_k
+    from AtendentePro.Knowledge.knowledge_store import EmbeddingStore, StoreWriter
+except ModuleNotFoundError:  # running as a standalone script
+    from knowledge_chunking import CharacterChunker, Chunker, create_chunker, iter_unique_chunks
+    from knowledge_config import KnowledgeConfig
+    from knowledge_embedding_cache import CACHE_FILENAME, EmbeddingCache
+    from knowledge_embedding_providers import get_embedding_provider
+    from knowledge_extraction import (
+        DEFAULT_FILE_TIMEOUT,
+        extract_docx,
+        extract_document,
+        extract_documents_parallel,
+        extract_pdf_pages,
+        extract_pptx,
+    )
+    from knowledge_ingestion import create_embedding_client, embedding_key
+    from knowledge_lexical import build_lexical_index
+    from knowledge_manifest import MANIFEST_FILENAME, SUPPORTED_EXTENSIONS, IngestionManifest
+    from knowledge_pipeline import stream_documents_into_store
+    from knowledge_query import QueryEmbedder, get_query_cache
+    from knowledge_search import normalize_rows, score_top_k
+    from knowledge_store import EmbeddingStore, StoreWriter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_DOC_FOLDER = Path(__file__).resolve().parents[1] / "Template" / "White_Martins" / "knowledge_documentos"
+
+def load_chunker() -> Chunker:
+    """Chunker configured in knowledge_config.yaml"""
+    chunking = KnowledgeConfig.load().chunking
+    return create_chunker(chunking.strategy, **chunking.options)
+
 class DocumentProcessor:
     """Handles document processing and text extraction"""
     
-    def __init__(self, doc_folder: str = "/Users/arthurvaz/Desktop/Monkai/AtendentePRO/AtendentePro/Template/knowledge_documentos"):
+    def __init__(self, doc_folder: str = str(DEFAULT_DOC_FOLDER), chunker: Optional[Chunker] = None):
         self.doc_folder = Path(doc_folder)
         self.embedding_folder = self.doc_folder / "embedding"
+        self.chunker = chunker or load_chunker()
         self.documents = {}
         self.chunks = []
         
@@ -42,36 +83,15 @@ class DocumentProcessor:
     def extract_text_from_pdf(self, file_path: Path) -> str:
         """Extract text from PDF files"""
         try:
-            # Try PyMuPDF first for better text extraction
-            doc = fitz.open(file_path)
-            text = ""
-            for page in doc:
-                text += page.get_text()
-            doc.close()
-            return text
+            return extract_pdf_pages(str(file_path))
         except Exception as e:
-            logger.warning(f"PyMuPDF failed for {file_path}, trying PyPDF2: {e}")
-            try:
-                with open(file_path, 'rb') as file:
-                    reader = PyPDF2.PdfReader(file)
-                    text = ""
-                    for page in reader.pages:
-                        text += page.extract_text()
-                    return text
-            except Exception as e2:
-                logger.error(f"Failed to extract text from {file_path}: {e2}")
-                return ""
+            logger.error(f"Failed to extract text from {file_path}: {e}")
+            return ""
     
     def extract_text_from_pptx(self, file_path: Path) -> str:
         """Extract text from PowerPoint files"""
         try:
-            prs = Presentation(file_path)
-            text = ""
-            for slide in prs.slides:
-                for shape in slide.shapes:
-                    if hasattr(shape, "text"):
-                        text += shape.text + "\n"
-            return text
+            return extract_pptx(str(file_path))
         except Exception as e:
             logger.error(f"Failed to extract text from {file_path}: {e}")
             return ""
@@ -79,60 +99,65 @@ class DocumentProcessor:
     def extract_text_from_docx(self, file_path: Path) -> str:
         """Extract text from Word documents"""
         try:
-            doc = docx.Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text
+            return extract_docx(str(file_path))
         except Exception as e:
             logger.error(f"Failed to extract text from {file_path}: {e}")
             return ""
     
-    def process_documents(self) -> Dict[str, str]:
-        """Process all documents in the doc folder"""
+    def extract_text(self, file_path: Path) -> Optional[str]:
+        """Extract text from a supported document; None for unsupported types"""
+        return extract_document(file_path)
+    
+    def process_documents(
+        self,
+        file_names: Optional[List[str]] = None,
+        max_workers: Optional[int] = None,
+        timeout: float = DEFAULT_FILE_TIMEOUT,
+    ) -> Dict[str, str]:
+        """Process documents in the doc folder (all of them, or only file_names) in a process pool"""
         logger.info("Processing documents...")
+        self.documents = {}
         
-        for file_path in self.doc_folder.iterdir():
-            if file_path.is_file():
-                file_ext = file_path.suffix.lower()
-                file_name = file_path.name
-                
-                logger.info(f"Processing: {file_name}")
-                
-                if file_ext == '.pdf':
-                    text = self.extract_text_from_pdf(file_path)
-                elif file_ext == '.pptx':
-                    text = self.extract_text_from_pptx(file_path)
-                elif file_ext == '.docx':
-                    text = self.extract_text_from_docx(file_path)
-                else:
-                    logger.warning(f"Unsupported file type: {file_ext}")
-                    continue
-                
-                if text.strip():
-                    self.documents[file_name] = text
-                    logger.info(f"Successfully processed {file_name} ({len(text)} characters)")
-                else:
-                    logger.warning(f"No text extracted from {file_name}")
+        if file_names is None:
+            file_paths = [path for path in sorted(self.doc_folder.iterdir()) if path.is_file()]
+        else:
+            file_paths = [self.doc_folder / name for name in file_names]
+        
+        texts = extract_documents_parallel(file_paths, max_workers=max_workers, timeout=timeout)
+        for file_path in file_paths:
+            file_name = file_path.name
+            text = texts.get(file_name)
+            if text is None:
+                continue
+            
+            if text.strip():
+                self.documents[file_name] = text
+                logger.info(f"Successfully processed {file_name} ({len(text)} characters)")
+            else:
+                logger.warning(f"No text extracted from {file_name}")
         
         logger.info(f"Processed {len(self.documents)} documents")
         return self.documents
     
-    def create_chunks(self, chunk_size: int = 1000, overlap: int = 200) -> List[Dict[str, Any]]:
-        """Create overlapping chunks from documents"""
+    def chunk_text(self, doc_name: str, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[Dict[str, Any]]:
+        """Split one document into overlapping character chunks"""
+        return list(CharacterChunker(chunk_size, overlap).iter_chunks(doc_name, [text]))
+    
+    def create_chunks(self, chunk_size: Optional[int] = None, overlap: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Create deduplicated chunks from documents with the configured chunker
+        
+        Passing chunk_size or overlap switches to fixed character windows.
+        """
         logger.info("Creating document chunks...")
+        chunker = self.chunker
+        if chunk_size is not None or overlap is not None:
+            chunker = CharacterChunker(chunk_size or 1000, 200 if overlap is None else overlap)
         
-        for doc_name, text in self.documents.items():
-            # Simple chunking by character count
-            for i in range(0, len(text), chunk_size - overlap):
-                chunk = text[i:i + chunk_size]
-                if len(chunk.strip()) > 100:  # Only keep meaningful chunks
-                    self.chunks.append({
-                        'content': chunk,
-                        'source': doc_name,
-                        'start_pos': i,
-                        'end_pos': min(i + chunk_size, len(text))
-                    })
+        self.chunks = list(iter_unique_chunks(
+            chunk
+            for doc_name, text in self.documents.items()
+            for chunk in chunker.iter_chunks(doc_name, [text])
+        ))
         
         logger.info(f"Created {len(self.chunks)} chunks")
         return self.chunks
@@ -140,7 +165,14 @@ class DocumentProcessor:
 class RAGAgent:
     """Main RAG agent using OpenAI Swarm agentframework"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        embedding_concurrency: int = 4,
+        doc_folder: Optional[str] = None,
+        chunker: Optional[Chunker] = None,
+    ):
         # Import config here to avoid circular imports
         from config import OPENAI_API_KEY
         
@@ -148,69 +180,153 @@ class RAGAgent:
         if not self.api_key:
             raise ValueError("OpenAI API key is required. Set it in config.py or pass it to constructor.")
         
-        # Initialize OpenAI client
+        # Initialize OpenAI clients (sync for queries, async for batched ingestion)
         from openai import OpenAI
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = OpenAI(api_key=self.api_key, base_url=base_url)
+        self.query_embedder = QueryEmbedder(self.client, get_query_cache())
+        self.async_client = create_embedding_client(self.api_key, base_url)
+        self.embedding_concurrency = embedding_concurrency
+        embedding_settings = KnowledgeConfig.load().embedding
+        self.embedding_model = embedding_settings.model
+        self.embedding_dimensions = embedding_settings.dimensions
+        if embedding_settings.provider != "openai":
+            # A local provider embeds both the documents and the questions, with no API calls
+            provider = get_embedding_provider()
+            self.query_embedder = QueryEmbedder(provider, get_query_cache())
+            self.async_client = provider
         
         # Initialize document processor
-        self.doc_processor = DocumentProcessor()
+        self.doc_processor = DocumentProcessor(doc_folder or str(DEFAULT_DOC_FOLDER), chunker)
+        self.embedding_cache = EmbeddingCache(self.doc_processor.embedding_folder / CACHE_FILENAME)
         self.embeddings = {}
         self.chunk_embeddings = []
+        self._embedding_matrix: Optional[np.ndarray] = None
+        self.store: Optional[EmbeddingStore] = None
         
     async def process_and_embed_documents(self):
-        """Process documents and create embeddings"""
+        """Rebuild the embedding store from every document in the doc folder"""
         logger.info("Processing and embedding documents...")
+        await self.refresh_embeddings(full=True)
+        logger.info(f"Successfully embedded {len(self.chunk_embeddings)} chunks")
+    
+    async def refresh_embeddings(self, full: bool = False) -> bool:
+        """Re-ingest only the documents added, changed or removed since the last run.
         
-        # Process documents
-        self.doc_processor.process_documents()
-        self.doc_processor.create_chunks()
+        Documents are streamed page by page through extraction, chunking,
+        embedding and into a new store version, so memory does not grow with
+        the corpus. With full=True every document is re-ingested.
+        Returns True when the store was rewritten.
+        """
+        folder = self.doc_processor.embedding_folder
+        manifest_path = folder / MANIFEST_FILENAME
+        manifest = IngestionManifest.load(manifest_path)
         
-        # Create embeddings for chunks
-        for i, chunk in enumerate(self.doc_processor.chunks):
+        previous = None
+        if not full and EmbeddingStore.exists(folder):
             try:
-                response = self.client.embeddings.create(
-                    model="text-embedding-3-large",
-                    input=chunk['content']
-                )
-                embedding = response.data[0].embedding
-                self.chunk_embeddings.append({
-                    'chunk': chunk,
-                    'embedding': embedding,
-                    'index': i
-                })
-                logger.info(f"Embedded chunk {i+1}/{len(self.doc_processor.chunks)}")
+                previous = EmbeddingStore.open(folder)
             except Exception as e:
-                logger.error(f"Failed to embed chunk {i}: {e}")
+                logger.warning(f"Ignoring unreadable embedding store: {e}")
+        chunker = self.doc_processor.chunker
+        if (
+            previous is None
+            or previous.embedding_model != self.embedding_model
+            or manifest.embedding_dimensions != self.embedding_dimensions
+            or manifest.store_version != previous.version
+            or manifest.chunker != chunker.signature
+        ):
+            # The manifest no longer describes the store on disk: rebuild everything
+            manifest = IngestionManifest()
+            previous = None
         
-        logger.info(f"Successfully embedded {len(self.chunk_embeddings)} chunks")
+        diff = manifest.diff(self.doc_processor.doc_folder, SUPPORTED_EXTENSIONS)
+        if not diff.has_changes:
+            manifest.save(manifest_path)  # keeps refreshed fingerprints of touched files
+            logger.info("Knowledge base is up to date")
+            return False
+        logger.info(
+            f"Ingestion changes: {len(diff.added)} added, {len(diff.changed)} changed, "
+            f"{len(diff.removed)} removed, {len(diff.unchanged)} unchanged"
+        )
+        
+        with StoreWriter(folder, embedding_model=self.embedding_model) as writer:
+            # Unchanged documents keep their rows as they are, copied slice by slice
+            if previous is not None:
+                rows = previous.rows_for_sources(diff.unchanged)
+                for start in range(0, len(rows), 1024):
+                    batch = rows[start:start + 1024]
+                    writer.append(previous.vectors[batch], [previous.chunk(row) for row in batch])
+            
+            # Only new or modified documents are extracted, chunked and embedded
+            result = await stream_documents_into_store(
+                [self.doc_processor.doc_folder / name for name in diff.to_ingest],
+                writer,
+                client=self.async_client,
+                model=self.embedding_model,
+                dimensions=self.embedding_dimensions,
+                chunker=chunker,
+                concurrency=self.embedding_concurrency,
+                cache=self.embedding_cache,
+            )
+            store = writer.finish()
+        
+        # The BM25 inverted index is built over the same chunks, next to the store
+        build_lexical_index(store, folder)
+        
+        manifest.forget(diff.removed + diff.changed)
+        for name in diff.to_ingest:
+            if name in result.failed_sources:
+                logger.warning(f"{name} could not be fully ingested; it will be retried next run")
+                continue
+            manifest.record(self.doc_processor.doc_folder / name, result.chunk_counts.get(name, 0))
+        manifest.embedding_model = self.embedding_model
+        manifest.embedding_dimensions = self.embedding_dimensions
+        manifest.chunker = chunker.signature
+        manifest.store_version = store.version
+        manifest.save(manifest_path)
+        
+        # Drop cached vectors no document references anymore
+        cache_key = embedding_key(self.embedding_model, self.embedding_dimensions)
+        self.embedding_cache.prune(cache_key, (chunk['content'] for chunk in store.iter_chunks()))
+        stats = self.embedding_cache.stats
+        logger.info(
+            f"Embedding cache: {stats.hits} hits, {stats.misses} misses "
+            f"({stats.hit_rate:.0%} hit rate), {stats.entries} entries, {stats.evicted} evicted"
+        )
+        self.load_embeddings()
+        return True
     
     def find_relevant_chunks(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """Find most relevant chunks for a given query"""
         try:
-            # Get query embedding
-            response = self.client.embeddings.create(
-                model="text-embedding-3-small",
-                input=query
-            )
-            query_embedding = response.data[0].embedding
-            
-            # Calculate similarities
-            similarities = []
-            for chunk_data in self.chunk_embeddings:
-                similarity = cosine_similarity(
-                    [query_embedding], 
-                    [chunk_data['embedding']]
-                )[0][0]
-                similarities.append((similarity, chunk_data))
+            # Score every chunk with one matrix-vector product and keep the top_k
+            matrix = self._get_embedding_matrix()
+            if matrix.shape[0] == 0:
+                return []
             
-            # Sort by similarity and return top_k
-            similarities.sort(key=lambda x: x[0], reverse=True)
-            return [chunk_data for _, chunk_data in similarities[:top_k]]
+            # Queries must use the model (and dimension) the chunks were embedded with
+            if self.store is not None:
+                query_embedding = self.query_embedder.embed_for_store(query, self.store)
+            else:
+                query_embedding = self.query_embedder.embed(
+                    query, model=self.embedding_model, dimensions=self.embedding_dimensions
+                )
+            rows, _ = score_top_k(matrix, query_embedding, top_k)
+            return [self.chunk_embeddings[row] for row in rows]
             
         except Exception as e:
             logger.error(f"Error finding relevant chunks: {e}")
             return []
     
+    def _get_embedding_matrix(self) -> np.ndarray:
+        """Row-normalised matrix of chunk embeddings, rebuilt only when the list changes"""
+        if self._embedding_matrix is None or self._embedding_matrix.shape[0] != len(self.chunk_embeddings):
+            if self.chunk_embeddings:
+                self._embedding_matrix = normalize_rows([item['embedding'] for item in self.chunk_embeddings])
+            else:
+                self._embedding_matrix = np.empty((0, 0), dtype=np.float32)
+        return self._embedding_matrix
+    
     async def answer_question(self, question: str) -> Dict[str, Any]:
         """Answer a question using RAG"""
         logger.info(f"Processing question: {question}")
@@ -275,23 +391,31 @@ class RAGAgent:
                 'confidence': 0.0
             }
     
-    def save_embeddings(self, filename: str = "embeddings.pkl"):
-        """Save embeddings to disk for reuse"""
+    def save_embeddings(self, dtype: str = "float32"):
+        """Save embeddings to the memory-mapped store for reuse"""
         try:
-            filepath = self.doc_processor.embedding_folder / filename
-            with open(filepath, 'wb') as f:
-                pickle.dump(self.chunk_embeddings, f)
-            logger.info(f"Embeddings saved to {filepath}")
+            store = EmbeddingStore.write(
+                self.doc_processor.embedding_folder,
+                self._get_embedding_matrix(),
+                [item['chunk'] for item in self.chunk_embeddings],
+                embedding_model=self.embedding_model,
+                dtype=dtype,
+            )
+            build_lexical_index(store, self.doc_processor.embedding_folder)
+            logger.info(f"Embeddings saved to {store.directory} (version {store.version})")
         except Exception as e:
             logger.error(f"Failed to save embeddings: {e}")
     
-    def load_embeddings(self, filename: str = "embeddings.pkl"):
-        """Load embeddings from disk"""
+    def load_embeddings(self):
+        """Load embeddings from the memory-mapped store"""
         try:
-            filepath = self.doc_processor.embedding_folder / filename
-            with open(filepath, 'rb') as f:
-                self.chunk_embeddings = pickle.load(f)
-            logger.info(f"Embeddings loaded from {filepath}")
+            store = EmbeddingStore.open(self.doc_processor.embedding_folder)
+            self.store = store
+            self.chunk_embeddings = [
+                {'chunk': chunk, 'index': i} for i, chunk in enumerate(store.iter_chunks())
+            ]
+            self._embedding_matrix = np.asarray(store.vectors, dtype=np.float32)
+            logger.info(f"Embeddings loaded from {store.directory} (version {store.version})")
         except Exception as e:
             logger.error(f"Failed to load embeddings: {e}")
 
@@ -309,12 +433,10 @@ async def main():
     # Initialize the RAG agent
     agent = RAGAgent(OPENAI_API_KEY)
     
-    # Process documents (this will take some time)
-    print("Processing documents and creating embeddings...")
-    await agent.process_and_embed_documents()
-    
-    # Save embeddings for future use
-    agent.save_embeddings()
+    # Process only documents added, changed or removed since the last run
+    print("Updating document embeddings...")
+    if not await agent.refresh_embeddings():
+        agent.load_embeddings()
     
     # Interactive question answering
     print("\nRAG Agent is ready! Ask questions about the documents.")
@@ -351,11 +473,10 @@ if __name__ == "__main__":
         import docx
         from pptx import Presentation
         import fitz
-        import sklearn
     except ImportError as e:
         print(f"Missing required package: {e}")
         print("Please install required packages:")
-        print("pip install PyPDF2 python-docx python-pptx PyMuPDF scikit-learn")
+        print("pip install PyPDF2 python-docx python-pptx PyMuPDF numpy")
         exit(1)
     
     # Run the main function
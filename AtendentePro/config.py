@@ -22,6 +22,23 @@ CONTEXT_OUTPUT_DIR = "context"
 # Modelo padrão utilizado pelos agentes Swarm
 DEFAULT_MODEL = "gpt-4.1"
 
+# Cliente OpenAI compartilhado pelas ferramentas (pool de conexões keep-alive)
+OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', '100'))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', '20'))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', '30'))
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '60'))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv('OPENAI_CONNECT_TIMEOUT', '5'))
+OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '2'))
+
+# Compactação da transcrição: acima de TRANSCRIPT_MAX_TOKENS os turnos antigos viram um resumo
+# estruturado e só os últimos TRANSCRIPT_KEEP_TOKENS seguem na íntegra (0 desliga)
+TRANSCRIPT_MAX_TOKENS = int(os.getenv('TRANSCRIPT_MAX_TOKENS', '8000'))
+TRANSCRIPT_KEEP_TOKENS = int(os.getenv('TRANSCRIPT_KEEP_TOKENS', '3000'))
+TRANSCRIPT_SUMMARY_REQUESTS = int(os.getenv('TRANSCRIPT_SUMMARY_REQUESTS', '10'))
+
+# Arquivo JSONL com latência e tokens por sessão, agente, ferramenta e handoff (vazio desliga)
+METRICS_TRACE_PATH = os.getenv('METRICS_TRACE_PATH', '')
+
 
 RECOMMENDED_PROMPT_PREFIX = """"
 [CONTEXT SYSTEM]
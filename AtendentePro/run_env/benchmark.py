@@ -0,0 +1,437 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+import logging
+import sys
+import time
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+import httpx
+import numpy as np
+from agents import OpenAIProvider, RunConfig, Runner
+from pydantic import BaseModel, Field
+
+if __package__ is None or __package__ == "":
+    package_root = Path(__file__).resolve().parents[1]
+    if str(package_root.parent) not in sys.path:
+        sys.path.append(str(package_root.parent))
+    from AtendentePro import configure_agent_network  # type: ignore
+    from AtendentePro.Knowledge.knowledge_answer_cache import get_answer_cache  # type: ignore
+    from AtendentePro.Knowledge.knowledge_query import NATIVE_DIMENSIONS, get_query_cache  # type: ignore
+    from AtendentePro.Knowledge.knowledge_tokens import count_tokens  # type: ignore
+    from AtendentePro.run_env.server import ConversationService  # type: ignore
+    from AtendentePro.utils.openai_client import (  # type: ignore
+        create_async_openai_client,
+        set_async_openai_client,
+    )
+    from AtendentePro.utils.session_store import create_session_store  # type: ignore
+else:
+    from AtendentePro import configure_agent_network
+    from AtendentePro.Knowledge.knowledge_answer_cache import get_answer_cache
+    from AtendentePro.Knowledge.knowledge_query import NATIVE_DIMENSIONS, get_query_cache
+    from AtendentePro.Knowledge.knowledge_tokens import count_tokens
+    from AtendentePro.run_env.server import ConversationService
+    from AtendentePro.utils.openai_client import (
+        create_async_openai_client,
+        set_async_openai_client,
+    )
+    from AtendentePro.utils.session_store import create_session_store
+
+logger = logging.getLogger(__name__)
+
+FAKE_BASE_URL = "http://fake-openai.local/v1"
+DEFAULT_EMBEDDING_DIMENSIONS = 1536
+
+
+class ScriptedTurn(BaseModel):
+    message: str = Field(description="Mensagem do usuário.")
+    route: list[str] = Field(
+        default_factory=list,
+        description="Ferramentas chamadas em ordem (handoffs `transfer_to_*` ou ferramentas) antes da resposta.",
+    )
+    in_scope: bool = Field(
+        default=True, description="Valor dos booleanos das saídas estruturadas (ex.: `is_in_scope` dos guardrails)."
+    )
+
+
+class Scenario(BaseModel):
+    name: str = Field(description="Nome do cenário.")
+    turns: list[ScriptedTurn] = Field(description="Turnos da conversa, em ordem.")
+
+
+SCENARIOS = [
+    Scenario(
+        name="iva",
+        turns=[
+            ScriptedTurn(
+                message="Preciso determinar o código IVA de uma compra de oxigênio medicinal.",
+                route=["transfer_to_flow_agent", "transfer_to_interview_agent"],
+            ),
+            ScriptedTurn(
+                message="A compra é para consumo próprio, dentro do estado, com fornecedor do Simples Nacional.",
+                route=["transfer_to_answer_agent"],
+            ),
+        ],
+    ),
+    Scenario(
+        name="knowledge",
+        turns=[
+            ScriptedTurn(
+                message="Como faço para emitir uma carta de correção de uma nota fiscal?",
+                route=["transfer_to_knowledge_agent", "go_to_rag"],
+            ),
+            ScriptedTurn(message="E qual é o prazo para o cancelamento extemporâneo?", route=["go_to_rag"]),
+        ],
+    ),
+    Scenario(
+        name="out_of_scope",
+        turns=[ScriptedTurn(message="Qual vai ser a previsão do tempo amanhã em São Paulo?", in_scope=False)],
+    ),
+]
+
+
+def _item_text(item: Any) -> str:
+    content = item.get("content") if isinstance(item, dict) else None
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content if isinstance(content, str) else ""
+
+
+def sample_from_schema(schema: dict[str, Any], flag: bool, defs: dict[str, Any] | None = None) -> Any:
+    """Smallest value matching a JSON schema; booleans are set to ``flag``."""
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return sample_from_schema(defs.get(schema["$ref"].rsplit("/", 1)[-1], {}), flag, defs)
+    for key in ("anyOf", "oneOf", "allOf"):
+        if schema.get(key):
+            return sample_from_schema(schema[key][0], flag, defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if isinstance(kind, list):
+        kind = next((option for option in kind if option != "null"), "null")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        return {name: sample_from_schema(value, flag, defs) for name, value in properties.items()}
+    if kind == "array":
+        return []
+    if kind == "boolean":
+        return flag
+    if kind in ("integer", "number"):
+        return 0
+    if kind == "string":
+        return "benchmark"
+    return None
+
+
+class FakeOpenAIBackend:
+    """Deterministic stand-in for the Responses and Embeddings APIs, served through ``httpx.MockTransport``.
+
+    A model call follows the scripted ``route`` of the latest user message:
+    it calls the next tool of the route when the agent offers it, otherwise
+    it answers (a short text, or a sample of the requested JSON schema).
+    ``latency`` and ``embedding_latency`` are awaited per call, so concurrent
+    conversations overlap as they would against the real API.
+    """
+
+    def __init__(
+        self,
+        scenarios: list[Scenario] = SCENARIOS,
+        *,
+        latency: float = 0.0,
+        embedding_latency: float = 0.0,
+    ) -> None:
+        self.turns = {turn.message: turn for scenario in scenarios for turn in scenario.turns}
+        self.latency = latency
+        self.embedding_latency = embedding_latency
+        self.model_calls = 0
+        self.embedding_calls = 0
+        self._ids = itertools.count(1)
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content or b"{}")
+        if request.url.path.endswith("/embeddings"):
+            self.embedding_calls += 1
+            await asyncio.sleep(self.embedding_latency)
+            return httpx.Response(200, json=self._embeddings(body))
+        if request.url.path.endswith("/responses"):
+            self.model_calls += 1
+            await asyncio.sleep(self.latency)
+            response = self._response(body)
+            if body.get("stream"):
+                return httpx.Response(
+                    200, content=self._sse(response), headers={"content-type": "text/event-stream"}
+                )
+            return httpx.Response(200, json=response)
+        return httpx.Response(404, json={"error": {"message": f"Unexpected path {request.url.path}"}})
+
+    def _embeddings(self, body: dict[str, Any]) -> dict[str, Any]:
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        model = body.get("model", "")
+        dimensions = body.get("dimensions") or NATIVE_DIMENSIONS.get(model, DEFAULT_EMBEDDING_DIMENSIONS)
+        data = []
+        for index, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.sha256(str(text).encode("utf-8")).digest()[:8], "little")
+            vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+            vector /= np.linalg.norm(vector)
+            if body.get("encoding_format") == "base64":
+                embedding: Any = base64.b64encode(vector.tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": index, "embedding": embedding})
+        tokens = sum(count_tokens(str(text)) for text in texts)
+        usage = {"prompt_tokens": tokens, "total_tokens": tokens}
+        return {"object": "list", "data": data, "model": model, "usage": usage}
+
+    def _response(self, body: dict[str, Any]) -> dict[str, Any]:
+        items = body.get("input", [])
+        items = [{"role": "user", "content": items}] if isinstance(items, str) else items
+        last_user = max((index for index, item in enumerate(items) if item.get("role") == "user"), default=-1)
+        message = _item_text(items[last_user]) if last_user >= 0 else ""
+        turn = self.turns.get(message, ScriptedTurn(message=message))
+        step = sum(1 for item in items[last_user + 1 :] if item.get("type") == "function_call")
+        tools = {tool.get("name") for tool in body.get("tools", []) if isinstance(tool, dict)}
+
+        if step < len(turn.route) and turn.route[step] in tools:
+            name = turn.route[step]
+            arguments = json.dumps({"question": message}, ensure_ascii=False) if name == "go_to_rag" else "{}"
+            output = {
+                "type": "function_call",
+                "id": f"fc_{next(self._ids)}",
+                "call_id": f"call_{next(self._ids)}",
+                "name": name,
+                "arguments": arguments,
+                "status": "completed",
+            }
+        else:
+            text_format = (body.get("text") or {}).get("format") or {}
+            if text_format.get("type") == "json_schema":
+                sample = sample_from_schema(text_format.get("schema", {}), turn.in_scope)
+                text = json.dumps(sample, ensure_ascii=False)
+            else:
+                text = f"Resposta simulada para: {message}"
+            output = {
+                "type": "message",
+                "id": f"msg_{next(self._ids)}",
+                "role": "assistant",
+                "status": "completed",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }
+        input_tokens = count_tokens(json.dumps(body, ensure_ascii=False))
+        output_tokens = count_tokens(json.dumps(output, ensure_ascii=False))
+        return {
+            "id": f"resp_{next(self._ids)}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": body.get("model", "fake"),
+            "status": "completed",
+            "output": [output],
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": [],
+            "usage": {
+                "input_tokens": input_tokens,
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens": output_tokens,
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": input_tokens + output_tokens,
+            },
+        }
+
+    @staticmethod
+    def _sse(response: dict[str, Any]) -> bytes:
+        output = response["output"][0]
+        events: list[dict[str, Any]] = [
+            {"type": "response.created", "response": {**response, "status": "in_progress", "output": []}}
+        ]
+        if output["type"] == "message":
+            events.append(
+                {
+                    "type": "response.output_text.delta",
+                    "item_id": output["id"],
+                    "output_index": 0,
+                    "content_index": 0,
+                    "delta": output["content"][0]["text"],
+                    "logprobs": [],
+                }
+            )
+        events.append({"type": "response.output_item.done", "item": output, "output_index": 0})
+        events.append({"type": "response.completed", "response": response})
+        lines = []
+        for number, event in enumerate(events):
+            payload = json.dumps({**event, "sequence_number": number}, ensure_ascii=False)
+            lines.append(f"event: {event['type']}\ndata: {payload}\n\n")
+        return "".join(lines).encode("utf-8")
+
+
+class BenchmarkResult(BaseModel):
+    concurrency: int = Field(description="Conversas simultâneas.")
+    conversations: int = Field(description="Conversas executadas.")
+    turns: int = Field(description="Turnos executados.")
+    errors: int = Field(default=0, description="Turnos que terminaram em erro.")
+    seconds: float = Field(description="Duração total da rodada.")
+    turns_per_second: float = Field(description="Vazão em turnos por segundo.")
+    p50_ms: float = Field(description="Latência mediana por turno, em ms.")
+    p95_ms: float = Field(description="Latência p95 por turno, em ms.")
+    p99_ms: float = Field(description="Latência p99 por turno, em ms.")
+    mean_hops: float = Field(description="Média de handoffs entre agentes por turno.")
+    hops_by_scenario: dict[str, float] = Field(
+        default_factory=dict, description="Handoffs entre agentes por turno, por cenário."
+    )
+    model_calls: int = Field(default=0, description="Chamadas à API Responses simulada.")
+    embedding_calls: int = Field(default=0, description="Chamadas à API Embeddings simulada.")
+
+
+async def run_benchmark(
+    scenarios: list[Scenario] = SCENARIOS,
+    *,
+    concurrency: int = 1,
+    conversations: int = 30,
+    latency: float = 0.0,
+    embedding_latency: float = 0.0,
+) -> BenchmarkResult:
+    """Replay ``conversations`` scripted conversations, ``concurrency`` at a time, against the fake backend.
+
+    Turns go through :class:`ConversationService` over the configured agent
+    graph, so sessions, compaction, hooks and tools run as in the server.
+    The query-embedding and answer caches are cleared first, so every run
+    starts cold. Model calls reach the fake backend through the run's
+    ``RunConfig`` (with tracing disabled) and tool calls through
+    :func:`set_async_openai_client`, so the Agents SDK defaults are never
+    touched; runs that tools or guardrails start themselves with
+    ``Runner.run`` do not see this ``RunConfig``.
+    """
+    # Runs must not inherit entries warmed by a previous run (e.g. a lower concurrency level).
+    get_query_cache().clear()
+    answer_cache = get_answer_cache()
+    if answer_cache is not None:
+        answer_cache.clear()
+    backend = FakeOpenAIBackend(scenarios, latency=latency, embedding_latency=embedding_latency)
+    client = create_async_openai_client(
+        api_key="sk-benchmark", base_url=FAKE_BASE_URL, max_retries=0, transport=backend.transport()
+    )
+    # Nothing leaves the machine: no trace export, every API call goes to the fake backend.
+    run_config = RunConfig(model_provider=OpenAIProvider(openai_client=client), tracing_disabled=True)
+    service = ConversationService(
+        create_session_store("memory", max_sessions=max(conversations, 1)),
+        max_concurrent_turns=max(concurrency, 1),
+        run_streamed=partial(Runner.run_streamed, run_config=run_config),
+    )
+    gate = asyncio.Semaphore(max(concurrency, 1))
+    latencies: list[float] = []
+    hops: dict[str, list[int]] = {scenario.name: [] for scenario in scenarios}
+    errors = 0
+
+    async def converse(scenario: Scenario) -> None:
+        nonlocal errors
+        async with gate:
+            session = await service.create_session("triage")
+            for turn in scenario.turns:
+                started = time.perf_counter()
+                agents_seen = 0
+                async for payload in service.run_turn(session.session_id, turn.message):
+                    if payload["type"] == "agent":
+                        agents_seen += 1
+                    elif payload["type"] == "error":
+                        errors += 1
+                latencies.append(time.perf_counter() - started)
+                # The run announces its starting agent too; every further one is a handoff.
+                hops[scenario.name].append(max(agents_seen - 1, 0))
+
+    plan = [scenarios[number % len(scenarios)] for number in range(conversations)]
+    set_async_openai_client(client)
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(converse(scenario) for scenario in plan))
+    finally:
+        set_async_openai_client(None)
+        await client.close()
+    seconds = time.perf_counter() - started
+
+    millis = np.asarray(latencies or [0.0]) * 1000
+    all_hops = [count for counts in hops.values() for count in counts]
+    return BenchmarkResult(
+        concurrency=concurrency,
+        conversations=conversations,
+        turns=len(latencies),
+        errors=errors,
+        seconds=seconds,
+        turns_per_second=len(latencies) / seconds if seconds > 0 else 0.0,
+        p50_ms=float(np.percentile(millis, 50)),
+        p95_ms=float(np.percentile(millis, 95)),
+        p99_ms=float(np.percentile(millis, 99)),
+        mean_hops=float(np.mean(all_hops)) if all_hops else 0.0,
+        hops_by_scenario={name: float(np.mean(counts)) for name, counts in hops.items() if counts},
+        model_calls=backend.model_calls,
+        embedding_calls=backend.embedding_calls,
+    )
+
+
+def load_scenarios(path: str | Path) -> list[Scenario]:
+    """Scenarios from a JSON file holding a list of ``{"name", "turns": [{"message", "route"}]}``."""
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    return [Scenario.model_validate(item) for item in data]
+
+
+def format_results(results: list[BenchmarkResult]) -> str:
+    rows = [
+        f"{'conc':>5} {'turns':>6} {'err':>4} {'turns/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'hops':>5}"
+    ]
+    for result in results:
+        rows.append(
+            f"{result.concurrency:>5} {result.turns:>6} {result.errors:>4} {result.turns_per_second:>9.1f} "
+            f"{result.p50_ms:>9.1f} {result.p95_ms:>9.1f} {result.p99_ms:>9.1f} {result.mean_hops:>5.2f}"
+        )
+    return "\n".join(rows)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Replay scripted conversations against a fake OpenAI backend.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Simultaneous conversations")
+    parser.add_argument("--conversations", type=int, default=48, help="Conversations per concurrency level")
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds per simulated model call")
+    parser.add_argument("--embedding-latency", type=float, default=0.05, help="Seconds per simulated embedding call")
+    parser.add_argument("--scenarios", help="JSON file with scenarios (default: built-in IVA/knowledge/out-of-scope)")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file")
+    return parser.parse_args()
+
+
+async def _main(args: argparse.Namespace) -> list[BenchmarkResult]:
+    scenarios = load_scenarios(args.scenarios) if args.scenarios else SCENARIOS
+    results = []
+    for concurrency in args.concurrency:
+        results.append(
+            await run_benchmark(
+                scenarios,
+                concurrency=concurrency,
+                conversations=args.conversations,
+                latency=args.latency,
+                embedding_latency=args.embedding_latency,
+            )
+        )
+    return results
+
+
+def main() -> None:
+    args = parse_args()
+    configure_agent_network()
+    results = asyncio.run(_main(args))
+    print(format_results(results))
+    if args.json_path:
+        Path(args.json_path).write_text(
+            json.dumps([result.model_dump() for result in results], indent=2, ensure_ascii=False), encoding="utf-8"
+        )
+
+
+if __name__ == "__main__":
+    main()
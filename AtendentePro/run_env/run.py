@@ -24,6 +24,10 @@ if __package__ is None or __package__ == "":
     from AtendentePro.Triage.triage_agent import triage_agent  # type: ignore
     from AtendentePro.Usage.usage_agent import usage_agent  # type: ignore
     from AtendentePro.guardrail_messages import get_guardrail_message  # type: ignore
+    from AtendentePro.utils.compaction import CompactionSettings, compact_transcript  # type: ignore
+    from AtendentePro.utils.metrics import MetricsHooks, current_session, install_metrics_processor  # type: ignore
+    from AtendentePro.utils.openai_client import use_shared_client_for_agents  # type: ignore
+    from AtendentePro.utils.session_store import SessionState, SessionStore, create_session_store  # type: ignore
 else:
     from AtendentePro import configure_agent_network
     from AtendentePro.Answer.answer_agent import answer_agent
@@ -34,6 +38,10 @@ else:
     from AtendentePro.Triage.triage_agent import triage_agent
     from AtendentePro.Usage.usage_agent import usage_agent
     from AtendentePro.guardrail_messages import get_guardrail_message
+    from AtendentePro.utils.compaction import CompactionSettings, compact_transcript
+    from AtendentePro.utils.metrics import MetricsHooks, current_session, install_metrics_processor
+    from AtendentePro.utils.openai_client import use_shared_client_for_agents
+    from AtendentePro.utils.session_store import SessionState, SessionStore, create_session_store
 
 
 AGENT_REGISTRY = {
@@ -47,14 +55,57 @@ AGENT_REGISTRY = {
 }
 
 
-async def run_demo_loop_with_guardrails(agent, *, stream: bool = True, context=None):
+def find_agent(name: str):
+    """Agent registered as ``name`` or reachable by handoff whose ``Agent.name`` is ``name``."""
+    if name in AGENT_REGISTRY:
+        return AGENT_REGISTRY[name]
+    pending = list(AGENT_REGISTRY.values())
+    seen: set[int] = set()
+    while pending:
+        agent = pending.pop()
+        if id(agent) in seen:
+            continue
+        seen.add(id(agent))
+        if agent.name == name:
+            return agent
+        pending.extend(handoff for handoff in agent.handoffs if hasattr(handoff, "handoffs"))
+    raise ValueError(f"Unknown agent {name!r}; use one of {sorted(AGENT_REGISTRY)}")
+
+
+async def run_demo_loop_with_guardrails(
+    agent,
+    *,
+    stream: bool = True,
+    context=None,
+    store: SessionStore | None = None,
+    session_id: str | None = None,
+):
     """Run a REPL loop with guardrails handling.
     
     This custom version handles InputGuardrailTripwireTriggered exceptions
     by providing user-friendly messages from client-specific configuration files.
+    With a ``store`` and ``session_id`` the conversation resumes from, and is
+    saved to, the store after every turn.
     """
+    # Model calls and tools share one pooled AsyncOpenAI client on this loop.
+    use_shared_client_for_agents()
+    # Latency and token accounting; the JSONL trace is written when METRICS_TRACE_PATH is set.
+    install_metrics_processor()
+    current_session.set(session_id or "cli")
+    compaction = CompactionSettings.from_config()
     current_agent = agent
     input_items: list[TResponseInputItem] = []
+    state = store.load(session_id) if store is not None and session_id else None
+    if state is not None:
+        current_agent = find_agent(state.agent_name)
+        input_items = list(state.input_items)
+        context = state.context
+        print(f"↩️  Sessão {session_id} retomada ({len(input_items)} itens, agente {current_agent.name}).")
+    elif store is not None and session_id:
+        state = SessionState(session_id=session_id, agent_name=current_agent.name)
+        if context is not None:
+            state.context = context
+        context = state.context
     
     print(f"🤖 Agente {agent.name} iniciado. Digite 'exit' ou 'quit' para sair.\n")
     
@@ -73,10 +124,14 @@ async def run_demo_loop_with_guardrails(agent, *, stream: bool = True, context=N
             continue
 
         input_items.append({"role": "user", "content": user_input})
+        # Older turns become a summary so each request stays roughly the same size.
+        input_items = compact_transcript(input_items, context, compaction)
 
         try:
-            result = Runner.run_streamed(current_agent, input=input_items, context=context)
+            hooks = MetricsHooks(session_id or "cli")
+            result = Runner.run_streamed(current_agent, input=input_items, context=context, hooks=hooks)
             async for event in result.stream_events():
+                hooks.observe_stream_event(event)
                 if isinstance(event, RawResponsesStreamEvent):
                     if isinstance(event.data, ResponseTextDeltaEvent):
                         print(event.data.delta, end="", flush=True)
@@ -99,10 +154,17 @@ async def run_demo_loop_with_guardrails(agent, *, stream: bool = True, context=N
                 "role": "assistant", 
                 "content": get_guardrail_message("out_of_scope", detailed=False)
             })
+            if state is not None:
+                state.input_items = input_items
+                store.save(state)
             continue
 
         current_agent = result.last_agent
         input_items = result.to_input_list()
+        if state is not None:
+            state.agent_name = current_agent.name
+            state.input_items = input_items
+            store.save(state)
 
 
 def parse_args() -> argparse.Namespace:
@@ -114,6 +176,10 @@ def parse_args() -> argparse.Namespace:
         default="triage",
         help="Agent to start (default: triage)",
     )
+    parser.add_argument(
+        "--session",
+        help="Persist the conversation under this id (SQLite in CONTEXT_OUTPUT_DIR) and resume it if it exists",
+    )
     return parser.parse_args()
 
 
@@ -123,7 +189,8 @@ def main() -> None:
     agent = AGENT_REGISTRY[args.agent]
     print(f"Iniciando sessão com o agente: {agent.name}\n")
     
-    asyncio.run(run_demo_loop_with_guardrails(agent))
+    store = create_session_store("sqlite", ttl=None) if args.session else None
+    asyncio.run(run_demo_loop_with_guardrails(agent, store=store, session_id=args.session))
 
 
 if __name__ == "__main__":
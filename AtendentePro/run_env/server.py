@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import uuid
+import weakref
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable
+
+from agents import InputGuardrailTripwireTriggered, Runner
+from agents.items import TResponseInputItem
+from agents.stream_events import AgentUpdatedStreamEvent, RawResponsesStreamEvent, RunItemStreamEvent
+from openai.types.responses.response_text_delta_event import ResponseTextDeltaEvent
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+if __package__ is None or __package__ == "":
+    package_root = Path(__file__).resolve().parents[1]
+    if str(package_root.parent) not in sys.path:
+        sys.path.append(str(package_root.parent))
+    from AtendentePro import configure_agent_network  # type: ignore
+    from AtendentePro.guardrail_messages import get_guardrail_message  # type: ignore
+    from AtendentePro.run_env.run import AGENT_REGISTRY, find_agent  # type: ignore
+    from AtendentePro.utils.compaction import CompactionSettings, compact_transcript  # type: ignore
+    from AtendentePro.utils.metrics import (  # type: ignore
+        MetricsHooks,
+        current_session,
+        get_metrics_registry,
+        install_metrics_processor,
+    )
+    from AtendentePro.utils.openai_client import use_shared_client_for_agents  # type: ignore
+    from AtendentePro.utils.session_store import (  # type: ignore
+        DEFAULT_MAX_SESSIONS,
+        DEFAULT_SESSION_TTL,
+        SESSION_STORE_REGISTRY,
+        SessionState,
+        SessionStore,
+        create_session_store,
+    )
+else:
+    from AtendentePro import configure_agent_network
+    from AtendentePro.guardrail_messages import get_guardrail_message
+    from AtendentePro.run_env.run import AGENT_REGISTRY, find_agent
+    from AtendentePro.utils.compaction import CompactionSettings, compact_transcript
+    from AtendentePro.utils.metrics import (
+        MetricsHooks,
+        current_session,
+        get_metrics_registry,
+        install_metrics_processor,
+    )
+    from AtendentePro.utils.openai_client import use_shared_client_for_agents
+    from AtendentePro.utils.session_store import (
+        DEFAULT_MAX_SESSIONS,
+        DEFAULT_SESSION_TTL,
+        SESSION_STORE_REGISTRY,
+        SessionState,
+        SessionStore,
+        create_session_store,
+    )
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENT_TURNS = 256
+DEFAULT_PURGE_INTERVAL = 300.0
+
+
+def event_payload(event: Any) -> dict[str, Any] | None:
+    """JSON-ready view of an Agents SDK stream event, or ``None`` for events clients do not need."""
+    if isinstance(event, RawResponsesStreamEvent):
+        if isinstance(event.data, ResponseTextDeltaEvent):
+            return {"type": "delta", "text": event.data.delta}
+    elif isinstance(event, RunItemStreamEvent):
+        if event.item.type == "tool_call_item":
+            return {"type": "tool_call", "name": getattr(event.item.raw_item, "name", None)}
+        if event.item.type == "tool_call_output_item":
+            return {"type": "tool_output", "output": str(event.item.output)}
+    elif isinstance(event, AgentUpdatedStreamEvent):
+        return {"type": "agent", "name": event.new_agent.name}
+    return None
+
+
+class ConversationService:
+    """Run turns of many concurrent conversations over the same agent graph.
+
+    Each session's transcript, current agent and ``ContextNote`` live in a
+    :class:`SessionStore` and are loaded for every turn, so only the
+    sessions the store keeps hot use memory. Turns of one session are
+    serialised by a per-session lock; ``max_concurrent_turns`` bounds the
+    turns in flight across all sessions. Transcripts past
+    ``compaction.max_tokens`` are compacted before each turn. The app purges
+    idle sessions from the store every ``purge_interval`` seconds.
+    ``run_streamed`` is ``Runner.run_streamed`` (replaceable in tests).
+    """
+
+    def __init__(
+        self,
+        store: SessionStore | None = None,
+        *,
+        default_agent: str = "triage",
+        max_concurrent_turns: int = DEFAULT_MAX_CONCURRENT_TURNS,
+        compaction: CompactionSettings | None = None,
+        purge_interval: float = DEFAULT_PURGE_INTERVAL,
+        run_streamed: Callable[..., Any] = Runner.run_streamed,
+    ) -> None:
+        self.store = store if store is not None else create_session_store("memory")
+        self.compaction = compaction or CompactionSettings.from_config()
+        self.default_agent = default_agent
+        self.purge_interval = purge_interval
+        self._turns = asyncio.Semaphore(max(1, max_concurrent_turns))
+        self._run_streamed = run_streamed
+        # A lock lives while a turn holds or waits for it, so idle sessions cost nothing here.
+        self._locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
+
+    def _lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return lock
+
+    async def create_session(self, agent_name: str | None = None) -> SessionState:
+        name = agent_name or self.default_agent
+        if name not in AGENT_REGISTRY:
+            raise ValueError(f"Unknown agent {name!r}; use one of {sorted(AGENT_REGISTRY)}")
+        state = SessionState(session_id=uuid.uuid4().hex, agent_name=AGENT_REGISTRY[name].name)
+        await asyncio.to_thread(self.store.save, state)
+        return state
+
+    async def get_session(self, session_id: str) -> SessionState | None:
+        return await asyncio.to_thread(self.store.load, session_id)
+
+    async def delete_session(self, session_id: str) -> bool:
+        return await asyncio.to_thread(self.store.delete, session_id)
+
+    async def purge_sessions(self) -> int:
+        """Remove expired sessions from the store; return how many were removed."""
+        purge = getattr(self.store, "purge", None)
+        if purge is None:
+            return 0
+        return await asyncio.to_thread(purge)
+
+    async def purge_periodically(self) -> None:
+        """Call :meth:`purge_sessions` every ``purge_interval`` seconds until cancelled."""
+        while True:
+            await asyncio.sleep(self.purge_interval)
+            try:
+                await self.purge_sessions()
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Session purge failed: %s", exc, exc_info=True)
+
+    async def run_turn(self, session_id: str, message: str) -> AsyncIterator[dict[str, Any]]:
+        """Run one user message through the session's agent, yielding stream payloads."""
+        lock = self._lock(session_id)
+        async with lock, self._turns:
+            state = await self.get_session(session_id)
+            if state is None:
+                yield {"type": "error", "message": "session not found"}
+                return
+            agent = find_agent(state.agent_name)
+            input_items: list[TResponseInputItem] = compact_transcript(
+                [*state.input_items, {"role": "user", "content": message}], state.context, self.compaction
+            )
+            hooks = MetricsHooks(session_id)
+            try:
+                # The run task copies the context when it is created, so its tools see the session.
+                token = current_session.set(session_id)
+                try:
+                    result = self._run_streamed(agent, input=input_items, context=state.context, hooks=hooks)
+                finally:
+                    current_session.reset(token)
+                async for event in result.stream_events():
+                    hooks.observe_stream_event(event)
+                    payload = event_payload(event)
+                    if payload is not None:
+                        yield payload
+            except InputGuardrailTripwireTriggered:
+                reply = get_guardrail_message("out_of_scope", detailed=False)
+                state.input_items = [*input_items, {"role": "assistant", "content": reply}]
+                await asyncio.to_thread(self.store.save, state)
+                yield {"type": "guardrail", "text": get_guardrail_message("out_of_scope", detailed=True)}
+                yield {"type": "done", "agent": agent.name}
+                return
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Turn failed for session %s: %s", session_id, exc, exc_info=True)
+                yield {"type": "error", "message": "Não foi possível processar a mensagem."}
+                return
+
+            state.agent_name = result.last_agent.name
+            state.input_items = result.to_input_list()
+            await asyncio.to_thread(self.store.save, state)
+            yield {
+                "type": "done",
+                "agent": state.agent_name,
+                "output": str(result.final_output or ""),
+                "usage": hooks.totals,
+            }
+
+
+def _sse(payload: dict[str, Any]) -> str:
+    return f"event: {payload['type']}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+async def _json_body(request: Request) -> dict[str, Any] | None:
+    """The request body as a JSON object (``{}`` when empty), or ``None`` when it is not one."""
+    if not await request.body():
+        return {}
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    return body if isinstance(body, dict) else None
+
+
+def create_app(service: ConversationService | None = None) -> Starlette:
+    """ASGI app: ``POST /sessions``, ``POST /sessions/{id}/messages`` (SSE), ``/sessions/{id}/ws``, ``/metrics``."""
+    service = service if service is not None else ConversationService()
+
+    async def health(request: Request) -> JSONResponse:
+        return JSONResponse({"status": "ok"})
+
+    async def metrics(request: Request) -> PlainTextResponse:
+        return PlainTextResponse(get_metrics_registry().render(), media_type="text/plain; version=0.0.4")
+
+    async def create_session(request: Request) -> JSONResponse:
+        body = await _json_body(request)
+        if body is None:
+            return JSONResponse({"error": "body must be a JSON object"}, status_code=400)
+        try:
+            session = await service.create_session(body.get("agent"))
+        except ValueError as exc:
+            return JSONResponse({"error": str(exc)}, status_code=400)
+        return JSONResponse({"session_id": session.session_id, "agent": session.agent_name}, status_code=201)
+
+    async def delete_session(request: Request) -> JSONResponse:
+        if not await service.delete_session(request.path_params["session_id"]):
+            return JSONResponse({"error": "session not found"}, status_code=404)
+        return JSONResponse({"deleted": True})
+
+    async def post_message(request: Request) -> Any:
+        session_id = request.path_params["session_id"]
+        if await service.get_session(session_id) is None:
+            return JSONResponse({"error": "session not found"}, status_code=404)
+        body = await _json_body(request)
+        if body is None:
+            return JSONResponse({"error": "body must be a JSON object"}, status_code=400)
+        message = str(body.get("message", "")).strip()
+        if not message:
+            return JSONResponse({"error": "message is required"}, status_code=400)
+
+        async def stream() -> AsyncIterator[str]:
+            async for payload in service.run_turn(session_id, message):
+                yield _sse(payload)
+
+        return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+    async def websocket_session(websocket: WebSocket) -> None:
+        session_id = websocket.path_params["session_id"]
+        await websocket.accept()
+        if await service.get_session(session_id) is None:
+            await websocket.send_json({"type": "error", "message": "session not found"})
+            await websocket.close(code=4404)
+            return
+        try:
+            while True:
+                message = (await websocket.receive_text()).strip()
+                if not message:
+                    continue
+                async for payload in service.run_turn(session_id, message):
+                    await websocket.send_json(payload)
+        except WebSocketDisconnect:
+            logger.debug("WebSocket closed for session %s", session_id)
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette) -> AsyncIterator[None]:
+        configure_agent_network()
+        # Model calls and tools of every session share one pooled client on the server loop.
+        use_shared_client_for_agents()
+        install_metrics_processor()
+        # Without this, sessions nobody loads again would stay in a disk-backed store forever.
+        purger = asyncio.create_task(service.purge_periodically())
+        try:
+            yield
+        finally:
+            purger.cancel()
+
+    routes = [
+        Route("/health", health, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+        Route("/sessions", create_session, methods=["POST"]),
+        Route("/sessions/{session_id}", delete_session, methods=["DELETE"]),
+        Route("/sessions/{session_id}/messages", post_message, methods=["POST"]),
+        WebSocketRoute("/sessions/{session_id}/ws", websocket_session),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve AtendentePro agents over HTTP (SSE) and WebSocket.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--agent", choices=AGENT_REGISTRY.keys(), default="triage", help="Agent sessions start with")
+    parser.add_argument("--store", choices=SESSION_STORE_REGISTRY.keys(), default="memory", help="Session store")
+    parser.add_argument("--store-path", help="SQLite file of the sqlite store (default: CONTEXT_OUTPUT_DIR)")
+    parser.add_argument("--max-sessions", type=int, default=DEFAULT_MAX_SESSIONS, help="Sessions kept in memory")
+    parser.add_argument(
+        "--session-ttl",
+        type=float,
+        default=DEFAULT_SESSION_TTL,
+        help=(
+            "Idle seconds before a session expires. Applies to the sqlite store too: with the default of 3600, "
+            "sessions idle for more than an hour are dropped from disk even though they survive restarts"
+        ),
+    )
+    parser.add_argument(
+        "--purge-interval",
+        type=float,
+        default=DEFAULT_PURGE_INTERVAL,
+        help="Seconds between purges of expired sessions",
+    )
+    parser.add_argument("--max-concurrent-turns", type=int, default=DEFAULT_MAX_CONCURRENT_TURNS)
+    return parser.parse_args()
+
+
+def main() -> None:
+    import uvicorn
+
+    args = parse_args()
+    service = ConversationService(
+        create_session_store(args.store, path=args.store_path, max_sessions=args.max_sessions, ttl=args.session_ttl),
+        default_agent=args.agent,
+        max_concurrent_turns=args.max_concurrent_turns,
+        purge_interval=args.purge_interval,
+    )
+    uvicorn.run(create_app(service), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Testes para o benchmark de replay com o backend OpenAI simulado."""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from agents.models import _openai_shared  # noqa: E402
+from agents.tracing import get_trace_provider  # noqa: E402
+
+from AtendentePro import configure_agent_network  # noqa: E402
+from AtendentePro.run_env.benchmark import SCENARIOS, format_results, run_benchmark, sample_from_schema  # noqa: E402
+
+
+def test_scripted_conversations_follow_their_routes():
+    """Testa se as conversas roteirizadas percorrem o grafo de agentes com os handoffs esperados."""
+    configure_agent_network()
+
+    result = asyncio.run(run_benchmark(SCENARIOS, concurrency=3, conversations=3))
+
+    assert result.errors == 0
+    assert result.turns == sum(len(scenario.turns) for scenario in SCENARIOS)
+    assert result.hops_by_scenario == {"iva": 1.5, "knowledge": 0.5, "out_of_scope": 0.0}
+    assert result.model_calls >= result.turns
+    assert "turns/s" in format_results([result])
+
+
+def test_concurrent_conversations_overlap_on_the_simulated_latency():
+    """Testa se conversas simultâneas aumentam a vazão com a mesma latência simulada."""
+    configure_agent_network()
+    scenarios = [SCENARIOS[-1]]
+
+    serial = asyncio.run(run_benchmark(scenarios, concurrency=1, conversations=8, latency=0.02))
+    parallel = asyncio.run(run_benchmark(scenarios, concurrency=8, conversations=8, latency=0.02))
+
+    assert serial.turns == parallel.turns == 8
+    assert parallel.turns_per_second > 2 * serial.turns_per_second
+    assert serial.p50_ms >= 20
+
+
+def test_every_concurrency_level_starts_with_cold_caches():
+    """Testa se cada rodada chama a API de embeddings, sem herdar os caches aquecidos da rodada anterior."""
+    configure_agent_network()
+    scenarios = [scenario for scenario in SCENARIOS if scenario.name == "knowledge"]
+
+    results = [
+        asyncio.run(run_benchmark(scenarios, concurrency=concurrency, conversations=6))
+        for concurrency in (1, 4, 1)
+    ]
+
+    assert all(result.errors == 0 for result in results)
+    assert all(result.embedding_calls > 0 for result in results)
+
+
+def test_sdk_tracing_and_default_client_are_left_untouched():
+    """Testa se o benchmark não altera o tracing nem o cliente padrão do SDK (usa o RunConfig de cada execução)."""
+    configure_agent_network()
+    previous_client = _openai_shared.get_default_openai_client()
+    previous_disabled = get_trace_provider()._disabled
+
+    asyncio.run(run_benchmark([SCENARIOS[-1]], conversations=1))
+
+    assert _openai_shared.get_default_openai_client() is previous_client
+    assert get_trace_provider()._disabled == previous_disabled
+
+
+def test_structured_outputs_are_sampled_from_the_schema():
+    """Testa a resposta gerada a partir do JSON schema de saídas estruturadas."""
+    schema = {
+        "type": "object",
+        "properties": {
+            "is_in_scope": {"type": "boolean"},
+            "topic": {"$ref": "#/$defs/Topic"},
+            "code": {"anyOf": [{"type": "string"}, {"type": "null"}]},
+        },
+        "$defs": {"Topic": {"enum": ["compra", "venda"]}},
+    }
+
+    assert sample_from_schema(schema, False) == {"is_in_scope": False, "topic": "compra", "code": "benchmark"}
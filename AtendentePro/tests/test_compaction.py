@@ -0,0 +1,85 @@
+"""Testes para a compactação da transcrição em conversas longas."""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.context import ContextNote  # noqa: E402
+from AtendentePro.utils.compaction import (  # noqa: E402
+    SUMMARY_END,
+    SUMMARY_START,
+    CompactionSettings,
+    compact_transcript,
+    transcript_tokens,
+)
+
+SETTINGS = CompactionSettings(max_tokens=400, keep_tokens=150, max_requests=3)
+
+
+def _turn(number: int) -> list[dict]:
+    return [
+        {"role": "user", "content": f"Pergunta {number} sobre emissão de nota fiscal " + "detalhe " * 10},
+        {"type": "function_call", "call_id": f"call-{number}", "name": "go_to_rag", "arguments": "{}"},
+        {"type": "function_call_output", "call_id": f"call-{number}", "output": "trecho " * 10},
+        {"role": "assistant", "content": [{"type": "output_text", "text": f"Resposta {number}"}]},
+    ]
+
+
+def _context() -> ContextNote:
+    payload = {"from_agent": "Interview Agent", "payload_key": "interview", "payload": {"cnpj": "123"}}
+    return ContextNote(handoff_summaries={"interview": payload})
+
+
+def _summary(item: dict) -> dict:
+    text = item["content"]
+    return json.loads(text[len(SUMMARY_START) : text.rindex(SUMMARY_END)])
+
+
+def test_short_transcripts_are_left_unchanged():
+    """Testa se transcrições abaixo do limite não são alteradas."""
+    items = _turn(0)
+
+    assert compact_transcript(items, _context(), SETTINGS) == items
+    assert compact_transcript(items * 20, None, CompactionSettings(max_tokens=0)) == items * 20
+
+
+def test_older_turns_become_a_structured_summary():
+    """Testa se turnos antigos viram resumo com os últimos handoffs, sem separar chamadas de ferramenta."""
+    items = [item for number in range(8) for item in _turn(number)]
+    items.append({"role": "user", "content": "Pergunta final"})
+
+    compacted = compact_transcript(items, _context(), SETTINGS)
+
+    summary = _summary(compacted[0])
+    assert compacted[1]["role"] == "user"
+    assert compacted[-1] == {"role": "user", "content": "Pergunta final"}
+    assert transcript_tokens(compacted[1:]) <= SETTINGS.keep_tokens
+    assert summary["handoffs"]["interview"]["payload"] == {"cnpj": "123"}
+    assert summary["tools_used"] == ["go_to_rag"]
+    assert len(summary["user_requests"]) == 3
+    call_ids = {item["call_id"] for item in compacted if item.get("type") == "function_call"}
+    assert call_ids == {item["call_id"] for item in compacted if item.get("type") == "function_call_output"}
+
+
+def test_prompt_size_stays_bounded_over_a_long_conversation():
+    """Testa se o tamanho da entrada por turno fica estável em conversas longas."""
+    items: list = []
+    sizes = []
+    for number in range(60):
+        items = compact_transcript([*items, *_turn(number)[:1]], _context(), SETTINGS)
+        sizes.append(transcript_tokens(items))
+        items.extend(_turn(number)[1:])
+
+    assert max(sizes[20:]) <= SETTINGS.max_tokens
+    assert _summary(items[0])["compacted_items"] > 150
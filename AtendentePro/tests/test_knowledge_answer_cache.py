@@ -0,0 +1,109 @@
+"""Testes para o cache semântico de respostas do go_to_rag."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from agents.tool_context import ToolContext  # noqa: E402
+
+from AtendentePro.Knowledge import knowledge_agent  # noqa: E402
+from AtendentePro.Knowledge.knowledge_answer_cache import SemanticAnswerCache  # noqa: E402
+from AtendentePro.Knowledge.knowledge_config import KnowledgeConfig, SynthesisConfig  # noqa: E402
+
+
+def test_similar_question_with_same_chunks_hits():
+    """Testa se perguntas parecidas com os mesmos trechos reaproveitam a resposta."""
+    cache = SemanticAnswerCache(threshold=0.95)
+    cache.put("v1", [1.0, 0.0], [3, 1], "resposta")
+
+    assert cache.get("v1", [1.0, 0.1], [1, 3]) == "resposta"
+    assert cache.get("v1", [1.0, 0.1], [1, 4]) is None
+    assert cache.get("v1", [1.0, 1.0], [1, 3]) is None
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+
+
+def test_new_store_version_invalidates_answers():
+    """Testa se uma nova versão do acervo descarta as respostas anteriores."""
+    cache = SemanticAnswerCache()
+    cache.put("v1", [1.0, 0.0], [0], "resposta antiga")
+
+    assert cache.get("v2", [1.0, 0.0], [0]) is None
+    assert cache.stats.invalidations == 1 and len(cache) == 0
+
+
+def test_answers_expire_after_ttl():
+    """Testa se respostas mais antigas que o TTL são descartadas."""
+    now = [0.0]
+    cache = SemanticAnswerCache(ttl=60.0, clock=lambda: now[0])
+    cache.put("v1", [1.0, 0.0], [0], "resposta")
+
+    now[0] = 61.0
+    assert cache.get("v1", [1.0, 0.0], [0]) is None
+    assert len(cache) == 0
+
+
+def _ask(question: str):
+    arguments = json.dumps({"question": question})
+    context = ToolContext(context=None, tool_name="go_to_rag", tool_call_id="call", tool_arguments=arguments)
+    return asyncio.run(knowledge_agent.go_to_rag.on_invoke_tool(context, arguments))
+
+
+def test_go_to_rag_reuses_synthesized_answer(monkeypatch):
+    """Testa se o go_to_rag evita nova síntese para a mesma pergunta e não guarda respostas de falha."""
+    embeddings = {"Como emitir a carta de correção?": [1.0, 0.0], "como emito carta de correção": [0.99, 0.05]}
+    chunks = [{"chunk": {"content": "A CC-e corrige dados da nota.", "source": "cc.pdf"}, "index": 7, "similarity": 0.8}]
+    synthesized: list[str] = []
+    replies = [None, "Resposta sintetizada"]
+
+    async def fake_find(question: str, top_k: int = 3):
+        return chunks, np.asarray(embeddings[question]), "v1"
+
+    async def fake_synthesize(question: str, context: str):
+        synthesized.append(question)
+        return replies.pop(0)
+
+    settings = KnowledgeConfig.load().model_copy(update={"synthesis": SynthesisConfig(mode="tool")})
+    monkeypatch.setattr(KnowledgeConfig, "load", lambda path=None: settings)
+    monkeypatch.setattr(knowledge_agent, "__find_relevant_chunks", fake_find)
+    monkeypatch.setattr(knowledge_agent, "_synthesize", fake_synthesize)
+    monkeypatch.setattr(knowledge_agent, "get_answer_cache", lambda cache=SemanticAnswerCache(): cache)
+
+    fallback = _ask("Como emitir a carta de correção?")
+    first = _ask("Como emitir a carta de correção?")
+    second = _ask("como emito carta de correção")
+
+    assert "não consegui sintetizar" in fallback.answer
+    assert first.answer == second.answer == "Resposta sintetizada"
+    assert second.sources == ["cc.pdf"]
+    assert len(synthesized) == 2
+
+
+def test_answer_cache_is_off_in_agent_mode_and_warns_when_enabled(tmp_path, caplog):
+    """Testa se os templates desligam o cache no modo agent e se o carregamento avisa quando ele está ligado."""
+    settings = KnowledgeConfig.load()
+    assert settings.synthesis.mode == "agent" and not settings.answer_cache.enabled
+
+    data = settings.model_dump()
+    data["answer_cache"]["enabled"] = True
+    path = tmp_path / "knowledge_config.yaml"
+    path.write_text(yaml.safe_dump(data, allow_unicode=True), encoding="utf-8")
+
+    with caplog.at_level("WARNING", logger="AtendentePro.Knowledge.knowledge_config"):
+        KnowledgeConfig.load(path)
+
+    assert "answer_cache.enabled has no effect" in caplog.text
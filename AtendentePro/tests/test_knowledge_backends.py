@@ -0,0 +1,118 @@
+"""Testes para os backends de busca vetorial aproximada."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.Knowledge.knowledge_backends import IVFBackend, create_index_backend  # noqa: E402
+from AtendentePro.Knowledge.knowledge_benchmark import (  # noqa: E402
+    recall_at_k,
+    run_benchmark,
+    synthetic_corpus,
+)
+from AtendentePro.Knowledge.knowledge_config import KnowledgeConfig  # noqa: E402
+from AtendentePro.Knowledge.knowledge_index import KnowledgeIndex  # noqa: E402
+from AtendentePro.Knowledge.knowledge_search import score_top_k_batch  # noqa: E402
+from AtendentePro.Knowledge.knowledge_store import EmbeddingStore  # noqa: E402
+
+
+def _write_store(path: Path, vectors: np.ndarray) -> EmbeddingStore:
+    chunks = [
+        {"content": f"conteúdo {i}", "source": f"doc{i}.pdf", "start_pos": 0, "end_pos": 10}
+        for i in range(len(vectors))
+    ]
+    return EmbeddingStore.write(path, vectors, chunks)
+
+
+def test_ivf_recall_against_brute_force():
+    """Testa se o IVF recupera quase todos os vizinhos exatos e todos ao sondar todas as listas."""
+    matrix, queries = synthetic_corpus(2000, 32, 50, noise=1.0)
+    expected, _ = score_top_k_batch(matrix, queries, 5)
+
+    backend = IVFBackend(nprobe=8)
+    backend.build(matrix)
+    assert recall_at_k([backend.search(query, 5)[0] for query in queries], expected) >= 0.9
+
+    exhaustive = IVFBackend(nlist=16, nprobe=16)
+    exhaustive.build(matrix)
+    assert recall_at_k([exhaustive.search(query, 5)[0] for query in queries], expected) == 1.0
+
+
+def test_ivf_reuses_cached_lists(tmp_path):
+    """Testa se as listas treinadas são gravadas por versão e reaproveitadas."""
+    matrix, _ = synthetic_corpus(500, 16, 1)
+    IVFBackend(nlist=10).build(matrix, version="v1", directory=tmp_path)
+    cached = list(tmp_path.glob("ivf-v1-*.npz"))
+    assert len(cached) == 1
+
+    reloaded = IVFBackend(nlist=10, iterations=0, seed=0)
+    reloaded.build(matrix, version="v1", directory=tmp_path)
+    fresh = IVFBackend(nlist=10)
+    fresh.build(matrix)
+    assert np.array_equal(reloaded.search(matrix[0], 3)[0], fresh.search(matrix[0], 3)[0])
+
+    IVFBackend(nlist=10).build(matrix, version="v2", directory=tmp_path)
+    assert [path.name.split("-")[1] for path in tmp_path.glob("ivf-*.npz")] == ["v2"]
+
+
+def test_index_with_ivf_backend_matches_exact_search(tmp_path):
+    """Testa se o índice configurado com IVF devolve o mesmo melhor trecho que a busca exata."""
+    path = tmp_path / "embedding"
+    matrix, queries = synthetic_corpus(400, 16, 5, noise=0.5)
+    store = _write_store(path, matrix)
+
+    index = KnowledgeIndex(path, backend="ivf", backend_options={"nprobe": 4})
+    assert index.reload()
+    assert (path / f"ivf-{store.version}-20-0.npz").is_file()
+
+    exact = index.search_batch(queries, top_k=1)
+    for query, expected in zip(queries, exact):
+        assert index.search(query, top_k=1)[0]["index"] == expected[0]["index"]
+
+
+def test_chroma_backend_finds_nearest_neighbours(tmp_path):
+    """Testa o backend HNSW do chromadb persistido ao lado do armazenamento."""
+    pytest.importorskip("chromadb")
+    matrix, queries = synthetic_corpus(300, 16, 20, noise=0.5)
+    expected, _ = score_top_k_batch(matrix, queries, 3)
+
+    backend = create_index_backend("chroma")
+    backend.build(matrix, version="v1", directory=tmp_path)
+    rows, scores = backend.search(queries[0], 3)
+    assert abs(float(scores[0]) - float(matrix[rows[0]] @ queries[0])) < 1e-4
+    assert recall_at_k([backend.search(query, 3)[0] for query in queries], expected) >= 0.9
+    assert (tmp_path / "chroma").is_dir()
+
+
+def test_unknown_backend_is_rejected(tmp_path):
+    """Testa se um backend desconhecido é rejeitado já na configuração."""
+    with pytest.raises(ValueError, match="brute_force"):
+        create_index_backend("faiss")
+    with pytest.raises(TypeError):
+        KnowledgeIndex(tmp_path, backend="ivf", backend_options={"probes": 2})
+
+
+def test_config_defaults_to_brute_force():
+    """Testa se o template padrão mantém a busca exata."""
+    assert KnowledgeConfig.load().index.backend == "brute_force"
+
+
+def test_benchmark_reports_each_backend():
+    """Testa se o benchmark mede recall e latência de cada backend."""
+    results = run_benchmark([300], ["brute_force", "ivf"], dimension=16, queries=10)
+    assert [result.backend for result in results] == ["brute_force", "ivf"]
+    assert results[0].recall == 1.0
+    assert all(result.p95_ms >= result.p50_ms >= 0 for result in results)
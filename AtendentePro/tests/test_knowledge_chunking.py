@@ -0,0 +1,168 @@
+"""Testes para as estratégias de divisão de documentos em trechos."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import docx
+import httpx
+import openai
+import pytest
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.Knowledge.knowledge_chunking import (  # noqa: E402
+    CharacterChunker,
+    StructuredChunker,
+    create_chunker,
+    iter_unique_chunks,
+)
+from AtendentePro.Knowledge import knowledge_tokens  # noqa: E402
+from AtendentePro.Knowledge.knowledge_config import KnowledgeConfig  # noqa: E402
+from AtendentePro.Knowledge.knowledge_manifest import IngestionManifest  # noqa: E402
+from AtendentePro.Knowledge.knowledge_tokens import count_tokens  # noqa: E402
+from AtendentePro.Knowledge.rag_agent import RAGAgent  # noqa: E402
+
+
+def _fake_client(calls: list[list[str]]) -> openai.AsyncOpenAI:
+    def handle(request: httpx.Request) -> httpx.Response:
+        inputs = json.loads(request.content)["input"]
+        calls.append(inputs)
+        data = [{"object": "embedding", "index": i, "embedding": [1.0, float(i)]} for i in range(len(inputs))]
+        return httpx.Response(
+            200,
+            json={"object": "list", "data": data, "model": "fake", "usage": {"prompt_tokens": 1, "total_tokens": 1}},
+        )
+
+    return openai.AsyncOpenAI(
+        api_key="sk-test",
+        base_url="http://fake-embeddings.local/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handle)),
+    )
+
+
+PAGE_ONE = (
+    "Carta de correção \n"
+    "O que é?  \n"
+    "A carta de correção eletrônica (CC-e) corrige informações de uma \n"
+    "Nota Fiscal eletrônica que foram imputadas de forma errada. \n"
+    " \n"
+    "O que pode ser corrigido? \n"
+    "CFOP, CST, peso, volume e dados do transportador, desde que não \n"
+    "mudem o valor do imposto. \n"
+    "Vide arquivo: Carta_Correcao.pptx \n"
+)
+PAGE_TWO = "O que não pode ser corrigido? \nValores fiscais, base de cálculo e alíquota. \n"
+
+
+def test_structured_chunks_follow_headings_and_pages():
+    """Testa que os trechos começam em títulos e não cortam palavras nem parágrafos."""
+    chunker = StructuredChunker(max_tokens=60, min_tokens=20)
+
+    chunks = list(chunker.iter_chunks("carta.pdf", [PAGE_ONE, PAGE_TWO]))
+
+    text = PAGE_ONE + PAGE_TWO
+    assert [chunk["content"].splitlines()[0] for chunk in chunks] == [
+        "Carta de correção",
+        "O que pode ser corrigido?",
+        "O que não pode ser corrigido?",
+    ]
+    assert chunks[1]["content"].endswith("Vide arquivo: Carta_Correcao.pptx")
+    assert chunks[2]["start_pos"] == len(PAGE_ONE)
+    for chunk in chunks:
+        assert text[chunk["start_pos"] : chunk["end_pos"]].split() == chunk["content"].split()
+        assert count_tokens(chunk["content"]) <= 60
+
+
+def test_oversized_paragraph_is_split_at_sentences():
+    """Testa que um parágrafo maior que o limite é quebrado entre frases."""
+    sentences = [f"Frase número {i} sobre notas fiscais eletrônicas." for i in range(40)]
+    paragraph = " ".join(sentences)
+
+    chunks = list(StructuredChunker(max_tokens=50, min_tokens=10).iter_chunks("doc.docx", [paragraph]))
+
+    assert len(chunks) > 1
+    assert " ".join(chunk["content"] for chunk in chunks) == paragraph
+    assert all(chunk["content"].endswith(".") for chunk in chunks)
+    assert all(count_tokens(chunk["content"]) <= 50 for chunk in chunks)
+
+
+def test_duplicate_chunks_are_dropped_within_each_document():
+    """Testa a remoção de trechos repetidos no mesmo documento, ignorando maiúsculas e espaços."""
+    chunks = [
+        {"content": "Rodapé  White Martins", "source": "a.pdf"},
+        {"content": "Conteúdo de a", "source": "a.pdf"},
+        {"content": "rodapé white martins\n", "source": "a.pdf"},
+        {"content": "rodapé white martins\n", "source": "b.pdf"},
+    ]
+
+    unique = [(chunk["source"], chunk["content"]) for chunk in iter_unique_chunks(chunks)]
+
+    # b.pdf keeps its copy, so refreshing or removing a.pdf alone cannot lose it.
+    assert unique == [
+        ("a.pdf", "Rodapé  White Martins"),
+        ("a.pdf", "Conteúdo de a"),
+        ("b.pdf", "rodapé white martins\n"),
+    ]
+
+
+def test_chunker_is_selected_from_config():
+    """Testa a escolha do chunker pela configuração do template."""
+    chunking = KnowledgeConfig.load().chunking
+
+    chunker = create_chunker(chunking.strategy, **chunking.options)
+
+    assert isinstance(chunker, StructuredChunker)
+    assert isinstance(create_chunker("characters", chunk_size=500, overlap=50), CharacterChunker)
+    with pytest.raises(ValueError):
+        create_chunker("sentencas")
+
+
+def test_chunker_signature_names_the_tokenizer(monkeypatch):
+    """Testa se a assinatura muda com o tokenizador, para que instalar o tiktoken reconstrua o índice."""
+    fake_tiktoken = SimpleNamespace(
+        encoding_for_model=lambda model: SimpleNamespace(name="o200k_base"),
+        get_encoding=lambda name: SimpleNamespace(name=name),
+    )
+
+    def signature_with(tiktoken):
+        knowledge_tokens._get_encoding.cache_clear()
+        monkeypatch.setattr(knowledge_tokens, "_tiktoken", lambda: tiktoken)
+        return StructuredChunker(model="gpt-4o").signature
+
+    try:
+        estimated, exact = signature_with(None), signature_with(fake_tiktoken)
+    finally:
+        knowledge_tokens._get_encoding.cache_clear()
+
+    assert estimated.endswith("tokenizer=chars/4)")
+    assert exact.endswith("tokenizer=tiktoken:o200k_base)")
+
+
+def test_changing_the_chunker_rebuilds_the_store(tmp_path):
+    """Testa que trocar a estratégia de chunking força a reindexação completa."""
+    docs = tmp_path / "knowledge_documentos"
+    docs.mkdir()
+    document = docx.Document()
+    document.add_paragraph("Recebimento de notas fiscais. " * 20)
+    document.save(docs / "recebimento.docx")
+    calls: list[list[str]] = []
+
+    for chunker, rebuilt in [(StructuredChunker(), True), (StructuredChunker(), False), (CharacterChunker(), True)]:
+        agent = RAGAgent(api_key="sk-test", doc_folder=str(docs), chunker=chunker)
+        agent.async_client = _fake_client(calls)
+        assert asyncio.run(agent.refresh_embeddings()) is rebuilt
+
+    manifest = IngestionManifest.load(docs / "embedding" / "manifest.json")
+    assert manifest.chunker == CharacterChunker().signature
@@ -0,0 +1,81 @@
+"""Testes para a montagem do contexto da síntese dentro do orçamento de tokens."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.Knowledge.knowledge_context import merge_passages, pack_context  # noqa: E402
+from AtendentePro.Knowledge.knowledge_tokens import count_tokens  # noqa: E402
+
+DOCUMENT = " ".join(f"palavra{i}" for i in range(400))
+
+
+def _result(row: int, start: int, end: int, source: str = "doc.pdf", content: str | None = None) -> dict:
+    text = DOCUMENT[start:end] if content is None else content
+    return {"chunk": {"content": text, "source": source, "start_pos": start, "end_pos": end}, "index": row}
+
+
+def test_overlapping_chunks_are_merged_without_repeating_text():
+    """Testa se a sobreposição entre trechos vizinhos aparece uma única vez."""
+    results = [_result(1, 800, 1800), _result(0, 0, 1000), _result(2, 1600, 2600)]
+
+    passages = merge_passages(results)
+
+    assert len(passages) == 1
+    assert passages[0].content == DOCUMENT[0:2600]
+    assert sorted(passages[0].rows) == [0, 1, 2]
+
+
+def test_adjacent_contained_and_repeated_chunks():
+    """Testa a união de trechos adjacentes e o descarte de trechos contidos ou repetidos."""
+    results = [
+        _result(5, 2000, 2100, source="outro.pdf"),
+        _result(0, 0, 100),
+        _result(1, 110, 200),
+        _result(2, 20, 60),
+        _result(0, 0, 100),
+    ]
+
+    passages = merge_passages(results, merge_gap=16)
+
+    assert [passage.source for passage in passages] == ["outro.pdf", "doc.pdf"]
+    assert passages[1].content == f"{DOCUMENT[0:100].rstrip()}\n{DOCUMENT[110:200].lstrip()}"
+    assert sorted(passages[1].rows) == [0, 0, 1, 2]
+
+
+def test_overlap_found_by_text_when_positions_disagree():
+    """Testa se a sobreposição é detectada pelo texto quando as posições não batem."""
+    results = [
+        _result(0, 0, 100, content="A carta de correção corrige dados da nota"),
+        _result(1, 90, 200, content="dados da nota fiscal eletrônica."),
+    ]
+
+    passages = merge_passages(results)
+
+    assert passages[0].content == "A carta de correção corrige dados da nota fiscal eletrônica."
+
+
+def test_context_is_packed_to_the_token_budget():
+    """Testa se seções menos relevantes são descartadas e a mais relevante é cortada se preciso."""
+    results = [_result(0, 0, 400), _result(1, 1000, 2400, source="b.pdf"), _result(2, 3000, 3200, source="c.pdf")]
+
+    packed = pack_context(results, max_tokens=200)
+
+    assert [section.source for section in packed.sections] == ["doc.pdf", "c.pdf"]
+    assert packed.dropped_sections == 1
+    assert packed.tokens <= 200 and packed.tokens == count_tokens(packed.text)
+    assert packed.sources == ["doc.pdf", "c.pdf"]
+
+    tight = pack_context([_result(1, 1000, 2400)], max_tokens=50)
+    assert tight.sections[0].truncated
+    assert tight.text.endswith("[…]") and tight.tokens <= 50
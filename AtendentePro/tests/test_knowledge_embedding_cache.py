@@ -0,0 +1,62 @@
+"""Testes para o cache persistente de embeddings por hash de conteúdo."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.Knowledge.knowledge_embedding_cache import EmbeddingCache  # noqa: E402
+
+MODEL = "text-embedding-3-large"
+
+
+def test_cache_round_trip_and_stats(tmp_path):
+    """Testa gravação, leitura e taxa de acerto do cache."""
+    cache = EmbeddingCache(tmp_path / "cache.sqlite")
+    cache.put_many(MODEL, ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+
+    assert cache.get_many(MODEL, ["a", "c", "b"]) == [[1.0, 2.0], None, [3.0, 4.0]]
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.entries) == (2, 1, 2)
+    assert abs(stats.hit_rate - 2 / 3) < 1e-9
+
+
+def test_cache_is_keyed_by_model(tmp_path):
+    """Testa que vetores de modelos diferentes não se misturam."""
+    cache = EmbeddingCache(tmp_path / "cache.sqlite")
+    cache.put_many(MODEL, ["a"], [[1.0]])
+
+    assert cache.get_many("text-embedding-3-small", ["a"]) == [None]
+
+
+def test_cache_persists_across_instances(tmp_path):
+    """Testa se o cache sobrevive a uma nova instância."""
+    path = tmp_path / "cache.sqlite"
+    first = EmbeddingCache(path)
+    first.put_many(MODEL, ["a"], [[0.5]])
+    first.close()
+
+    assert EmbeddingCache(path).get_many(MODEL, ["a"]) == [[0.5]]
+
+
+def test_cache_prune_evicts_unreferenced(tmp_path):
+    """Testa a remoção de entradas que nenhum documento referencia."""
+    cache = EmbeddingCache(tmp_path / "cache.sqlite")
+    cache.put_many(MODEL, ["a", "b", "c"], [[1.0], [2.0], [3.0]])
+    cache.put_many("outro-modelo", ["z"], [[9.0]])
+
+    removed = cache.prune(MODEL, ["b"])
+
+    assert removed == 2
+    assert cache.get_many(MODEL, ["a", "b", "c"]) == [None, [2.0], None]
+    assert cache.get_many("outro-modelo", ["z"]) == [[9.0]]
+    assert cache.stats.evicted == 2
@@ -0,0 +1,91 @@
+"""Testes para os provedores de embedding (API OpenAI e sentence-transformers local)."""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.Knowledge.knowledge_embedding_cache import EmbeddingCache  # noqa: E402
+from AtendentePro.Knowledge.knowledge_embedding_providers import (  # noqa: E402
+    SentenceTransformerProvider,
+    create_embedding_provider,
+)
+from AtendentePro.Knowledge.knowledge_ingestion import embed_texts  # noqa: E402
+from AtendentePro.Knowledge.knowledge_query import QueryEmbedder, QueryEmbeddingCache  # noqa: E402
+from AtendentePro.Knowledge.knowledge_store import EmbeddingStore  # noqa: E402
+
+LOCAL_MODEL = "modelo-local"
+
+
+class _FakeEncoder:
+    """Codificador falso: vetor determinístico a partir do tamanho do texto, como o SentenceTransformer."""
+
+    def __init__(self):
+        self.calls: list[list[str]] = []
+        self.threads: set[str] = set()
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False):
+        self.calls.append(list(texts))
+        self.threads.add(threading.current_thread().name)
+        rows = np.array([[len(text), 1.0, 2.0, 3.0] for text in texts], dtype=np.float32)
+        return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def _provider(encoder: _FakeEncoder) -> SentenceTransformerProvider:
+    return SentenceTransformerProvider(LOCAL_MODEL, encoder=encoder)
+
+
+def test_local_provider_embeds_off_the_event_loop():
+    """Testa se o provedor local codifica em lote, fora do event loop, e encurta vetores."""
+    encoder = _FakeEncoder()
+    provider = _provider(encoder)
+
+    rows = asyncio.run(provider.aembed(["a", "bb"], model=LOCAL_MODEL))
+    short = provider.embed(["a"], model=LOCAL_MODEL, dimensions=2)
+
+    assert rows.shape == (2, 4)
+    assert encoder.calls[0] == ["a", "bb"]
+    assert any(name.startswith("embedding") for name in encoder.threads)
+    assert short.shape == (1, 2) and np.isclose(np.linalg.norm(short), 1.0)
+
+
+def test_local_provider_rejects_vectors_of_another_model():
+    """Testa se o provedor local recusa gerar vetores de outro modelo."""
+    with pytest.raises(ValueError, match="text-embedding-3-large"):
+        _provider(_FakeEncoder()).embed(["a"], model="text-embedding-3-large")
+    with pytest.raises(ValueError, match="Unknown embedding provider"):
+        create_embedding_provider("inexistente")
+
+
+def test_ingestion_and_queries_run_offline(tmp_path):
+    """Testa se a ingestão e as perguntas usam só o modelo local, com cache por modelo."""
+    encoder = _FakeEncoder()
+    provider = _provider(encoder)
+    cache = EmbeddingCache(tmp_path / "cache.sqlite")
+    texts = ["trecho um", "trecho dois", "trecho um"]
+
+    vectors = asyncio.run(embed_texts(texts, client=provider, model=LOCAL_MODEL, cache=cache, progress=None))
+    again = asyncio.run(embed_texts(texts, client=provider, model=LOCAL_MODEL, cache=cache, progress=None))
+    assert vectors == again and len(encoder.calls) == 1
+    assert encoder.calls[0] == ["trecho um", "trecho dois"]
+
+    chunks = [{"content": text, "source": "doc.pdf"} for text in texts]
+    store = EmbeddingStore.write(tmp_path / "embedding", np.asarray(vectors), chunks, embedding_model=LOCAL_MODEL)
+    embedder = QueryEmbedder(provider, QueryEmbeddingCache())
+
+    query = asyncio.run(embedder.aembed_for_store("trecho um", store))
+    assert np.allclose(query, vectors[0])
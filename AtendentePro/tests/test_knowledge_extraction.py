@@ -0,0 +1,144 @@
+"""Testes para a extração paralela de documentos."""
+
+from __future__ import annotations
+
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+import docx
+import fitz
+import pytest
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.Knowledge import knowledge_extraction  # noqa: E402
+from AtendentePro.Knowledge.knowledge_extraction import extract_documents_parallel  # noqa: E402
+
+
+def _write_pdf(path: Path, pages: list[str]) -> None:
+    document = fitz.open()
+    for text in pages:
+        page = document.new_page()
+        page.insert_text((72, 72), text)
+    document.save(path)
+    document.close()
+
+
+def _write_docx(path: Path, text: str) -> None:
+    document = docx.Document()
+    document.add_paragraph(text)
+    document.save(path)
+
+
+def _slow_task(path: str, start: int, stop: int | None) -> list[str]:
+    if "lento" in path:
+        time.sleep(30)
+    return [knowledge_extraction.extract_docx(path)]
+
+
+def _stuck_page_count(path: str) -> int:
+    if "travado" in path:
+        time.sleep(30)
+    with fitz.open(path) as document:
+        return document.page_count
+
+
+def test_parallel_extraction_joins_page_ranges_in_order(tmp_path):
+    """Testa se PDFs divididos em faixas de páginas são remontados na ordem."""
+    pages = [f"Pagina {number}" for number in range(7)]
+    _write_pdf(tmp_path / "grande.pdf", pages)
+    _write_docx(tmp_path / "carta.docx", "Carta de correção")
+    (tmp_path / "planilha.xlsx").write_bytes(b"ignorado")
+
+    texts = extract_documents_parallel(
+        sorted(tmp_path.iterdir()), max_workers=3, pages_per_task=2
+    )
+
+    assert set(texts) == {"grande.pdf", "carta.docx"}
+    assert [line for line in texts["grande.pdf"].splitlines() if line] == pages
+    assert texts["grande.pdf"] == knowledge_extraction.extract_pdf_pages(str(tmp_path / "grande.pdf"))
+    assert texts["carta.docx"] == "Carta de correção\n"
+
+
+def test_corrupt_document_does_not_abort_the_run(tmp_path):
+    """Testa que um arquivo corrompido não interrompe os demais."""
+    (tmp_path / "corrompido.pdf").write_bytes(b"%PDF-1.4 lixo")
+    _write_docx(tmp_path / "ok.docx", "Documento válido")
+
+    texts = extract_documents_parallel(sorted(tmp_path.iterdir()), max_workers=2)
+
+    assert texts["corrompido.pdf"] == ""
+    assert texts["ok.docx"] == "Documento válido\n"
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork", reason="o stub precisa ser herdado pelos workers"
+)
+def test_stuck_file_times_out(tmp_path, monkeypatch):
+    """Testa que um arquivo travado é descartado após o tempo limite."""
+    monkeypatch.setattr(knowledge_extraction, "_extract_task", _slow_task)
+    _write_docx(tmp_path / "lento.docx", "nunca termina")
+    _write_docx(tmp_path / "rapido.docx", "termina")
+
+    started = time.monotonic()
+    texts = extract_documents_parallel(sorted(tmp_path.iterdir()), max_workers=2, timeout=1.0)
+
+    assert time.monotonic() - started < 10
+    assert texts == {"rapido.docx": "termina\n"}
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork", reason="o stub precisa ser herdado pelos workers"
+)
+def test_stuck_page_count_falls_back_to_one_task(tmp_path, monkeypatch):
+    """Testa que um PDF que trava ao contar páginas não bloqueia o processo principal e é extraído inteiro."""
+    monkeypatch.setattr(knowledge_extraction, "pdf_page_count", _stuck_page_count)
+    pages = ["Pagina 0", "Pagina 1", "Pagina 2"]
+    _write_pdf(tmp_path / "normal.pdf", pages)
+    _write_docx(tmp_path / "rapido.docx", "termina")
+    _write_pdf(tmp_path / "travado.pdf", pages)
+
+    started = time.monotonic()
+    segments = list(
+        knowledge_extraction.iter_extracted_segments(
+            sorted(tmp_path.iterdir()), max_workers=3, pages_per_task=1, timeout=1.0
+        )
+    )
+
+    assert time.monotonic() - started < 10
+    assert [name for name, _ in segments] == ["normal.pdf"] * 3 + ["rapido.docx"] + ["travado.pdf"] * 3
+    assert [text.strip() for name, text in segments if name == "travado.pdf"] == pages
+
+
+@pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork", reason="o stub precisa ser herdado pelos workers"
+)
+def test_stuck_file_does_not_starve_a_single_worker(tmp_path, monkeypatch):
+    """Testa que, com um único worker, um arquivo travado não faz os arquivos saudáveis expirarem."""
+    monkeypatch.setattr(knowledge_extraction, "_extract_task", _slow_task)
+    monkeypatch.setattr(knowledge_extraction, "pdf_page_count", _stuck_page_count)
+    _write_docx(tmp_path / "a.docx", "primeiro")
+    _write_docx(tmp_path / "b_lento.docx", "nunca termina")
+    _write_pdf(tmp_path / "c_travado.pdf", ["Pagina 0"])
+    _write_docx(tmp_path / "d.docx", "último")
+
+    started = time.monotonic()
+    texts = extract_documents_parallel(sorted(tmp_path.iterdir()), max_workers=1, timeout=1.0)
+    segments = list(
+        knowledge_extraction.iter_extracted_segments(sorted(tmp_path.iterdir()), max_workers=1, timeout=1.0)
+    )
+
+    assert time.monotonic() - started < 10
+    assert texts["a.docx"] == "primeiro\n" and texts["d.docx"] == "último\n"
+    assert "b_lento.docx" not in texts
+    assert segments[0] == ("a.docx", "primeiro\n") and segments[-1] == ("d.docx", "último\n")
+    assert ("b_lento.docx", None) in segments
@@ -0,0 +1,105 @@
+"""Testes para o índice vetorial em memória da base de conhecimento."""
+
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.Knowledge import knowledge_search  # noqa: E402
+from AtendentePro.Knowledge.knowledge_index import KnowledgeIndex  # noqa: E402
+from AtendentePro.Knowledge.knowledge_store import HEADER_FILENAME, EmbeddingStore  # noqa: E402
+
+
+def _write_embeddings(path: Path, vectors: list[list[float]], dtype: str = "float32") -> None:
+    chunks = [
+        {"content": f"conteúdo {i}", "source": f"doc{i}.pdf", "start_pos": 0, "end_pos": 10}
+        for i in range(len(vectors))
+    ]
+    EmbeddingStore.write(path, vectors, chunks, dtype=dtype)
+
+
+def test_index_loads_normalized_matrix(tmp_path):
+    """Testa se o índice carrega os vetores normalizados do armazenamento."""
+    path = tmp_path / "embedding"
+    _write_embeddings(path, [[3.0, 4.0], [0.0, 2.0]])
+
+    index = KnowledgeIndex(path)
+    assert index.reload()
+    matrix, store = index.snapshot()
+
+    assert index.size == 2
+    assert matrix.dtype.name == "float32"
+    assert abs(float((matrix[0] ** 2).sum()) - 1.0) < 1e-6
+    assert store.chunk(1)["source"] == "doc1.pdf"
+
+
+def test_index_search_orders_by_similarity(tmp_path):
+    """Testa se a busca retorna os trechos mais similares primeiro."""
+    path = tmp_path / "embedding"
+    _write_embeddings(path, [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]])
+
+    index = KnowledgeIndex(path)
+    index.reload()
+    results = index.search([0.0, 5.0], top_k=2)
+
+    assert [result["index"] for result in results] == [1, 2]
+    assert abs(results[0]["similarity"] - 1.0) < 1e-6
+
+
+def test_float16_store_stays_memory_mapped(tmp_path, monkeypatch):
+    """Testa se um armazenamento float16 continua mapeado em memória e pontua como o float32."""
+    monkeypatch.setattr(knowledge_search, "SCORE_BLOCK_ROWS", 2)
+    vectors = np.random.default_rng(0).normal(size=(5, 8)).tolist()
+    _write_embeddings(tmp_path / "fp16", vectors, dtype="float16")
+    _write_embeddings(tmp_path / "fp32", vectors)
+    half, full = KnowledgeIndex(tmp_path / "fp16"), KnowledgeIndex(tmp_path / "fp32")
+    half.reload()
+    full.reload()
+
+    matrix, _ = half.snapshot()
+    assert isinstance(matrix, np.memmap) and matrix.dtype == np.float16
+
+    def ranking(results):
+        return [(result["index"], round(result["similarity"], 2)) for result in results]
+
+    assert ranking(half.search(vectors[3], top_k=3)) == ranking(full.search(vectors[3], top_k=3))
+    half_batch = half.search_batch([vectors[3], vectors[0]], top_k=3)
+    full_batch = full.search_batch([vectors[3], vectors[0]], top_k=3)
+    assert [ranking(results) for results in half_batch] == [ranking(results) for results in full_batch]
+
+
+def test_index_reloads_only_when_file_changes(tmp_path):
+    """Testa se o índice só recarrega quando o arquivo muda."""
+    path = tmp_path / "embedding"
+    _write_embeddings(path, [[1.0, 0.0]])
+
+    index = KnowledgeIndex(path)
+    index.reload()
+    assert index.reload_if_changed() is False
+
+    _write_embeddings(path, [[1.0, 0.0], [0.0, 1.0]])
+    header = path / HEADER_FILENAME
+    stat = header.stat()
+    os.utime(header, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert index.reload_if_changed() is True
+    assert index.size == 2
+
+
+def test_index_missing_file_returns_no_results(tmp_path):
+    """Testa o comportamento quando o arquivo de embeddings não existe."""
+    index = KnowledgeIndex(tmp_path / "missing")
+    assert index.reload() is False
+    assert index.search([1.0, 0.0]) == []
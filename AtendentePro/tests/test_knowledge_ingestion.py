@@ -0,0 +1,129 @@
+"""Testes para a ingestão de embeddings em lotes concorrentes."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import httpx
+import openai
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.Knowledge.knowledge_embedding_cache import EmbeddingCache  # noqa: E402
+from AtendentePro.Knowledge.knowledge_ingestion import embed_texts, pack_batches  # noqa: E402
+
+
+class FakeEmbeddingServer:
+    """Servidor de embeddings local e determinístico, com falhas programáveis."""
+
+    def __init__(self, failures: list[int] | None = None) -> None:
+        self.failures = list(failures or [])
+        self.requests: list[list[str]] = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        if self.failures:
+            return httpx.Response(self.failures.pop(0), json={"error": {"message": "fake failure"}})
+        payload = json.loads(request.content)
+        inputs = payload["input"]
+        self.requests.append(inputs)
+        data = [
+            {"object": "embedding", "index": i, "embedding": [float(len(text)), 1.0]}
+            for i, text in enumerate(inputs)
+        ]
+        return httpx.Response(
+            200,
+            json={
+                "object": "list",
+                "data": list(reversed(data)),
+                "model": payload["model"],
+                "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+            },
+        )
+
+    def client(self) -> openai.AsyncOpenAI:
+        return openai.AsyncOpenAI(
+            api_key="sk-test",
+            base_url="http://fake-embeddings.local/v1",
+            max_retries=0,
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(self.handle)),
+        )
+
+
+def test_pack_batches_respects_limits():
+    """Testa se os lotes respeitam os limites de tokens e de entradas."""
+    texts = ["a" * 40] * 10  # ~10 tokens each
+
+    assert pack_batches(texts, max_tokens_per_batch=30, max_inputs_per_batch=100) == [
+        [0, 1, 2],
+        [3, 4, 5],
+        [6, 7, 8],
+        [9],
+    ]
+    assert [len(batch) for batch in pack_batches(texts, max_inputs_per_batch=4)] == [4, 4, 2]
+
+
+def test_embed_texts_batches_and_preserves_order():
+    """Testa se os vetores voltam na ordem original mesmo com lotes concorrentes."""
+    server = FakeEmbeddingServer()
+    texts = [f"trecho {'x' * i}" for i in range(7)]
+    progress: list[tuple[int, int]] = []
+
+    vectors = asyncio.run(
+        embed_texts(
+            texts,
+            client=server.client(),
+            max_inputs_per_batch=3,
+            concurrency=2,
+            progress=lambda done, total: progress.append((done, total)),
+        )
+    )
+
+    assert [vector[0] for vector in vectors] == [float(len(text)) for text in texts]
+    assert len(server.requests) == 3
+    assert progress[-1] == (7, 7)
+
+
+def test_embed_texts_retries_rate_limits():
+    """Testa a nova tentativa após 429 e 5xx."""
+    server = FakeEmbeddingServer(failures=[429, 503])
+
+    vectors = asyncio.run(
+        embed_texts(["pergunta"], client=server.client(), backoff_base=0.001, progress=None)
+    )
+
+    assert vectors == [[8.0, 1.0]]
+
+
+def test_embed_texts_gives_up_on_client_errors():
+    """Testa que erros 4xx não transitórios não são repetidos."""
+    server = FakeEmbeddingServer(failures=[400])
+
+    vectors = asyncio.run(
+        embed_texts(["pergunta"], client=server.client(), backoff_base=0.001, progress=None)
+    )
+
+    assert vectors == [None]
+    assert server.requests == []
+
+
+def test_embed_texts_only_sends_uncached_and_unique_texts(tmp_path):
+    """Testa que trechos já em cache ou repetidos não geram novas chamadas."""
+    server = FakeEmbeddingServer()
+    cache = EmbeddingCache(tmp_path / "cache.sqlite")
+    client = server.client()
+
+    asyncio.run(embed_texts(["a", "bb"], client=client, cache=cache, progress=None))
+    vectors = asyncio.run(embed_texts(["a", "ccc", "ccc", "bb"], client=client, cache=cache, progress=None))
+
+    assert server.requests == [["a", "bb"], ["ccc"]]
+    assert [vector[0] for vector in vectors] == [1.0, 3.0, 3.0, 2.0]
@@ -0,0 +1,96 @@
+"""Testes para o índice invertido BM25 e a busca híbrida com fusão RRF."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.Knowledge.knowledge_config import HybridConfig  # noqa: E402
+from AtendentePro.Knowledge.knowledge_index import KnowledgeIndex  # noqa: E402
+from AtendentePro.Knowledge.knowledge_lexical import (  # noqa: E402
+    BM25Index,
+    lexical_index_path,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+from AtendentePro.Knowledge.knowledge_store import EmbeddingStore  # noqa: E402
+
+TEXTS = [
+    "Para compras de uso e consumo utilize o código IVA I0 com CFOP 1556.",
+    "A carta de correção pode ser emitida em até 30 dias após a autorização.",
+    "O cancelamento extemporâneo exige abertura de chamado fiscal.",
+    "Mercadoria sujeita a ICMS ST deve ter a substituição destacada na nota.",
+]
+
+
+def test_tokenize_keeps_codes_and_folds_accents():
+    """Testa se códigos fiscais são preservados e acentos e palavras vazias removidos."""
+    assert tokenize("Código IVA I0 para a Correção") == ["codigo", "iva", "i0", "correcao"]
+
+
+def test_bm25_ranks_exact_code_first_and_round_trips(tmp_path):
+    """Testa se o trecho com o código exato vence e se o índice salvo dá os mesmos escores."""
+    index = BM25Index.build(TEXTS, version="v1")
+    rows, scores = index.search("qual IVA usar, I0?", 3)
+    assert rows[0] == 0
+    assert index.search("icms st", 3)[0].tolist() == [3]
+    assert len(index.search("palavra inexistente", 3)[0]) == 0
+
+    path = lexical_index_path(tmp_path, "v1")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert np.allclose(loaded.scores("carta de correção"), index.scores("carta de correção"))
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    """Testa se itens bem colocados nas duas listas ficam na frente."""
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]], k=60)
+
+    assert [row for row, _ in fused] == [1, 3, 2, 4]
+    assert fused[0][1] == 1 / 61 + 1 / 62
+
+
+def test_hybrid_search_finds_code_missed_by_vectors(tmp_path):
+    """Testa se a busca híbrida traz o trecho com o código que a busca vetorial deixou de fora."""
+    vectors = np.array([[0.2, 1.0], [1.0, 0.0], [0.9, 0.3], [0.8, 0.5]], dtype=np.float32)
+    chunks = [{"content": text, "source": f"doc{i}.pdf"} for i, text in enumerate(TEXTS)]
+    EmbeddingStore.write(tmp_path, vectors, chunks)
+    index = KnowledgeIndex(tmp_path, hybrid=HybridConfig(enabled=True, candidates=2))
+    assert index.reload()
+
+    query = np.array([1.0, 0.0], dtype=np.float32)
+    vector_only = [result["index"] for result in index.search(query, top_k=2)]
+    hybrid = index.search(query, top_k=2, query_text="código IVA I0")
+
+    assert 0 not in vector_only
+    assert [result["index"] for result in hybrid] == [1, 0]
+    assert np.isclose(hybrid[1]["similarity"], vectors[0] @ query / np.linalg.norm(vectors[0]))
+    assert list(tmp_path.glob("bm25-*.npz"))
+
+
+def test_hybrid_and_vector_scores_share_one_scale(tmp_path):
+    """Testa se a busca híbrida e a vetorial dão a mesma similaridade ao mesmo trecho, mesmo sem vetor unitário."""
+    vectors = np.array([[0.2, 1.0], [1.0, 0.0], [0.9, 0.3], [0.8, 0.5]], dtype=np.float32)
+    chunks = [{"content": text, "source": f"doc{i}.pdf"} for i, text in enumerate(TEXTS)]
+    EmbeddingStore.write(tmp_path, vectors, chunks)
+    index = KnowledgeIndex(tmp_path, hybrid=HybridConfig(enabled=True, candidates=2))
+    assert index.reload()
+
+    query = np.array([3.0, 0.0], dtype=np.float32)
+    vector_only = {result["index"]: result["similarity"] for result in index.search(query, top_k=4)}
+    hybrid = index.search(query, top_k=2, query_text="código IVA I0")
+
+    assert hybrid
+    for result in hybrid:
+        assert np.isclose(result["similarity"], vector_only[result["index"]])
@@ -0,0 +1,138 @@
+"""Testes para a ingestão incremental guiada por impressões digitais dos arquivos."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import docx
+import httpx
+import openai
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.Knowledge.knowledge_manifest import IngestionManifest  # noqa: E402
+from AtendentePro.Knowledge.knowledge_store import EmbeddingStore  # noqa: E402
+from AtendentePro.Knowledge.rag_agent import RAGAgent  # noqa: E402
+
+
+def _write_docx(path: Path, text: str) -> None:
+    document = docx.Document()
+    document.add_paragraph(text)
+    document.save(path)
+
+
+def _fake_client(calls: list[list[str]]) -> openai.AsyncOpenAI:
+    def handle(request: httpx.Request) -> httpx.Response:
+        import json
+
+        inputs = json.loads(request.content)["input"]
+        calls.append(inputs)
+        data = [
+            {"object": "embedding", "index": i, "embedding": [float(len(text)), 1.0, 0.5]}
+            for i, text in enumerate(inputs)
+        ]
+        return httpx.Response(
+            200,
+            json={"object": "list", "data": data, "model": "fake", "usage": {"prompt_tokens": 1, "total_tokens": 1}},
+        )
+
+    return openai.AsyncOpenAI(
+        api_key="sk-test",
+        base_url="http://fake-embeddings.local/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handle)),
+    )
+
+
+def test_manifest_diff_detects_changes(tmp_path):
+    """Testa a detecção de arquivos adicionados, alterados, removidos e apenas tocados."""
+    (tmp_path / "a.pdf").write_bytes(b"a")
+    (tmp_path / "b.pdf").write_bytes(b"b")
+    (tmp_path / "notas.txt").write_bytes(b"ignorado")
+    manifest = IngestionManifest()
+    manifest.record(tmp_path / "a.pdf", 1)
+    manifest.record(tmp_path / "b.pdf", 1)
+    manifest.files["c.pdf"] = manifest.files["a.pdf"].model_copy(update={"path": "c.pdf"})
+
+    (tmp_path / "b.pdf").write_bytes(b"bb")
+    stat = (tmp_path / "a.pdf").stat()
+    os.utime(tmp_path / "a.pdf", ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000))
+    (tmp_path / "d.docx").write_bytes(b"d")
+
+    diff = manifest.diff(tmp_path)
+
+    assert diff.added == ["d.docx"]
+    assert diff.changed == ["b.pdf"]
+    assert diff.removed == ["c.pdf"]
+    assert diff.unchanged == ["a.pdf"]
+
+
+def test_refresh_embeddings_only_reingests_changed_files(tmp_path):
+    """Testa que apenas o documento alterado é reprocessado e reindexado."""
+    docs = tmp_path / "knowledge_documentos"
+    docs.mkdir()
+    _write_docx(docs / "carta.docx", "Carta de correção eletrônica. " * 10)
+    _write_docx(docs / "cancelamento.docx", "Cancelamento extemporâneo de NF-e. " * 10)
+    _write_docx(docs / "recebimento.docx", "Recebimento de notas fiscais. " * 10)
+
+    calls: list[list[str]] = []
+    agent = RAGAgent(api_key="sk-test", doc_folder=str(docs))
+    agent.async_client = _fake_client(calls)
+
+    assert asyncio.run(agent.refresh_embeddings()) is True
+    first = EmbeddingStore.open(docs / "embedding")
+    assert set(first.header.sources) == {"carta.docx", "cancelamento.docx", "recebimento.docx"}
+    assert len(calls) == 1
+
+    assert asyncio.run(agent.refresh_embeddings()) is False
+
+    _write_docx(docs / "carta.docx", "Carta de correção: campos permitidos e proibidos. " * 10)
+    (docs / "cancelamento.docx").unlink()
+    _write_docx(docs / "manifestacao.docx", "Manifestação do destinatário. " * 10)
+    assert asyncio.run(agent.refresh_embeddings()) is True
+
+    store = EmbeddingStore.open(docs / "embedding")
+    assert sorted(store.header.sources) == ["carta.docx", "manifestacao.docx", "recebimento.docx"]
+    reembedded = [text for batch in calls[1:] for text in batch]
+    assert reembedded == [
+        chunk["content"] for chunk in store.iter_chunks() if chunk["source"] != "recebimento.docx"
+    ]
+    kept = first.rows_for_sources(["recebimento.docx"])
+    assert [first.chunk(row) for row in kept] == [
+        chunk for chunk in store.iter_chunks() if chunk["source"] == "recebimento.docx"
+    ]
+    manifest = IngestionManifest.load(docs / "embedding" / "manifest.json")
+    assert manifest.store_version == store.version
+    assert sorted(manifest.files) == ["carta.docx", "manifestacao.docx", "recebimento.docx"]
+
+
+def test_text_shared_by_documents_survives_removing_one_of_them(tmp_path):
+    """Testa que o texto repetido em dois documentos continua no índice quando um deles muda ou é removido."""
+    docs = tmp_path / "knowledge_documentos"
+    docs.mkdir()
+    for name in ("politica.docx", "politica_copia.docx"):
+        _write_docx(docs / name, "Política de devolução de cilindros. " * 10)
+
+    agent = RAGAgent(api_key="sk-test", doc_folder=str(docs))
+    agent.async_client = _fake_client([])
+    asyncio.run(agent.refresh_embeddings())
+    first = EmbeddingStore.open(docs / "embedding")
+    assert sorted({chunk["source"] for chunk in first.iter_chunks()}) == ["politica.docx", "politica_copia.docx"]
+
+    _write_docx(docs / "politica_copia.docx", "Outro assunto. " * 10)
+    asyncio.run(agent.refresh_embeddings())
+    (docs / "politica_copia.docx").unlink()
+    asyncio.run(agent.refresh_embeddings())
+
+    store = EmbeddingStore.open(docs / "embedding")
+    assert sorted(store.header.sources) == ["politica.docx"]
+    assert list(store.iter_chunks()) == [chunk for chunk in first.iter_chunks() if chunk["source"] == "politica.docx"]
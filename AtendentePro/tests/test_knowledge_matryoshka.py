@@ -0,0 +1,116 @@
+"""Testes para embeddings com dimensão reduzida (Matryoshka) e busca em dois estágios."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import docx
+import httpx
+import numpy as np
+import openai
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.Knowledge.knowledge_backends import MatryoshkaBackend  # noqa: E402
+from AtendentePro.Knowledge.knowledge_benchmark import run_truncation_benchmark  # noqa: E402
+from AtendentePro.Knowledge.knowledge_embedding_cache import EmbeddingCache  # noqa: E402
+from AtendentePro.Knowledge.knowledge_ingestion import embed_texts, embedding_key  # noqa: E402
+from AtendentePro.Knowledge.knowledge_manifest import IngestionManifest  # noqa: E402
+from AtendentePro.Knowledge.knowledge_search import score_top_k, truncate_rows  # noqa: E402
+from AtendentePro.Knowledge.knowledge_store import DEFAULT_STORE_DIR, EmbeddingStore  # noqa: E402
+from AtendentePro.Knowledge.rag_agent import RAGAgent  # noqa: E402
+
+
+def _fake_client(requests: list[dict]) -> openai.AsyncOpenAI:
+    def handle(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        requests.append(body)
+        size = body.get("dimensions", 4)
+        data = [
+            {"object": "embedding", "index": i, "embedding": [1.0] + [float(i)] * (size - 1)}
+            for i in range(len(body["input"]))
+        ]
+        return httpx.Response(
+            200,
+            json={"object": "list", "data": data, "model": "fake", "usage": {"prompt_tokens": 1, "total_tokens": 1}},
+        )
+
+    return openai.AsyncOpenAI(
+        api_key="sk-test",
+        base_url="http://fake-embeddings.local/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handle)),
+    )
+
+
+def test_truncate_rows_keeps_prefix_normalized():
+    """Testa se o truncamento mantém o prefixo do vetor e renormaliza."""
+    short = truncate_rows([[3.0, 4.0, 12.0]], 2)
+    np.testing.assert_allclose(short, [[0.6, 0.8]], rtol=1e-6)
+
+
+def test_two_stage_search_matches_full_vectors_on_corpus():
+    """Testa se a busca em dois estágios no acervo White_Martins reproduz a busca completa."""
+    store = EmbeddingStore.open(DEFAULT_STORE_DIR)
+    matrix = np.asarray(store.vectors, dtype=np.float32)
+
+    backend = MatryoshkaBackend(dimensions=256, rescore=4)
+    backend.build(store.vectors)
+    assert backend.nbytes * 12 == matrix.nbytes
+
+    for query in matrix[:10]:
+        rows, scores = backend.search(query, 3)
+        exact_rows, exact_scores = score_top_k(matrix, query, 3)
+        assert rows.tolist() == exact_rows.tolist()
+        np.testing.assert_allclose(scores, exact_scores, rtol=1e-5)
+
+
+def test_truncation_benchmark_reports_recall_per_dimension():
+    """Testa se o benchmark de truncamento mede o ganho da reclassificação."""
+    results = {result.backend: result for result in run_truncation_benchmark(DEFAULT_STORE_DIR, [64], top_k=3)}
+
+    assert results["brute_force"].recall == 1.0
+    assert results["dim64+rescore"].recall >= results["dim64"].recall
+    assert results["dim64"].size == len(EmbeddingStore.open(DEFAULT_STORE_DIR))
+
+
+def test_embed_texts_requests_dimensions_with_separate_cache(tmp_path):
+    """Testa se a dimensão reduzida é enviada à API e não mistura o cache dos vetores completos."""
+    requests: list[dict] = []
+    cache = EmbeddingCache(tmp_path / "cache.sqlite")
+    client = _fake_client(requests)
+
+    short = asyncio.run(embed_texts(["nota fiscal"], client=client, model="m", dimensions=2, cache=cache))
+    full = asyncio.run(embed_texts(["nota fiscal"], client=client, model="m", cache=cache))
+
+    assert len(short[0]) == 2 and len(full[0]) == 4
+    assert requests[0]["dimensions"] == 2 and "dimensions" not in requests[1]
+    assert cache.get_many(embedding_key("m", 2), ["nota fiscal"])[0] is not None
+
+
+def test_changing_dimensions_rebuilds_the_store(tmp_path):
+    """Testa que alterar a dimensão configurada força a reindexação completa."""
+    docs = tmp_path / "knowledge_documentos"
+    docs.mkdir()
+    document = docx.Document()
+    document.add_paragraph("Recebimento de notas fiscais. " * 20)
+    document.save(docs / "recebimento.docx")
+    requests: list[dict] = []
+
+    for dimensions, rebuilt in [(None, True), (None, False), (2, True)]:
+        agent = RAGAgent(api_key="sk-test", doc_folder=str(docs))
+        agent.embedding_dimensions = dimensions
+        agent.async_client = _fake_client(requests)
+        assert asyncio.run(agent.refresh_embeddings()) is rebuilt
+
+    assert EmbeddingStore.open(docs / "embedding").dimension == 2
+    assert IngestionManifest.load(docs / "embedding" / "manifest.json").embedding_dimensions == 2
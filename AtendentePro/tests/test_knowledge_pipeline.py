@@ -0,0 +1,142 @@
+"""Testes para o pipeline de ingestão em streaming."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import sys
+from pathlib import Path
+
+import docx
+import httpx
+import numpy as np
+import openai
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.Knowledge.knowledge_chunking import CharacterChunker, iter_text_chunks  # noqa: E402
+from AtendentePro.Knowledge.knowledge_pipeline import stream_documents_into_store  # noqa: E402
+from AtendentePro.Knowledge.knowledge_store import EmbeddingStore, StoreWriter  # noqa: E402
+
+
+def _write_docx(path: Path, text: str) -> None:
+    document = docx.Document()
+    document.add_paragraph(text)
+    document.save(path)
+
+
+def _fake_client(calls: list[list[str]]) -> openai.AsyncOpenAI:
+    def handle(request: httpx.Request) -> httpx.Response:
+        inputs = json.loads(request.content)["input"]
+        calls.append(inputs)
+        data = [
+            {"object": "embedding", "index": i, "embedding": [float(len(text)), 1.0, 0.5]}
+            for i, text in enumerate(inputs)
+        ]
+        return httpx.Response(
+            200,
+            json={"object": "list", "data": data, "model": "fake", "usage": {"prompt_tokens": 1, "total_tokens": 1}},
+        )
+
+    return openai.AsyncOpenAI(
+        api_key="sk-test",
+        base_url="http://fake-embeddings.local/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handle)),
+    )
+
+
+def _sliced_chunks(source: str, text: str, chunk_size: int, overlap: int) -> list[dict]:
+    return [
+        {"content": text[i : i + chunk_size], "source": source, "start_pos": i, "end_pos": min(i + chunk_size, len(text))}
+        for i in range(0, len(text), chunk_size - overlap)
+        if len(text[i : i + chunk_size].strip()) > 100
+    ]
+
+
+def test_streaming_chunks_match_whole_text_slicing():
+    """Testa que o chunking em streaming reproduz o fatiamento do texto inteiro."""
+    rng = random.Random(7)
+    text = "".join(rng.choice("abc \n") for _ in range(5_321))
+    cuts = sorted(rng.sample(range(1, len(text)), 40))
+    segments = [text[start:stop] for start, stop in zip([0] + cuts, cuts + [len(text)])]
+
+    streamed = list(iter_text_chunks("doc.pdf", segments, chunk_size=700, overlap=150))
+
+    assert streamed == _sliced_chunks("doc.pdf", text, 700, 150)
+
+
+def test_store_writer_matches_in_memory_build(tmp_path):
+    """Testa que gravar em lotes gera os mesmos dados e versão que o build em memória."""
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(5, 4))
+    chunks = [{"content": f"trecho {i} ção", "source": f"doc{i % 2}.pdf", "start_pos": i, "end_pos": i + 1} for i in range(5)]
+
+    with StoreWriter(tmp_path) as writer:
+        writer.append(vectors[:2], chunks[:2])
+        writer.append(vectors[2:], chunks[2:])
+        store = writer.finish()
+
+    expected = EmbeddingStore.build(vectors, chunks)
+    assert store.version == expected.version
+    assert list(store.iter_chunks()) == chunks
+    np.testing.assert_array_equal(store.vectors, expected.vectors)
+    assert not any(path.name.startswith(".") for path in tmp_path.iterdir())
+
+
+def test_store_writer_discards_unfinished_writes(tmp_path):
+    """Testa que um erro no meio da gravação mantém a versão anterior intacta."""
+    original = EmbeddingStore.write(tmp_path, [[1.0, 0.0]], [{"content": "antigo", "source": "a.pdf"}])
+
+    try:
+        with StoreWriter(tmp_path) as writer:
+            writer.append([[0.0, 1.0]], [{"content": "novo", "source": "b.pdf"}])
+            raise RuntimeError("falha na ingestão")
+    except RuntimeError:
+        pass
+
+    assert EmbeddingStore.open(tmp_path).version == original.version
+    assert not any(path.name.startswith(".") for path in tmp_path.iterdir())
+
+
+def test_stream_documents_into_store_in_small_batches(tmp_path):
+    """Testa o fluxo completo com lotes pequenos, ordem preservada e arquivo corrompido."""
+    texts = {
+        "a.docx": "Carta de correção eletrônica. " * 80,
+        "b.docx": "Cancelamento extemporâneo de NF-e. " * 60,
+    }
+    for name, text in texts.items():
+        _write_docx(tmp_path / name, text)
+    (tmp_path / "c.pdf").write_bytes(b"%PDF-1.4 lixo")
+    calls: list[list[str]] = []
+
+    with StoreWriter(tmp_path / "embedding", embedding_model="fake") as writer:
+        result = asyncio.run(
+            stream_documents_into_store(
+                [tmp_path / "a.docx", tmp_path / "c.pdf", tmp_path / "b.docx"],
+                writer,
+                client=_fake_client(calls),
+                model="fake",
+                chunker=CharacterChunker(),
+                max_inputs_per_batch=2,
+                concurrency=2,
+                max_workers=2,
+            )
+        )
+        store = writer.finish()
+
+    expected = _sliced_chunks("a.docx", texts["a.docx"] + "\n", 1000, 200) + _sliced_chunks(
+        "b.docx", texts["b.docx"] + "\n", 1000, 200
+    )
+    assert list(store.iter_chunks()) == expected
+    assert [text for batch in calls for text in batch] == [chunk["content"] for chunk in expected]
+    assert all(len(batch) <= 2 for batch in calls)
+    assert result.failed_sources == ["c.pdf"]
+    assert result.chunk_counts == {"a.docx": 3, "b.docx": 3}
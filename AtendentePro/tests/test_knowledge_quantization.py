@@ -0,0 +1,89 @@
+"""Testes para a quantização escalar e por produto dos embeddings."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.Knowledge.knowledge_backends import create_index_backend  # noqa: E402
+from AtendentePro.Knowledge.knowledge_benchmark import recall_at_k, synthetic_corpus  # noqa: E402
+from AtendentePro.Knowledge.knowledge_index import KnowledgeIndex  # noqa: E402
+from AtendentePro.Knowledge.knowledge_quantization import ProductQuantizer, ScalarQuantizer  # noqa: E402
+from AtendentePro.Knowledge.knowledge_search import score_top_k_batch  # noqa: E402
+from AtendentePro.Knowledge.knowledge_store import EmbeddingStore  # noqa: E402
+
+
+def test_scalar_quantizer_scores_close_to_float():
+    """Testa se os códigos int8 preservam os produtos internos com a consulta em float."""
+    matrix, queries = synthetic_corpus(1000, 64, 5)
+    quantizer = ScalarQuantizer()
+    quantizer.train(matrix)
+    codes = quantizer.encode(matrix)
+
+    assert codes.dtype == np.uint8 and codes.nbytes * 4 == matrix.nbytes
+    for query in queries:
+        assert np.abs(quantizer.score(codes, query) - matrix @ query).max() < 0.02
+
+
+def test_product_quantizer_compresses_32x():
+    """Testa se o PQ usa um byte a cada 8 dimensões e aproxima os escores."""
+    matrix, queries = synthetic_corpus(2000, 64, 5, noise=1.0)
+    quantizer = ProductQuantizer(iterations=5)
+    quantizer.train(matrix)
+    codes = quantizer.encode(matrix)
+
+    assert codes.shape == (8, 2000)
+    assert codes.nbytes * 32 == matrix.nbytes
+    errors = [np.abs(quantizer.score(codes, query) - matrix @ query).mean() for query in queries]
+    assert max(errors) < 0.05
+
+    with pytest.raises(ValueError):
+        ProductQuantizer(subspaces=7).train(matrix)
+
+
+@pytest.mark.parametrize("name", ["int8", "pq"])
+def test_rescoring_restores_exact_scores(name):
+    """Testa se a reclassificação em precisão total devolve escores exatos e bom recall."""
+    matrix, queries = synthetic_corpus(2000, 64, 30, noise=1.0)
+    expected, expected_scores = score_top_k_batch(matrix, queries, 5)
+
+    backend = create_index_backend(name, rescore=8)
+    backend.build(matrix)
+    found = [backend.search(query, 5) for query in queries]
+
+    assert recall_at_k([rows for rows, _ in found], expected) >= 0.95
+    for (rows, scores), query in zip(found, queries):
+        np.testing.assert_allclose(scores, matrix[rows] @ query, rtol=1e-5, atol=1e-6)
+    assert backend.nbytes < matrix.nbytes
+
+
+def test_index_with_quantized_backend_caches_codes(tmp_path):
+    """Testa se o índice grava os códigos por versão do armazenamento e os reaproveita."""
+    path = tmp_path / "embedding"
+    matrix, queries = synthetic_corpus(300, 16, 3, noise=0.5)
+    chunks = [{"content": f"trecho {i}", "source": "doc.pdf"} for i in range(len(matrix))]
+    store = EmbeddingStore.write(path, matrix, chunks)
+
+    index = KnowledgeIndex(path, backend="pq", backend_options={"subspaces": 4, "rescore": 20})
+    assert index.reload()
+    cached = list(path.glob(f"pq-{store.version}-*.npz"))
+    assert len(cached) == 1
+
+    mtime = cached[0].stat().st_mtime_ns
+    assert index.reload()
+    assert cached[0].stat().st_mtime_ns == mtime
+
+    exact = index.search_batch(queries, top_k=1)
+    assert [index.search(query, top_k=1)[0]["index"] for query in queries] == [hit[0]["index"] for hit in exact]
@@ -0,0 +1,141 @@
+"""Testes para o embedding de perguntas e seu cache LRU com TTL."""
+
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+import httpx
+import numpy as np
+import openai
+import pytest
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.Knowledge.knowledge_query import (  # noqa: E402
+    QueryEmbedder,
+    QueryEmbeddingCache,
+    normalize_query,
+)
+from AtendentePro.Knowledge.knowledge_store import EmbeddingStore  # noqa: E402
+from AtendentePro.Knowledge.rag_agent import RAGAgent  # noqa: E402
+
+
+def _fake_client(requests: list[dict], size: int = 2) -> openai.OpenAI:
+    def handle(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        requests.append(body)
+        vector = [1.0] + [0.0] * (body.get("dimensions", size) - 1)
+        return httpx.Response(
+            200,
+            json={
+                "object": "list",
+                "data": [{"object": "embedding", "index": 0, "embedding": vector}],
+                "model": body["model"],
+                "usage": {"prompt_tokens": 1, "total_tokens": 1},
+            },
+        )
+
+    return openai.OpenAI(
+        api_key="sk-test",
+        base_url="http://fake-embeddings.local/v1",
+        http_client=httpx.Client(transport=httpx.MockTransport(handle)),
+    )
+
+
+def _write_store(path: Path, dimension: int, model: str = "text-embedding-3-large") -> EmbeddingStore:
+    vectors = np.eye(2, dimension)
+    chunks = [{"content": f"trecho {i}", "source": "doc.pdf"} for i in range(2)]
+    return EmbeddingStore.write(path, vectors, chunks, embedding_model=model)
+
+
+def test_normalize_query_ignores_case_and_spacing():
+    """Testa se variações de caixa e espaços geram a mesma chave."""
+    assert normalize_query("  Como  emitir a CC-e?\n") == normalize_query("como emitir a cc-e?")
+
+
+def test_cache_evicts_least_recently_used():
+    """Testa a remoção da entrada menos usada e as estatísticas do cache."""
+    cache = QueryEmbeddingCache(max_entries=2)
+    for question in ("a", "b"):
+        cache.put("m", None, question, np.ones(2))
+    assert cache.get("m", None, "a") is not None
+    cache.put("m", None, "c", np.ones(2))
+
+    assert cache.get("m", None, "b") is None
+    assert cache.get("m", 2, "a") is None
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.entries, stats.evicted) == (1, 2, 2, 1)
+
+
+def test_cache_entries_expire_after_ttl():
+    """Testa se entradas mais antigas que o TTL deixam de ser usadas."""
+    now = [0.0]
+    cache = QueryEmbeddingCache(ttl=10.0, clock=lambda: now[0])
+    cache.put("m", None, "pergunta", np.ones(2))
+
+    now[0] = 5.0
+    assert cache.get("m", None, "pergunta") is not None
+    now[0] = 16.0
+    assert cache.get("m", None, "pergunta") is None
+    assert cache.stats.expired == 1 and len(cache) == 0
+
+
+def test_repeated_question_skips_embedding_call(tmp_path):
+    """Testa se perguntas repetidas são atendidas sem nova chamada à API."""
+    requests: list[dict] = []
+    store = _write_store(tmp_path / "embedding", 4)
+    embedder = QueryEmbedder(_fake_client(requests), QueryEmbeddingCache())
+
+    first = embedder.embed_for_store("Como emitir a CC-e?", store)
+    second = embedder.embed_for_store("como emitir a  cc-e?", store)
+
+    assert len(requests) == 1
+    assert np.array_equal(first, second)
+    assert requests[0]["model"] == "text-embedding-3-large"
+    assert requests[0]["dimensions"] == 4
+
+
+def test_full_size_store_is_queried_without_dimensions(tmp_path):
+    """Testa se um armazenamento completo é consultado com o modelo do cabeçalho e sem dimensão."""
+    requests: list[dict] = []
+    store = _write_store(tmp_path / "embedding", 1536, model="text-embedding-3-small")
+    embedder = QueryEmbedder(_fake_client(requests, size=1536))
+
+    assert embedder.embed_for_store("pergunta", store).shape == (1536,)
+    assert requests[0]["model"] == "text-embedding-3-small"
+    assert "dimensions" not in requests[0]
+
+
+def test_dimension_mismatch_is_reported(tmp_path):
+    """Testa se um vetor com dimensão diferente da do armazenamento gera erro."""
+    store = _write_store(tmp_path / "embedding", 3, model="modelo-local")
+    embedder = QueryEmbedder(_fake_client([], size=2))
+
+    with pytest.raises(ValueError, match="expects 3"):
+        embedder.embed_for_store("pergunta", store)
+
+
+def test_rag_agent_queries_with_store_model(tmp_path):
+    """Testa se o RAGAgent embeda perguntas com o modelo dos trechos, e não com o -small."""
+    docs = tmp_path / "knowledge_documentos"
+    docs.mkdir()
+    _write_store(docs / "embedding", 8)
+    requests: list[dict] = []
+
+    agent = RAGAgent(api_key="sk-test", doc_folder=str(docs))
+    agent.query_embedder = QueryEmbedder(_fake_client(requests), QueryEmbeddingCache())
+    agent.load_embeddings()
+    results = agent.find_relevant_chunks("pergunta", top_k=1)
+
+    assert requests[0]["model"] == "text-embedding-3-large"
+    assert requests[0]["dimensions"] == 8
+    assert results[0]["chunk"]["content"] == "trecho 0"
@@ -0,0 +1,89 @@
+"""Testes para a reordenação dos trechos por cross-encoder local."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.Knowledge.knowledge_rerank import CrossEncoderReranker  # noqa: E402
+
+
+class _KeywordModel:
+    """Modelo falso: pontua cada par pela quantidade de palavras da pergunta no trecho."""
+
+    def __init__(self, on_predict=None):
+        self.batches: list[int] = []
+        self.on_predict = on_predict
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.batches.append(len(pairs))
+        if self.on_predict is not None:
+            self.on_predict()
+        return [float(sum(word in text for word in question.split())) for question, text in pairs]
+
+
+def _results(texts: list[str]) -> list[dict]:
+    return [{"chunk": {"content": text}, "index": i, "similarity": 1.0 - i / 10} for i, text in enumerate(texts)]
+
+
+def test_rerank_promotes_best_candidates_in_batches():
+    """Testa se os trechos mais relevantes sobem, em lotes, e recebem a pontuação."""
+    model = _KeywordModel()
+    reranker = CrossEncoderReranker(batch_size=2, budget_ms=None, model=model)
+    results = _results(["nada", "prazo", "carta correção prazo", "carta", "outro"])
+
+    ranked = reranker.rerank("carta correção prazo", results, top_k=3)
+
+    assert [result["index"] for result in ranked] == [2, 1, 3]
+    assert ranked[0]["rerank_score"] == 3.0
+    assert model.batches == [2, 2, 1]
+
+
+def test_rerank_stops_at_latency_budget():
+    """Testa se, estourado o orçamento, os trechos restantes mantêm a ordem da busca."""
+    now = [0.0]
+
+    def slow_batch():
+        now[0] += 0.05
+
+    model = _KeywordModel(on_predict=slow_batch)
+    reranker = CrossEncoderReranker(batch_size=2, budget_ms=30, model=model, clock=lambda: now[0])
+    results = _results(["a", "b", "c d", "c"])
+
+    ranked = reranker.rerank("c d", results, top_k=4)
+
+    assert model.batches == [2]
+    assert [result["index"] for result in ranked] == [0, 1, 2, 3]
+    assert "rerank_score" not in ranked[2]
+
+
+def test_failed_model_load_is_not_retried(monkeypatch):
+    """Testa se uma falha ao carregar o modelo não é repetida a cada pergunta."""
+    import sentence_transformers
+
+    attempts: list[str] = []
+
+    def broken(name, **kwargs):
+        attempts.append(name)
+        raise OSError("sem acesso ao modelo")
+
+    monkeypatch.setattr(sentence_transformers, "CrossEncoder", broken)
+    reranker = CrossEncoderReranker("modelo-inexistente")
+    results = _results(["a", "b"])
+
+    with pytest.raises(OSError):
+        reranker.rerank("a", results, top_k=1)
+    with pytest.raises(RuntimeError, match="unavailable"):
+        reranker.rerank("a", results, top_k=1)
+    assert attempts == ["modelo-inexistente"]
@@ -0,0 +1,58 @@
+"""Testes para o motor vetorizado de ranqueamento top-k."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.Knowledge.knowledge_search import (  # noqa: E402
+    normalize_rows,
+    score_top_k,
+    score_top_k_batch,
+    top_k_indices,
+)
+
+
+def test_top_k_matches_full_sort():
+    """Testa se a seleção parcial retorna o mesmo resultado que uma ordenação completa."""
+    rng = np.random.default_rng(7)
+    matrix = normalize_rows(rng.normal(size=(500, 32)))
+    query = rng.normal(size=32)
+
+    rows, scores = score_top_k(matrix, query, top_k=10)
+
+    expected = np.argsort(-(matrix @ (query / np.linalg.norm(query))))[:10]
+    assert rows.tolist() == expected.tolist()
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_top_k_larger_than_corpus():
+    """Testa top_k maior que o número de trechos."""
+    rows = top_k_indices(np.array([0.1, 0.9, 0.5], dtype=np.float32), top_k=10)
+    assert rows.tolist() == [1, 2, 0]
+
+
+def test_batch_scoring_matches_single_queries():
+    """Testa se a busca em lote coincide com consultas individuais."""
+    rng = np.random.default_rng(11)
+    matrix = normalize_rows(rng.normal(size=(200, 16)))
+    queries = rng.normal(size=(4, 16))
+
+    batch_rows, batch_scores = score_top_k_batch(matrix, queries, top_k=5)
+
+    assert batch_rows.shape == (4, 5)
+    for query, rows, scores in zip(queries, batch_rows, batch_scores):
+        single_rows, single_scores = score_top_k(matrix, query, top_k=5)
+        assert rows.tolist() == single_rows.tolist()
+        assert np.allclose(scores, single_scores)
@@ -0,0 +1,82 @@
+"""Testes para o armazenamento versionado de embeddings."""
+
+from __future__ import annotations
+
+import pickle
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.Knowledge.knowledge_store import EmbeddingStore, migrate_pickle  # noqa: E402
+
+CHUNKS = [
+    {"content": "Carta de correção eletrônica", "source": "cc.pdf", "start_pos": 0, "end_pos": 28},
+    {"content": "Cancelamento extemporâneo", "source": "cancel.pdf", "start_pos": 0, "end_pos": 25},
+    {"content": "Código IVA — finalidade", "source": "cc.pdf", "start_pos": 800, "end_pos": 823},
+]
+
+
+def test_store_round_trip(tmp_path):
+    """Testa se vetores e metadados sobrevivem à gravação e leitura com mmap."""
+    vectors = [[3.0, 4.0], [1.0, 0.0], [0.0, 2.0]]
+    EmbeddingStore.write(tmp_path, vectors, CHUNKS, embedding_model="text-embedding-3-large")
+
+    store = EmbeddingStore.open(tmp_path)
+
+    assert isinstance(store.vectors, np.memmap)
+    assert store.embedding_model == "text-embedding-3-large"
+    assert store.dimension == 2
+    assert len(store) == 3
+    assert list(store.iter_chunks()) == CHUNKS
+    assert np.allclose(store.vectors[0], [0.6, 0.8])
+
+
+def test_store_float16(tmp_path):
+    """Testa o armazenamento em meia precisão."""
+    store = EmbeddingStore.write(tmp_path, [[1.0, 1.0]] * 3, CHUNKS, dtype="float16")
+    assert store.vectors.dtype == np.float16
+    assert store.header.dtype == "float16"
+
+
+def test_store_rewrite_removes_stale_versions(tmp_path):
+    """Testa se uma nova versão substitui os arquivos da anterior."""
+    first = EmbeddingStore.write(tmp_path, [[1.0, 0.0]] * 3, CHUNKS)
+    second = EmbeddingStore.write(tmp_path, [[0.0, 1.0]] * 3, CHUNKS)
+
+    assert first.version != second.version
+    assert EmbeddingStore.open(tmp_path).version == second.version
+    assert not list(tmp_path.glob(f"*{first.version}*"))
+    # The previously opened version stays readable through its mapping.
+    assert np.allclose(first.vectors[0], [1.0, 0.0])
+
+
+def test_store_rejects_unknown_dtype(tmp_path):
+    """Testa a validação do tipo numérico."""
+    with pytest.raises(ValueError):
+        EmbeddingStore.write(tmp_path, [[1.0]] * 3, CHUNKS, dtype="int8")
+
+
+def test_migrate_pickle(tmp_path):
+    """Testa a conversão do formato legado embeddings.pkl."""
+    records = [
+        {"chunk": chunk, "embedding": [float(i), 1.0], "index": i} for i, chunk in enumerate(CHUNKS)
+    ]
+    pickle_path = tmp_path / "embeddings.pkl"
+    with open(pickle_path, "wb") as file:
+        pickle.dump(records, file)
+
+    store = migrate_pickle(pickle_path)
+
+    assert len(store) == 3
+    assert store.chunk(2) == CHUNKS[2]
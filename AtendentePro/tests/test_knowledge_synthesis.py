@@ -0,0 +1,57 @@
+"""Testes para a síntese da resposta pelo próprio Knowledge Agent."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from agents.tool_context import ToolContext  # noqa: E402
+
+from AtendentePro.Knowledge import knowledge_agent  # noqa: E402
+from AtendentePro.Knowledge.knowledge_config import KnowledgeConfig  # noqa: E402
+from AtendentePro.Knowledge.knowledge_prompts import RAG_AGENT_SYNTHESIS  # noqa: E402
+
+
+def test_agent_mode_returns_context_without_extra_model_call(monkeypatch):
+    """Testa se, no modo agent, o go_to_rag devolve só o contexto e não chama a síntese."""
+    chunk = {"content": "A CC-e corrige dados da nota.", "source": "cc.pdf"}
+    chunks = [{"chunk": chunk, "index": 3, "similarity": 0.7}]
+
+    async def fake_find(question: str, top_k: int = 3):
+        return chunks, np.ones(2), "v1"
+
+    async def unexpected_synthesis(question: str, context: str):
+        raise AssertionError("a síntese não deveria ser chamada no modo agent")
+
+    monkeypatch.setattr(knowledge_agent, "__find_relevant_chunks", fake_find)
+    monkeypatch.setattr(knowledge_agent, "_synthesize", unexpected_synthesis)
+    arguments = json.dumps({"question": "Para que serve a CC-e?"})
+    context = ToolContext(context=None, tool_name="go_to_rag", tool_call_id="call", tool_arguments=arguments)
+
+    result = asyncio.run(knowledge_agent.go_to_rag.on_invoke_tool(context, arguments))
+
+    assert KnowledgeConfig.load().synthesis.mode == "agent"
+    assert result.answer == ""
+    assert "A CC-e corrige dados da nota." in result.context
+    assert result.sources == ["cc.pdf"]
+
+
+def test_agent_mode_prompt_asks_the_agent_to_write_the_answer():
+    """Testa se as instruções do agente pedem que ele redija a resposta a partir do contexto."""
+    instructions = knowledge_agent.knowledge_agent.instructions
+
+    assert RAG_AGENT_SYNTHESIS in instructions
+    assert "Retorne a resposta da função go_to_rag" not in instructions
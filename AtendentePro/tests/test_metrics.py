@@ -0,0 +1,125 @@
+"""Testes para a contabilidade de latência e tokens por agente, handoff e ferramenta."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from agents.stream_events import RawResponsesStreamEvent  # noqa: E402
+from agents.tracing.span_data import GuardrailSpanData  # noqa: E402
+from agents.usage import Usage  # noqa: E402
+from openai.types.responses.response_usage import InputTokensDetails  # noqa: E402
+
+from AtendentePro.utils.metrics import (  # noqa: E402
+    MetricsHooks,
+    MetricsRegistry,
+    MetricsTracingProcessor,
+    TraceWriter,
+    current_session,
+    get_metrics_registry,
+    set_trace_writer,
+    timed_stage,
+)
+
+TRIAGE = SimpleNamespace(name="Triage Agent")
+KNOWLEDGE = SimpleNamespace(name="Knowledge Agent")
+RAG_TOOL = SimpleNamespace(name="go_to_rag")
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _read_trace(path: Path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_hooks_record_model_tool_and_handoff_metrics(tmp_path):
+    """Testa latência, tempo até o primeiro token, tokens, ferramentas e handoffs de um turno."""
+    clock = _Clock()
+    registry = MetricsRegistry()
+    hooks = MetricsHooks("sessao-1", registry=registry, clock=clock)
+    trace_path = tmp_path / "trace.jsonl"
+    set_trace_writer(TraceWriter(trace_path))
+    usage = Usage(
+        requests=1, input_tokens=1200, output_tokens=80, input_tokens_details=InputTokensDetails(cached_tokens=1024)
+    )
+    delta = RawResponsesStreamEvent(data=SimpleNamespace(type="response.output_text.delta", delta="Olá"))
+
+    async def turn():
+        await hooks.on_agent_start(None, TRIAGE)
+        await hooks.on_llm_start(None, TRIAGE, None, [])
+        clock.now = 0.4
+        hooks.observe_stream_event(delta)
+        clock.now = 1.5
+        hooks.observe_stream_event(delta)
+        await hooks.on_llm_end(None, TRIAGE, SimpleNamespace(usage=usage))
+        await hooks.on_handoff(None, TRIAGE, KNOWLEDGE)
+        await hooks.on_tool_start(SimpleNamespace(tool_call_id="call-1"), KNOWLEDGE, RAG_TOOL)
+        clock.now = 2.0
+        await hooks.on_tool_end(SimpleNamespace(tool_call_id="call-1"), KNOWLEDGE, RAG_TOOL, "ok")
+        await hooks.on_agent_end(None, TRIAGE, None)
+
+    try:
+        asyncio.run(turn())
+    finally:
+        set_trace_writer(None)
+
+    assert registry.value("llm_tokens_total", agent="Triage Agent", kind="cached") == 1024
+    assert registry.value("llm_ttft_seconds", agent="Triage Agent") == 1
+    assert registry.value("tool_seconds", agent="Knowledge Agent", tool="go_to_rag") == 1
+    assert registry.value("handoffs_total", from_agent="Triage Agent", to_agent="Knowledge Agent") == 1
+    assert hooks.totals["Triage Agent"]["input_tokens"] == 1200
+    assert hooks.totals["Triage Agent"]["llm_seconds"] == 1.5
+
+    events = _read_trace(trace_path)
+    assert [event["event"] for event in events] == ["agent_start", "ttft", "llm", "handoff", "tool", "agent_end"]
+    assert {event["session_id"] for event in events} == {"sessao-1"}
+    assert events[1]["seconds"] == 0.4 and events[4]["seconds"] == 0.5
+
+
+def test_stages_and_guardrails_are_exported_in_prometheus_format(tmp_path):
+    """Testa as etapas do go_to_rag, o tempo dos guardrails e o texto no formato Prometheus."""
+    trace_path = tmp_path / "trace.jsonl"
+    set_trace_writer(TraceWriter(trace_path))
+    before = get_metrics_registry().value("stage_seconds", stage="rag.embed")
+    token = current_session.set("sessao-2")
+    clock = _Clock()
+    registry = MetricsRegistry()
+    processor = MetricsTracingProcessor(registry, clock=clock)
+    span = SimpleNamespace(span_id="span-1", span_data=GuardrailSpanData("fora_do_escopo", triggered=True))
+    try:
+        with timed_stage("rag.embed"):
+            pass
+        processor.on_span_start(span)
+        clock.now = 0.2
+        processor.on_span_end(span)
+    finally:
+        current_session.reset(token)
+        set_trace_writer(None)
+
+    assert get_metrics_registry().value("stage_seconds", stage="rag.embed") == before + 1
+    text = registry.render()
+    assert "# TYPE atendente_guardrail_seconds histogram" in text
+    assert 'atendente_guardrail_seconds_bucket{guardrail="fora_do_escopo",triggered="true",le="0.25"} 1' in text
+    assert 'atendente_guardrail_seconds_count{guardrail="fora_do_escopo",triggered="true"} 1' in text
+    assert [(event["event"], event["session_id"]) for event in _read_trace(trace_path)] == [
+        ("stage", "sessao-2"),
+        ("guardrail", "sessao-2"),
+    ]
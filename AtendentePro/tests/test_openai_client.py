@@ -0,0 +1,102 @@
+"""Testes para o cliente AsyncOpenAI compartilhado com pool de conexões."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import httpx
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.Knowledge import knowledge_agent  # noqa: E402
+from AtendentePro.utils.openai_client import (  # noqa: E402
+    OpenAIClientSettings,
+    create_async_openai_client,
+    get_async_openai_client,
+    set_async_openai_client,
+)
+
+
+def _response(text: str) -> dict:
+    return {
+        "id": "resp_1",
+        "object": "response",
+        "created_at": 0,
+        "model": "gpt-4.1",
+        "output": [
+            {
+                "type": "message",
+                "id": "msg_1",
+                "status": "completed",
+                "role": "assistant",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }
+        ],
+        "parallel_tool_calls": False,
+        "tool_choice": "auto",
+        "tools": [],
+    }
+
+
+def test_settings_are_applied_to_the_client():
+    """Testa se limites de tempo e novas tentativas chegam ao cliente criado."""
+    settings = OpenAIClientSettings(timeout=12.0, connect_timeout=2.0, max_retries=1)
+    client = create_async_openai_client(settings, api_key="sk-test")
+
+    assert client.max_retries == 1
+    assert client.timeout.read == 12.0 and client.timeout.connect == 2.0
+    assert create_async_openai_client(settings, api_key="sk-test", max_retries=0).max_retries == 0
+
+
+def test_one_client_per_event_loop():
+    """Testa se o cliente é reutilizado no mesmo loop e recriado em um loop novo."""
+
+    async def twice():
+        return get_async_openai_client(), get_async_openai_client()
+
+    first, again = asyncio.run(twice())
+    other, _ = asyncio.run(twice())
+
+    assert first is again
+    assert other is not first
+
+
+def test_synthesis_runs_concurrently_on_shared_client():
+    """Testa se sínteses simultâneas não se bloqueiam e usam o cliente compartilhado."""
+    state = {"in_flight": 0, "peak": 0, "calls": 0}
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        state["calls"] += 1
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep(0.05)
+        state["in_flight"] -= 1
+        return httpx.Response(200, json=_response(f"resposta para {body['model']}"))
+
+    fake = create_async_openai_client(
+        api_key="sk-test", base_url="http://fake-openai.local/v1", transport=httpx.MockTransport(handle)
+    )
+
+    async def ask_many():
+        return await asyncio.gather(*(knowledge_agent._synthesize(f"pergunta {i}", "contexto") for i in range(4)))
+
+    set_async_openai_client(fake)
+    try:
+        answers = asyncio.run(ask_many())
+    finally:
+        set_async_openai_client(None)
+
+    assert answers == ["resposta para gpt-4.1"] * 4
+    assert state["calls"] == 4
+    assert state["peak"] > 1
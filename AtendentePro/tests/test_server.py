@@ -0,0 +1,177 @@
+"""Testes para o servidor assíncrono com várias sessões simultâneas."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from agents.stream_events import RawResponsesStreamEvent  # noqa: E402
+from openai.types.responses.response_text_delta_event import ResponseTextDeltaEvent  # noqa: E402
+from starlette.testclient import TestClient  # noqa: E402
+
+from AtendentePro.run_env.server import ConversationService, create_app  # noqa: E402
+from AtendentePro.utils.session_store import InMemorySessionStore  # noqa: E402
+
+
+def _delta(text: str) -> RawResponsesStreamEvent:
+    data = ResponseTextDeltaEvent(
+        content_index=0,
+        delta=text,
+        item_id="item",
+        logprobs=[],
+        output_index=0,
+        sequence_number=0,
+        type="response.output_text.delta",
+    )
+    return RawResponsesStreamEvent(data=data)
+
+
+class _FakeRunner:
+    """Substitui ``Runner.run_streamed``: ecoa a mensagem e mede turnos simultâneos."""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.contexts: list = []
+
+    def __call__(self, agent, input, context, hooks=None):
+        runner = self
+        self.contexts.append(context)
+        reply = f"eco: {input[-1]['content']}"
+
+        class _Result:
+            last_agent = agent
+            final_output = reply
+
+            async def stream_events(self):
+                runner.active += 1
+                runner.peak = max(runner.peak, runner.active)
+                try:
+                    await asyncio.sleep(runner.delay)
+                    yield _delta(reply)
+                finally:
+                    runner.active -= 1
+
+            def to_input_list(self):
+                return [*input, {"role": "assistant", "content": reply}]
+
+        return _Result()
+
+
+def _service(runner: _FakeRunner) -> ConversationService:
+    return ConversationService(InMemorySessionStore(max_sessions=10), run_streamed=runner)
+
+
+def test_sessions_run_concurrently_and_keep_their_own_state():
+    """Testa se sessões diferentes rodam em paralelo, cada uma com transcrição e ContextNote próprios."""
+    runner = _FakeRunner()
+    service = _service(runner)
+
+    async def scenario():
+        sessions = [await service.create_session() for _ in range(5)]
+
+        async def turn(session, text):
+            return [payload async for payload in service.run_turn(session.session_id, text)]
+
+        outputs = await asyncio.gather(*(turn(session, f"msg {i}") for i, session in enumerate(sessions)))
+        return sessions, outputs
+
+    sessions, outputs = asyncio.run(scenario())
+
+    assert runner.peak == 5
+    assert [events[-1]["output"] for events in outputs] == [f"eco: msg {i}" for i in range(5)]
+    assert len({id(context) for context in runner.contexts}) == 5
+    assert service.store.load(sessions[2].session_id).input_items[-1] == {"role": "assistant", "content": "eco: msg 2"}
+
+
+def test_turns_of_one_session_are_serialised():
+    """Testa se mensagens simultâneas na mesma sessão são processadas uma de cada vez."""
+    runner = _FakeRunner()
+    service = _service(runner)
+
+    async def scenario():
+        session = await service.create_session("knowledge")
+
+        async def turn(text):
+            return [payload async for payload in service.run_turn(session.session_id, text)]
+
+        await asyncio.gather(turn("primeira"), turn("segunda"))
+        return service.store.load(session.session_id)
+
+    session = asyncio.run(scenario())
+
+    assert runner.peak == 1
+    assert session.agent_name == "Knowledge Agent"
+    assert [item["role"] for item in session.input_items] == ["user", "assistant", "user", "assistant"]
+
+
+def test_http_streams_server_sent_events():
+    """Testa a criação de sessão e o streaming da resposta por SSE e por WebSocket."""
+    runner = _FakeRunner(delay=0)
+    app = create_app(_service(runner))
+
+    with TestClient(app) as client:
+        created = client.post("/sessions", json={"agent": "triage"})
+        assert created.status_code == 201
+        session_id = created.json()["session_id"]
+
+        response = client.post(f"/sessions/{session_id}/messages", json={"message": "olá"})
+        blocks = [block for block in response.text.split("\n\n") if block]
+        events = [block.split("\n")[0] for block in blocks]
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert events == ["event: delta", "event: done"]
+        assert json.loads(blocks[0].split("data: ", 1)[1])["text"] == "eco: olá"
+
+        with client.websocket_connect(f"/sessions/{session_id}/ws") as websocket:
+            websocket.send_text("tudo bem?")
+            assert websocket.receive_json()["type"] == "delta"
+            assert websocket.receive_json()["output"] == "eco: tudo bem?"
+
+        assert client.post("/sessions/missing/messages", json={"message": "x"}).status_code == 404
+        assert client.post("/sessions", json={"agent": "inexistente"}).status_code == 400
+        assert client.get("/metrics").headers["content-type"].startswith("text/plain")
+
+
+def test_malformed_bodies_are_rejected():
+    """Testa se corpos que não são um objeto JSON devolvem 400 em vez de erro interno."""
+    app = create_app(_service(_FakeRunner(delay=0)))
+
+    with TestClient(app) as client:
+        created = client.post("/sessions")
+        assert created.status_code == 201
+        session_id = created.json()["session_id"]
+        for content in ("{inválido", "[]", '"oi"'):
+            created = client.post("/sessions", content=content, headers={"content-type": "application/json"})
+            assert created.status_code == 400
+            sent = client.post(
+                f"/sessions/{session_id}/messages", content=content, headers={"content-type": "application/json"}
+            )
+            assert sent.status_code == 400
+        assert client.post(f"/sessions/{session_id}/messages", content=b"\xff").status_code == 400
+
+
+def test_app_purges_expired_sessions_periodically():
+    """Testa se o servidor remove do store as sessões expiradas sem que ninguém as carregue."""
+    clock = [0.0]
+    store = InMemorySessionStore(max_sessions=10, ttl=60, clock=lambda: clock[0])
+    service = ConversationService(store, purge_interval=0.01, run_streamed=_FakeRunner())
+
+    with TestClient(create_app(service)) as client:
+        assert client.post("/sessions", json={}).status_code == 201
+        assert len(store) == 1
+        clock[0] = 120
+        time.sleep(0.1)
+        assert len(store) == 0
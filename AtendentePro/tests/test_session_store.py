@@ -0,0 +1,109 @@
+"""Testes para os armazenamentos de sessão (memória com LRU e SQLite)."""
+
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Ensure project and package roots are on sys.path for absolute imports
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+PACKAGE_ROOT = PROJECT_ROOT / "AtendentePro"
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from AtendentePro.context import ContextNote  # noqa: E402
+from AtendentePro.utils.session_store import (  # noqa: E402
+    InMemorySessionStore,
+    SessionState,
+    SQLiteSessionStore,
+    create_session_store,
+)
+
+
+def _state(session_id: str, turns: int = 1) -> SessionState:
+    items = []
+    for turn in range(turns):
+        items.append({"role": "user", "content": f"pergunta {turn}"})
+        items.append({"role": "assistant", "content": f"resposta {turn}"})
+    context = ContextNote(handoff_summaries={"Triage Agent": {"resumo": "cliente quer emitir nota"}})
+    return SessionState(session_id=session_id, agent_name="Flow Agent", input_items=items, context=context)
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_memory_store_evicts_least_recently_used_and_idle_sessions():
+    """Testa se a memória fica limitada por quantidade de sessões e por tempo ocioso."""
+    clock = _Clock()
+    store = InMemorySessionStore(max_sessions=2, ttl=10, clock=clock)
+    store.save(_state("a"))
+    store.save(_state("b"))
+    assert store.load("a") is not None
+    store.save(_state("c"))
+
+    assert store.load("b") is None
+    assert len(store) == 2
+
+    clock.now = 11
+    assert store.load("a") is None and store.load("c") is None
+
+
+def test_sqlite_store_survives_a_restart(tmp_path):
+    """Testa se transcrição, agente e ContextNote voltam iguais após reabrir o arquivo."""
+    path = tmp_path / "sessions.sqlite"
+    state = _state("sessao", turns=50)
+    store = SQLiteSessionStore(path)
+    store.save(state)
+    store.close()
+
+    reopened = SQLiteSessionStore(path)
+    loaded = reopened.load("sessao")
+
+    assert loaded.agent_name == "Flow Agent"
+    assert loaded.input_items == state.input_items
+    assert loaded.context.handoff_summaries == state.context.handoff_summaries
+    assert reopened.delete("sessao") and reopened.load("sessao") is None
+
+
+def test_cached_sqlite_store_loads_evicted_sessions_lazily(tmp_path):
+    """Testa se sessões expulsas da memória continuam disponíveis no disco."""
+    store = create_session_store("sqlite", path=tmp_path / "sessions.sqlite", max_sessions=1)
+    store.save(_state("a"))
+    store.save(_state("b"))
+
+    assert len(store) == 1
+    assert store.load("a").input_items[0]["content"] == "pergunta 0"
+    assert len(store.backend) == 2
+
+    with pytest.raises(ValueError, match="Unknown session store"):
+        create_session_store("redis")
+
+
+def test_idle_sqlite_sessions_are_purged(tmp_path):
+    """Testa se sessões abandonadas saem do disco ao abrir o store e a cada purge, sem precisar carregá-las."""
+    path = tmp_path / "sessions.sqlite"
+    old = SQLiteSessionStore(path)
+    old.save(_state("abandonada"))
+    old._conn.execute("UPDATE sessions SET updated_at = updated_at - 7200")
+    old._conn.commit()
+    old.close()
+
+    store = create_session_store("sqlite", path=path, ttl=3600)
+    assert len(store.backend) == 0
+
+    store.save(_state("recente"))
+    store.backend.ttl = 0.0
+    time.sleep(0.01)
+    assert store.purge() == 1
+    assert len(store.backend) == 0
@@ -1,3 +1,3 @@
 from __future__ import annotations
 
-__all__ = ["handoff"]
+__all__ = ["compaction", "handoff", "metrics", "openai_client", "session_store"]
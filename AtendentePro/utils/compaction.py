@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any, Sequence
+
+from pydantic import BaseModel, Field
+
+from AtendentePro.context import ContextNote
+from AtendentePro.Knowledge.knowledge_tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_START = "[CONVERSATION_SUMMARY]"
+SUMMARY_END = "[/CONVERSATION_SUMMARY]"
+HANDOFF_SUMMARY_START = "[HANDOFF_SUMMARY]"
+MAX_REQUEST_CHARS = 300
+MAX_REPLY_CHARS = 600
+
+
+class CompactionSettings(BaseModel):
+    max_tokens: int = Field(
+        default=8000, description="Tokens da transcrição a partir dos quais ela é compactada (0 desliga)."
+    )
+    keep_tokens: int = Field(default=3000, description="Tokens dos turnos mais recentes mantidos na íntegra.")
+    max_requests: int = Field(default=10, description="Pedidos do usuário mais recentes guardados no resumo.")
+    model: str | None = Field(default=None, description="Modelo usado para contar tokens.")
+
+    @classmethod
+    def from_config(cls) -> "CompactionSettings":
+        """Read the ``TRANSCRIPT_*`` settings from ``config.py``, keeping defaults for missing ones."""
+        from AtendentePro import config
+
+        defaults = cls()
+        return cls(
+            max_tokens=getattr(config, "TRANSCRIPT_MAX_TOKENS", defaults.max_tokens),
+            keep_tokens=getattr(config, "TRANSCRIPT_KEEP_TOKENS", defaults.keep_tokens),
+            max_requests=getattr(config, "TRANSCRIPT_SUMMARY_REQUESTS", defaults.max_requests),
+            model=getattr(config, "DEFAULT_MODEL", defaults.model),
+        )
+
+
+def item_text(item: Any) -> str:
+    """Plain text of a transcript message (string content or a list of text parts)."""
+    if not isinstance(item, dict):
+        return ""
+    content = item.get("content")
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def item_tokens(item: Any, model: str | None = None) -> int:
+    """Tokens an input item adds to the prompt, estimated on its JSON form."""
+    return count_tokens(json.dumps(item, ensure_ascii=False, default=str), model)
+
+
+def transcript_tokens(items: Sequence[Any], model: str | None = None) -> int:
+    return sum(item_tokens(item, model) for item in items)
+
+
+def _is_user_message(item: Any) -> bool:
+    return isinstance(item, dict) and item.get("role") == "user" and item.get("type", "message") == "message"
+
+
+def _parse_summary(item: Any) -> dict[str, Any] | None:
+    text = item_text(item)
+    if not text.startswith(SUMMARY_START):
+        return None
+    try:
+        return json.loads(text[len(SUMMARY_START) : text.rindex(SUMMARY_END)])
+    except ValueError:
+        return None
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1].rstrip() + "…"
+
+
+def summarize_items(
+    items: Sequence[Any],
+    context: ContextNote | None = None,
+    previous: dict[str, Any] | None = None,
+    max_requests: int = 10,
+) -> dict[str, Any]:
+    """Structured summary of ``items``, folded into a ``previous`` summary.
+
+    Keeps the latest user requests, the last assistant reply, the tools used
+    and the latest handoff payload of each label in ``context``, so the
+    summary stays bounded however long the conversation gets.
+    """
+    previous = previous or {}
+    requests = list(previous.get("user_requests", []))
+    tools = set(previous.get("tools_used", []))
+    last_reply = previous.get("last_assistant_reply", "")
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        if item.get("type") == "function_call":
+            tools.add(item.get("name", ""))
+        elif _is_user_message(item):
+            requests.append(_clip(item_text(item), MAX_REQUEST_CHARS))
+        elif item.get("role") == "assistant":
+            text = item_text(item)
+            if text and not text.startswith(HANDOFF_SUMMARY_START):
+                last_reply = _clip(text, MAX_REPLY_CHARS)
+    handoffs = dict(context.handoff_summaries) if context is not None else previous.get("handoffs", {})
+    return {
+        "compacted_items": previous.get("compacted_items", 0) + len(items),
+        "user_requests": requests[-max_requests:] if max_requests > 0 else [],
+        "last_assistant_reply": last_reply,
+        "tools_used": sorted(tool for tool in tools if tool),
+        "handoffs": handoffs,
+    }
+
+
+def summary_item(summary: dict[str, Any]) -> dict[str, Any]:
+    body = json.dumps(summary, ensure_ascii=False, default=str)
+    return {"role": "assistant", "content": f"{SUMMARY_START}\n{body}\n{SUMMARY_END}"}
+
+
+def compact_transcript(
+    items: Sequence[Any],
+    context: ContextNote | None = None,
+    settings: CompactionSettings | None = None,
+) -> list[Any]:
+    """Replace older turns with a structured summary once ``items`` exceed ``settings.max_tokens``.
+
+    The most recent turns that fit in ``keep_tokens`` are kept verbatim and
+    the cut always falls on a user message, so tool calls stay next to
+    their outputs. The summary carries the latest ``ContextNote`` handoff
+    payloads. Items below the threshold are returned unchanged.
+    """
+    settings = settings or CompactionSettings.from_config()
+    items = list(items)
+    if settings.max_tokens <= 0 or len(items) < 2:
+        return items
+    tokens = [item_tokens(item, settings.model) for item in items]
+    if sum(tokens) <= settings.max_tokens:
+        return items
+
+    previous = _parse_summary(items[0])
+    first = 1 if previous is not None else 0
+    cut = None
+    kept = 0
+    for index in range(len(items) - 1, first, -1):
+        kept += tokens[index]
+        if _is_user_message(items[index]):
+            if cut is not None and kept > settings.keep_tokens:
+                break
+            cut = index
+    if cut is None:
+        return items
+
+    summary = summarize_items(items[first:cut], context, previous, settings.max_requests)
+    compacted = [summary_item(summary), *items[cut:]]
+    logger.info(
+        "Compacted transcript: %d items (%d tokens) -> %d items (%d tokens)",
+        len(items),
+        sum(tokens),
+        len(compacted),
+        item_tokens(compacted[0], settings.model) + sum(tokens[cut:]),
+    )
+    return compacted
@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from agents import RunHooks
+from agents.stream_events import RawResponsesStreamEvent
+from agents.tracing import Span, Trace, TracingProcessor, add_trace_processor
+from agents.tracing.span_data import GuardrailSpanData
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "atendente"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Session of the turn being run; set by the runners so tools and guardrails can tag their events.
+current_session: ContextVar[str | None] = ContextVar("current_session", default=None)
+
+
+def _label_key(labels: dict[str, Any]) -> tuple[tuple[str, str], ...]:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _render_labels(key: tuple[tuple[str, str], ...], le: str | None = None) -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in key]
+    if le is not None:
+        parts.append(f'le="{le}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    """Process-wide counters and latency histograms rendered in the Prometheus text format.
+
+    Labels are kept low-cardinality (agent, tool, stage); per-session detail
+    goes to the JSONL trace instead.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[tuple, float]] = {}
+        self._histograms: dict[str, dict[tuple, list[float]]] = {}
+        self._help: dict[str, str] = {}
+
+    def inc(self, name: str, value: float = 1.0, *, help: str = "", **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+            self._help.setdefault(name, help)
+
+    def observe(self, name: str, value: float, *, help: str = "", **labels: Any) -> None:
+        """Add ``value`` (seconds) to the histogram ``name``."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            # Per-bucket counts, then sum and count.
+            row = series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[position] += 1
+            row[-2] += value
+            row[-1] += 1
+            self._help.setdefault(name, help)
+
+    def value(self, name: str, **labels: Any) -> float:
+        """Counter value, or the observation count of a histogram."""
+        key = _label_key(labels)
+        with self._lock:
+            if name in self._counters:
+                return self._counters[name].get(key, 0.0)
+            row = self._histograms.get(name, {}).get(key)
+            return row[-1] if row else 0.0
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        lines: list[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                full = f"{METRIC_PREFIX}_{name}"
+                if self._help.get(name):
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{full}{_render_labels(key)} {value:g}")
+            for name in sorted(self._histograms):
+                full = f"{METRIC_PREFIX}_{name}"
+                if self._help.get(name):
+                    lines.append(f"# HELP {full} {self._help[name]}")
+                lines.append(f"# TYPE {full} histogram")
+                for key, row in sorted(self._histograms[name].items()):
+                    for bound, count in zip(self.buckets, row):
+                        lines.append(f"{full}_bucket{_render_labels(key, f'{bound:g}')} {count:g}")
+                    lines.append(f"{full}_bucket{_render_labels(key, '+Inf')} {row[-1]:g}")
+                    lines.append(f"{full}_sum{_render_labels(key)} {row[-2]:.6f}")
+                    lines.append(f"{full}_count{_render_labels(key)} {row[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+
+class TraceWriter:
+    """Append-only JSONL file with one timing/usage event per line."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def write(self, event: dict[str, Any]) -> None:
+        line = json.dumps({"ts": time.time(), **event}, ensure_ascii=False, default=str)
+        with self._lock, self.path.open("a", encoding="utf-8") as handle:
+            handle.write(line + "\n")
+
+
+_registry = MetricsRegistry()
+_trace_writer: TraceWriter | None = None
+_trace_loaded = False
+_processor_installed = False
+_lock = threading.Lock()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    return _registry
+
+
+def get_trace_writer() -> TraceWriter | None:
+    """JSONL trace at ``config.METRICS_TRACE_PATH``, or ``None`` when it is not set."""
+    global _trace_writer, _trace_loaded
+    with _lock:
+        if not _trace_loaded:
+            from AtendentePro import config
+
+            path = getattr(config, "METRICS_TRACE_PATH", "")
+            _trace_writer = TraceWriter(path) if path else None
+            _trace_loaded = True
+        return _trace_writer
+
+
+def set_trace_writer(writer: TraceWriter | None) -> None:
+    global _trace_writer, _trace_loaded
+    with _lock:
+        _trace_writer = writer
+        _trace_loaded = True
+
+
+def record_event(kind: str, **fields: Any) -> None:
+    """Write ``kind`` with ``fields`` and the current session to the JSONL trace, if enabled."""
+    writer = get_trace_writer()
+    if writer is None:
+        return
+    try:
+        session_id = fields.pop("session_id", None) or current_session.get()
+        writer.write({"event": kind, "session_id": session_id, **fields})
+    except OSError as exc:
+        logger.warning("Could not write trace event %s: %s", kind, exc)
+
+
+@contextmanager
+def timed_stage(stage: str, clock: Callable[[], float] = time.perf_counter) -> Iterator[None]:
+    """Time a step inside a tool (e.g. ``rag.embed``) into ``stage_seconds``."""
+    started = clock()
+    try:
+        yield
+    finally:
+        seconds = clock() - started
+        _registry.observe("stage_seconds", seconds, help="Duração das etapas internas das ferramentas.", stage=stage)
+        record_event("stage", stage=stage, seconds=seconds)
+
+
+class MetricsHooks(RunHooks[Any]):
+    """Run hooks timing model calls, tools, agents and handoffs of one turn.
+
+    Pass an instance as ``hooks=`` to ``Runner.run_streamed`` and feed the
+    stream to :meth:`observe_stream_event` to also get time-to-first-token.
+    ``totals`` accumulates the tokens and model time per agent.
+    """
+
+    def __init__(
+        self,
+        session_id: str | None = None,
+        registry: MetricsRegistry | None = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self.session_id = session_id
+        self.registry = registry or _registry
+        self._clock = clock
+        self._agent_started: dict[str, float] = {}
+        self._llm_started: dict[str, float] = {}
+        self._tool_started: dict[tuple[str, str], float] = {}
+        self._awaiting_first_token: str | None = None
+        self.totals: dict[str, dict[str, float]] = {}
+
+    def _event(self, kind: str, **fields: Any) -> None:
+        record_event(kind, session_id=self.session_id, **fields)
+
+    def _total(self, agent: str) -> dict[str, float]:
+        return self.totals.setdefault(
+            agent, {"llm_calls": 0, "llm_seconds": 0.0, "input_tokens": 0, "output_tokens": 0, "cached_tokens": 0}
+        )
+
+    async def on_agent_start(self, context: Any, agent: Any) -> None:
+        self._agent_started[agent.name] = self._clock()
+        self._event("agent_start", agent=agent.name)
+
+    async def on_agent_end(self, context: Any, agent: Any, output: Any) -> None:
+        started = self._agent_started.pop(agent.name, None)
+        if started is None:
+            return
+        seconds = self._clock() - started
+        self.registry.observe(
+            "agent_seconds", seconds, help="Duração de cada agente até a resposta final.", agent=agent.name
+        )
+        self._event("agent_end", agent=agent.name, seconds=seconds)
+
+    async def on_llm_start(self, context: Any, agent: Any, system_prompt: Any, input_items: Any) -> None:
+        self._llm_started[agent.name] = self._clock()
+        self._awaiting_first_token = agent.name
+
+    async def on_llm_end(self, context: Any, agent: Any, response: Any) -> None:
+        started = self._llm_started.pop(agent.name, None)
+        seconds = self._clock() - started if started is not None else 0.0
+        usage = getattr(response, "usage", None)
+        tokens = {
+            "input": getattr(usage, "input_tokens", 0) or 0,
+            "output": getattr(usage, "output_tokens", 0) or 0,
+            "cached": getattr(getattr(usage, "input_tokens_details", None), "cached_tokens", 0) or 0,
+        }
+        self.registry.observe("llm_seconds", seconds, help="Latência das chamadas ao modelo.", agent=agent.name)
+        for kind, count in tokens.items():
+            self.registry.inc(
+                "llm_tokens_total", count, help="Tokens consumidos por agente.", agent=agent.name, kind=kind
+            )
+        total = self._total(agent.name)
+        total["llm_calls"] += 1
+        total["llm_seconds"] += seconds
+        for kind, count in tokens.items():
+            total[f"{kind}_tokens"] += count
+        self._event(
+            "llm", agent=agent.name, seconds=seconds, **{f"{kind}_tokens": count for kind, count in tokens.items()}
+        )
+
+    def observe_stream_event(self, event: Any) -> None:
+        """Record time-to-first-token on the first delta after a model call starts."""
+        agent = self._awaiting_first_token
+        if agent is None or not isinstance(event, RawResponsesStreamEvent):
+            return
+        if not str(getattr(event.data, "type", "")).endswith(".delta"):
+            return
+        self._awaiting_first_token = None
+        started = self._llm_started.get(agent)
+        if started is None:
+            return
+        seconds = self._clock() - started
+        self.registry.observe("llm_ttft_seconds", seconds, help="Tempo até o primeiro token do modelo.", agent=agent)
+        self._event("ttft", agent=agent, seconds=seconds)
+
+    async def on_tool_start(self, context: Any, agent: Any, tool: Any) -> None:
+        call_id = getattr(context, "tool_call_id", None) or tool.name
+        self._tool_started[(tool.name, call_id)] = self._clock()
+
+    async def on_tool_end(self, context: Any, agent: Any, tool: Any, result: Any) -> None:
+        call_id = getattr(context, "tool_call_id", None) or tool.name
+        started = self._tool_started.pop((tool.name, call_id), None)
+        if started is None:
+            return
+        seconds = self._clock() - started
+        self.registry.observe(
+            "tool_seconds", seconds, help="Duração das chamadas de ferramenta.", agent=agent.name, tool=tool.name
+        )
+        self._event("tool", agent=agent.name, tool=tool.name, seconds=seconds)
+
+    async def on_handoff(self, context: Any, from_agent: Any, to_agent: Any) -> None:
+        self.registry.inc(
+            "handoffs_total", help="Transferências entre agentes.", from_agent=from_agent.name, to_agent=to_agent.name
+        )
+        self._event("handoff", from_agent=from_agent.name, to_agent=to_agent.name)
+
+
+class MetricsTracingProcessor(TracingProcessor):
+    """Times guardrail spans of the Agents SDK tracing into ``guardrail_seconds``.
+
+    Guardrails do not go through run hooks, so they are measured from the
+    trace; nothing is recorded when tracing is disabled.
+    """
+
+    def __init__(self, registry: MetricsRegistry | None = None, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.registry = registry or _registry
+        self._clock = clock
+        self._started: dict[str, float] = {}
+
+    def on_trace_start(self, trace: Trace) -> None:
+        pass
+
+    def on_trace_end(self, trace: Trace) -> None:
+        pass
+
+    def on_span_start(self, span: Span[Any]) -> None:
+        if isinstance(span.span_data, GuardrailSpanData):
+            self._started[span.span_id] = self._clock()
+
+    def on_span_end(self, span: Span[Any]) -> None:
+        started = self._started.pop(span.span_id, None)
+        if started is None:
+            return
+        data = span.span_data
+        seconds = self._clock() - started
+        self.registry.observe(
+            "guardrail_seconds",
+            seconds,
+            help="Duração dos guardrails de entrada e saída.",
+            guardrail=data.name,
+            triggered=str(bool(data.triggered)).lower(),
+        )
+        record_event("guardrail", guardrail=data.name, triggered=bool(data.triggered), seconds=seconds)
+
+    def shutdown(self) -> None:
+        pass
+
+    def force_flush(self) -> None:
+        pass
+
+
+def install_metrics_processor() -> None:
+    """Register :class:`MetricsTracingProcessor` with the Agents SDK once per process."""
+    global _processor_installed
+    with _lock:
+        if not _processor_installed:
+            add_trace_processor(MetricsTracingProcessor())
+            _processor_installed = True
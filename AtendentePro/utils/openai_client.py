@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Any
+
+import httpx
+import openai
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+
+class OpenAIClientSettings(BaseModel):
+    max_connections: int = Field(default=100, description="Conexões HTTP simultâneas por cliente.")
+    max_keepalive_connections: int = Field(default=20, description="Conexões ociosas mantidas abertas no pool.")
+    keepalive_expiry: float = Field(default=30.0, description="Segundos até fechar uma conexão ociosa.")
+    timeout: float = Field(default=60.0, description="Tempo limite de leitura/escrita de uma requisição, em segundos.")
+    connect_timeout: float = Field(default=5.0, description="Tempo limite para abrir a conexão, em segundos.")
+    max_retries: int = Field(default=2, description="Novas tentativas automáticas do SDK OpenAI.")
+
+    @classmethod
+    def from_config(cls) -> "OpenAIClientSettings":
+        """Read the ``OPENAI_*`` pool settings from ``config.py``, keeping defaults for missing ones."""
+        from AtendentePro import config
+
+        defaults = cls()
+        return cls(
+            max_connections=getattr(config, "OPENAI_MAX_CONNECTIONS", defaults.max_connections),
+            max_keepalive_connections=getattr(
+                config, "OPENAI_MAX_KEEPALIVE_CONNECTIONS", defaults.max_keepalive_connections
+            ),
+            keepalive_expiry=getattr(config, "OPENAI_KEEPALIVE_EXPIRY", defaults.keepalive_expiry),
+            timeout=getattr(config, "OPENAI_TIMEOUT", defaults.timeout),
+            connect_timeout=getattr(config, "OPENAI_CONNECT_TIMEOUT", defaults.connect_timeout),
+            max_retries=getattr(config, "OPENAI_MAX_RETRIES", defaults.max_retries),
+        )
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def timeouts(self) -> httpx.Timeout:
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout)
+
+
+def create_async_openai_client(
+    settings: OpenAIClientSettings | None = None,
+    *,
+    api_key: str | None = None,
+    base_url: str | None = None,
+    max_retries: int | None = None,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> openai.AsyncOpenAI:
+    """New ``AsyncOpenAI`` over a keep-alive connection pool sized by ``settings``.
+
+    ``api_key`` defaults to ``config.OPENAI_API_KEY``; ``transport`` lets
+    tests and benchmarks swap the network for an ``httpx.MockTransport``.
+    """
+    settings = settings or OpenAIClientSettings.from_config()
+    if api_key is None:
+        from AtendentePro import config
+
+        api_key = config.OPENAI_API_KEY
+    http_client = httpx.AsyncClient(limits=settings.limits(), timeout=settings.timeouts(), transport=transport)
+    return openai.AsyncOpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        timeout=settings.timeouts(),
+        max_retries=settings.max_retries if max_retries is None else max_retries,
+        http_client=http_client,
+    )
+
+
+# httpx pools are bound to the event loop that opened their connections, so
+# the shared client is kept per loop and dropped with it.
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+_override: Any | None = None
+_clients_lock = threading.Lock()
+
+
+def get_async_openai_client() -> openai.AsyncOpenAI:
+    """Return the pooled ``AsyncOpenAI`` shared by every tool running on the current event loop.
+
+    Must be called from a coroutine. Use it for all model and embedding
+    calls made inside tools, so concurrent sessions reuse warm connections
+    instead of opening (and blocking on) a new client per call.
+    """
+    if _override is not None:
+        return _override
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        client = _clients.get(loop)
+        if client is None:
+            client = create_async_openai_client()
+            _clients[loop] = client
+            logger.debug("Created pooled AsyncOpenAI client for loop %s", id(loop))
+        return client
+
+
+def set_async_openai_client(client: openai.AsyncOpenAI | None) -> None:
+    """Serve ``client`` from :func:`get_async_openai_client` on every loop; ``None`` restores the pool."""
+    global _override
+    _override = client
+
+
+def use_shared_client_for_agents() -> openai.AsyncOpenAI:
+    """Make the Agents SDK send model calls through the shared client of the running loop."""
+    from agents import set_default_openai_client
+
+    client = get_async_openai_client()
+    set_default_openai_client(client, use_for_tracing=False)
+    return client
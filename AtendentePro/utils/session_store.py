@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Protocol, runtime_checkable
+
+from pydantic import BaseModel, Field
+
+from AtendentePro.context import ContextNote
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SESSIONS = 1000
+DEFAULT_SESSION_TTL = 3600.0
+SESSION_DB_NAME = "sessions.sqlite"
+
+
+class SessionState(BaseModel):
+    session_id: str = Field(description="Identificador da sessão.")
+    agent_name: str = Field(description="Nome do agente que responde o próximo turno.")
+    input_items: list[dict[str, Any]] = Field(
+        default_factory=list, description="Transcrição no formato de entrada do Runner."
+    )
+    context: ContextNote = Field(default_factory=ContextNote, description="Contexto compartilhado entre os agentes.")
+    updated_at: float = Field(default_factory=time.time, description="Último uso da sessão (epoch).")
+
+
+@runtime_checkable
+class SessionStore(Protocol):
+    """Keeps :class:`SessionState` per session id.
+
+    Calls are synchronous and thread-safe; async callers run the disk-backed
+    stores in a worker thread.
+    """
+
+    def load(self, session_id: str) -> SessionState | None:
+        """Return the stored state, or ``None`` for an unknown or expired session."""
+        ...
+
+    def save(self, state: SessionState) -> None:
+        """Store ``state``, replacing the previous one of the same session."""
+        ...
+
+    def delete(self, session_id: str) -> bool:
+        """Forget the session; ``True`` when it existed."""
+        ...
+
+
+class InMemorySessionStore:
+    """Least-recently-used sessions in process memory, bounded by ``max_sessions`` and an idle ``ttl``.
+
+    With a ``backend`` it is a write-through cache: saves also go to the
+    backend and misses load lazily from it, so evicting a session only frees
+    memory.
+    """
+
+    name = "memory"
+
+    def __init__(
+        self,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        ttl: float | None = DEFAULT_SESSION_TTL,
+        *,
+        backend: SessionStore | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_sessions = max(1, max_sessions)
+        self.ttl = ttl
+        self.backend = backend
+        self._clock = clock
+        self._sessions: OrderedDict[str, tuple[float, SessionState]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _expired(self, used: float, now: float) -> bool:
+        return self.ttl is not None and now - used > self.ttl
+
+    def _evict(self, now: float) -> None:
+        while self._sessions:
+            session_id, (used, _) = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and not self._expired(used, now):
+                break
+            del self._sessions[session_id]
+
+    def load(self, session_id: str) -> SessionState | None:
+        now = self._clock()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and not self._expired(entry[0], now):
+                self._sessions[session_id] = (now, entry[1])
+                self._sessions.move_to_end(session_id)
+                return entry[1]
+            self._sessions.pop(session_id, None)
+        if self.backend is None:
+            return None
+        state = self.backend.load(session_id)
+        if state is not None:
+            with self._lock:
+                self._sessions[session_id] = (now, state)
+                self._evict(now)
+        return state
+
+    def save(self, state: SessionState) -> None:
+        if self.backend is not None:
+            self.backend.save(state)
+        now = self._clock()
+        with self._lock:
+            self._sessions[state.session_id] = (now, state)
+            self._sessions.move_to_end(state.session_id)
+            self._evict(now)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            existed = self._sessions.pop(session_id, None) is not None
+        if self.backend is not None:
+            existed = self.backend.delete(session_id) or existed
+        return existed
+
+    def purge(self) -> int:
+        """Drop the sessions idle for longer than ``ttl`` here and in the backend; return how many were removed."""
+        now = self._clock()
+        with self._lock:
+            before = len(self._sessions)
+            self._evict(now)
+            removed = before - len(self._sessions)
+        backend_purge = getattr(self.backend, "purge", None)
+        if backend_purge is not None:
+            removed += backend_purge()
+        return removed
+
+
+class SQLiteSessionStore:
+    """Sessions on disk, one row each, so they survive restarts.
+
+    The transcript and ``ContextNote`` are stored as zlib-compressed JSON;
+    sessions idle for longer than ``ttl`` are treated as missing and removed
+    by :meth:`purge`.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str | Path, ttl: float | None = None) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, agent_name TEXT NOT NULL, payload BLOB NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def load(self, session_id: str) -> SessionState | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT agent_name, payload, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        agent_name, payload, updated_at = row
+        if self.ttl is not None and time.time() - updated_at > self.ttl:
+            self.delete(session_id)
+            return None
+        data = json.loads(zlib.decompress(payload))
+        return SessionState(
+            session_id=session_id,
+            agent_name=agent_name,
+            input_items=data["input_items"],
+            context=ContextNote.model_validate(data["context"]),
+            updated_at=updated_at,
+        )
+
+    def save(self, state: SessionState) -> None:
+        state.updated_at = time.time()
+        data = {"input_items": state.input_items, "context": state.context.model_dump(mode="json")}
+        payload = zlib.compress(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, agent_name, payload, updated_at) VALUES (?, ?, ?, ?)",
+                (state.session_id, state.agent_name, payload, state.updated_at),
+            )
+            self._conn.commit()
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def purge(self) -> int:
+        """Delete the sessions idle for longer than ``ttl``; return how many were removed."""
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.ttl,))
+            self._conn.commit()
+        if cursor.rowcount:
+            logger.info("Purged %d idle sessions from %s", cursor.rowcount, self.path)
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def default_session_db_path() -> Path:
+    """``sessions.sqlite`` inside ``config.CONTEXT_OUTPUT_DIR``."""
+    from AtendentePro import config
+
+    return Path(config.CONTEXT_OUTPUT_DIR) / SESSION_DB_NAME
+
+
+SESSION_STORE_REGISTRY: dict[str, type] = {
+    InMemorySessionStore.name: InMemorySessionStore,
+    SQLiteSessionStore.name: SQLiteSessionStore,
+}
+
+
+def create_session_store(
+    name: str = "memory",
+    *,
+    path: str | Path | None = None,
+    max_sessions: int = DEFAULT_MAX_SESSIONS,
+    ttl: float | None = DEFAULT_SESSION_TTL,
+) -> SessionStore:
+    """Build the store registered as ``name``.
+
+    ``sqlite`` is fronted by a bounded in-memory cache, so hot sessions are
+    served from memory and idle ones only live on disk. Rows idle for longer
+    than ``ttl`` are purged when the store is opened; long-running callers
+    should also call ``purge()`` periodically.
+    """
+    if name not in SESSION_STORE_REGISTRY:
+        raise ValueError(f"Unknown session store {name!r}; use one of {sorted(SESSION_STORE_REGISTRY)}")
+    if name == SQLiteSessionStore.name:
+        backend = SQLiteSessionStore(path or default_session_db_path(), ttl=ttl)
+        backend.purge()
+        return InMemorySessionStore(max_sessions, ttl, backend=backend)
+    return InMemorySessionStore(max_sessions, ttl)